@@ -0,0 +1,108 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import asyncio
+import concurrent.futures
+import logging
+import time
+
+from ospurge import main
+from ospurge import metrics
+from ospurge import scheduler
+from ospurge.resources import base
+
+
+async def wait_for_check_prerequisite(resource_mngr, options, exit):
+    """
+    Coroutine version of the parking of `DependencyScheduler.run()`: call
+    `main.check_prerequisite()` until it lets `resource_mngr` start, and
+    return whether it can start.
+    """
+    loop = asyncio.get_event_loop()
+    name = resource_mngr.__class__.__name__
+    deadline = time.time() + base.PREREQUISITE_TIMEOUT
+    delay = None
+    while True:
+        ready = await loop.run_in_executor(
+            None, main.check_prerequisite, resource_mngr, options, exit,
+            deadline)
+        if ready is None or exit.is_set():
+            return False
+        if ready:
+            return True
+        delay = scheduler.backoff(delay)
+        await asyncio.sleep(delay)
+        metrics.get_metrics().record_sleep(name, 'prerequisite', delay)
+
+
+async def runner(resource_mngr, options, exit):
+    """Coroutine version of `main.runner()`."""
+    loop = asyncio.get_event_loop()
+    if not await wait_for_check_prerequisite(resource_mngr, options, exit):
+        return
+    await loop.run_in_executor(
+        None, main.runner, resource_mngr, options, exit)
+
+
+async def run_after(dependencies, resource_mngr, options, exit):
+    if dependencies:
+        await asyncio.wait(dependencies)
+    # Like `DependencyScheduler.run()`, don't start anything new once
+    # asked to exit.
+    if exit.is_set():
+        return
+    logging.debug("Starting %s", resource_mngr.__class__.__name__)
+    await runner(resource_mngr, options, exit)
+
+
+async def run_all(dependency_scheduler, options, exit):
+    """
+    Run every resource manager of `dependency_scheduler` as soon as the
+    resource managers it depends on are done.
+    """
+    loop = asyncio.get_event_loop()
+    tasks = {}  # type: dict
+    # Dependencies come first in the topological order, so their tasks
+    # exist when their dependents are created.
+    for mngr in dependency_scheduler.topological_order():
+        name = mngr.__class__.__name__
+        dependencies = [tasks[dep]
+                        for dep in dependency_scheduler.dependencies[name]]
+        tasks[name] = loop.create_task(
+            run_after(dependencies, mngr, options, exit))
+    if tasks:
+        await asyncio.wait(list(tasks.values()))
+
+
+def run(dependency_scheduler, options, exit, max_workers=None):
+    """
+    Run the resource managers of `dependency_scheduler` as coroutines of a
+    new event loop (--engine asyncio). Waiting for dependencies and
+    prerequisites doesn't hold any thread, only the blocking calls (checking
+    prerequisites, listing and deleting) go to a thread pool of
+    `max_workers` threads, one per resource manager by default.
+    """
+    if max_workers is None:
+        max_workers = len(dependency_scheduler.resource_managers)
+    loop = asyncio.new_event_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max(max_workers, 1))
+    loop.set_default_executor(executor)
+    task = loop.create_task(run_all(dependency_scheduler, options, exit))
+    try:
+        loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        # Let the resource managers notice and finish their calls.
+        exit.set()
+        loop.run_until_complete(task)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        loop.close()
@@ -0,0 +1,54 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+import asyncio
+import threading
+from typing import List
+from typing import Optional
+
+from ospurge.resources.base import ServiceResource
+from ospurge.scheduler import DependencyScheduler
+
+
+async def wait_for_check_prerequisite(
+    resource_mngr: ServiceResource, options: argparse.Namespace,
+    exit: threading.Event
+) -> bool:
+    ...
+
+
+async def runner(
+    resource_mngr: ServiceResource, options: argparse.Namespace,
+    exit: threading.Event
+) -> None:
+    ...
+
+
+async def run_after(
+    dependencies: List[asyncio.Task], resource_mngr: ServiceResource,
+    options: argparse.Namespace, exit: threading.Event
+) -> None:
+    ...
+
+
+async def run_all(
+    dependency_scheduler: DependencyScheduler, options: argparse.Namespace,
+    exit: threading.Event
+) -> None:
+    ...
+
+
+def run(
+    dependency_scheduler: DependencyScheduler, options: argparse.Namespace,
+    exit: threading.Event, max_workers: Optional[int]=None
+) -> None:
+    ...
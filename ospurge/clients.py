@@ -0,0 +1,84 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import threading
+
+from keystoneauth1 import identity
+from keystoneauth1 import session
+
+from ospurge import throttle
+from ospurge import trace
+
+_sessions = {}  # type: dict
+_clients = {}  # type: dict
+_lock = threading.RLock()
+
+
+def _session_key(options):
+    return (options.os_auth_url, options.os_username, options.purge_project)
+
+
+def get_session(options):
+    """
+    Return the keystoneauth session for the credentials and the project to
+    purge in `options`.
+
+    Sessions are created once per process and shared by all threads:
+    keystoneauth reuses the token until it is about to expire and the
+    underlying `requests` session keeps a pool of HTTP connections per
+    endpoint.
+    """
+    key = _session_key(options)
+    with _lock:
+        if key not in _sessions:
+            auth = identity.V3Password(auth_url=options.os_auth_url,
+                                       username=options.os_username,
+                                       user_domain_name='Default',
+                                       password=options.os_password,
+                                       project_name=options.purge_project,
+                                       project_domain_name='Default')
+            sess = session.Session(auth=auth)
+
+            # Adapt the number of concurrent requests to the load of each
+            # endpoint. The connection pools are sized so that concurrent
+            # calls don't have to open (and throw away) extra connections.
+            throttle.mount(sess.session, options)
+
+            _sessions[key] = sess
+        return _sessions[key]
+
+
+def get_client(service_type, options, factory):
+    """
+    Return the client for `service_type`, built by calling `factory` with the
+    shared session the first time it is requested.
+    """
+    key = (service_type, options.os_region_name) + _session_key(options)
+    with _lock:
+        if key not in _clients:
+            with trace.span('{} client'.format(service_type), 'client'):
+                _clients[key] = factory(get_session(options))
+        return _clients[key]
+
+
+def close_session(options):
+    """
+    Close the session for the credentials and the project to purge in
+    `options` and forget it, along with the clients built on it, once the
+    project is purged.
+    """
+    key = _session_key(options)
+    with _lock:
+        for client_key in [k for k in _clients if k[2:] == key]:
+            del _clients[client_key]
+        sess = _sessions.pop(key, None)
+    if sess is not None:
+        sess.session.close()
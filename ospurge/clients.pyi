@@ -0,0 +1,31 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+from typing import Any
+from typing import Callable
+
+from keystoneauth1 import session
+
+
+def get_session(options: argparse.Namespace) -> session.Session:
+    ...
+
+
+def get_client(
+    service_type: str, options: argparse.Namespace,
+    factory: Callable[[session.Session], Any]
+) -> Any:
+    ...
+
+
+def close_session(options: argparse.Namespace) -> None:
+    ...
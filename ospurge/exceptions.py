@@ -17,3 +17,7 @@ class OSProjectNotFound(Exception):
 
 class TimeoutError(Exception):
     pass
+
+
+class DeletionFailed(Exception):
+    pass
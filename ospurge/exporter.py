@@ -0,0 +1,172 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import logging
+import os
+import threading
+import typing
+
+from ospurge import metrics
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import List  # noqa: F401
+    from typing import Optional  # noqa: F401
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, _escape(v))
+                          for k, v in sorted(labels.items())) + '}'
+
+
+def _bound(bound):
+    return '+Inf' if bound == '+Inf' else repr(float(bound))
+
+
+class _Family(object):
+    def __init__(self, name, kind, help_text):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.samples = []  # type: List[str]
+
+    def add(self, value, suffix='', **labels):
+        self.samples.append('{}{}{} {}'.format(
+            self.name, suffix, _labels(**labels), repr(float(value))))
+
+    def render(self):
+        if not self.samples:
+            return []
+        return ['# HELP {} {}'.format(self.name, self.help),
+                '# TYPE {} {}'.format(self.name, self.kind)] + self.samples
+
+
+def render(stats, running=False):
+    """
+    Render the `Metrics` `stats` in the text format read by the Prometheus
+    node_exporter textfile collector, terminated by the OpenMetrics `# EOF`
+    marker.
+    """
+    report = stats.report()
+
+    duration = _Family('ospurge_duration_seconds', 'gauge',
+                       'Time since the purge started.')
+    duration.add(report['duration_seconds'])
+    running_family = _Family('ospurge_running', 'gauge',
+                             'Whether the purge is still running.')
+    running_family.add(int(running))
+
+    listed = _Family('ospurge_resources_listed_total', 'counter',
+                     'Resources listed by a resource manager.')
+    deleted = _Family('ospurge_resources_deleted_total', 'counter',
+                      'Resources deleted by a resource manager.')
+    operations = _Family(
+        'ospurge_operation_duration_seconds', 'histogram',
+        'Duration of the operations of a resource manager (list, delete, '
+        'prerequisite, poll).')
+    operation_errors = _Family('ospurge_operation_errors_total', 'counter',
+                               'Operations of a resource manager that '
+                               'failed.')
+    waits = _Family('ospurge_wait_seconds_total', 'counter',
+                    'Time a resource manager slept waiting for its '
+                    'prerequisites or for asynchronous deletions.')
+    for manager, entry in sorted(report['managers'].items()):
+        listed.add(entry['listed'], manager=manager)
+        deleted.add(entry['deleted'], manager=manager)
+        for operation, op in sorted(entry['operations'].items()):
+            for bound, count in op['histogram']:
+                operations.add(count, '_bucket', manager=manager,
+                               operation=operation, le=_bound(bound))
+            operations.add(op['count'], '_count', manager=manager,
+                           operation=operation)
+            operations.add(op['total_seconds'], '_sum', manager=manager,
+                           operation=operation)
+            operation_errors.add(op['errors'], manager=manager,
+                                 operation=operation)
+        for reason, seconds in sorted(entry['sleeps'].items()):
+            waits.add(seconds, manager=manager, reason=reason)
+
+    requests = _Family('ospurge_api_request_duration_seconds', 'summary',
+                       'Latency of the requests to an API endpoint.')
+    request_errors = _Family('ospurge_api_request_errors_total', 'counter',
+                             'Requests to an API endpoint that failed.')
+    retries = _Family('ospurge_api_retries_total', 'counter',
+                      'Requests throttled by an API endpoint and retried.')
+    backoff = _Family('ospurge_api_backoff_seconds_total', 'counter',
+                      'Time spent backing off after an API endpoint '
+                      'throttled us.')
+    for endpoint, entry in sorted(report['endpoints'].items()):
+        for quantile, seconds in sorted(entry['quantiles'].items()):
+            requests.add(seconds, endpoint=endpoint, quantile=quantile)
+        requests.add(entry['count'], '_count', endpoint=endpoint)
+        requests.add(entry['total_seconds'], '_sum', endpoint=endpoint)
+        request_errors.add(entry['errors'], endpoint=endpoint)
+        retries.add(entry['throttled'], endpoint=endpoint)
+        backoff.add(entry['backoff_seconds'], endpoint=endpoint)
+
+    lines = []  # type: List[str]
+    for family in (duration, running_family, listed, deleted, operations,
+                   operation_errors, waits, requests, request_errors,
+                   retries, backoff):
+        lines.extend(family.render())
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def write(path, stats, running=False):
+    """
+    Write `stats` to `path`. The file is replaced atomically, so that the
+    collector never reads a partial file.
+    """
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        f.write(render(stats, running))
+    os.rename(tmp_path, path)
+
+
+class TextfileExporter(object):
+    """
+    Write the metrics of the process to `path` every `interval` seconds
+    while the purge runs (--metrics-file), and a last time once it is done.
+    """
+    def __init__(self, path, interval=15):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write(running=True)
+
+    def _write(self, running):
+        try:
+            write(self.path, metrics.get_metrics(), running)
+        except Exception as exc:
+            logging.warning("Can't write metrics to %s: %r", self.path, exc)
+
+    def start(self):
+        self._write(running=True)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._write(running=False)
@@ -0,0 +1,31 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+from ospurge import metrics
+
+
+def render(stats: metrics.Metrics, running: bool=False) -> str:
+    ...
+
+
+def write(path: str, stats: metrics.Metrics, running: bool=False) -> None:
+    ...
+
+
+class TextfileExporter(object):
+    def __init__(self, path: str, interval: float=15) -> None:
+        ...
+
+    def start(self) -> None:
+        ...
+
+    def stop(self) -> None:
+        ...
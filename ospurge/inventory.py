@@ -0,0 +1,84 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import collections
+import concurrent.futures
+import threading
+import time
+
+
+class Inventory(object):
+    """
+    Short-lived cache of the results of `ServiceResource.exists()` called by
+    `check_prerequisite()`, shared by all the resource managers of a project.
+
+    Entries are keyed by (service type, resource type), where the resource
+    type is the name of the `ServiceResource` subclass deleting these
+    resources. Concurrent callers asking for the same entry share a single
+    API call. Entries expire after `ttl` seconds and are invalidated when a
+    resource of their type is deleted.
+
+    During a purge resources only disappear, so a stale entry can only delay
+    a resource manager, never start it too early.
+    """
+    def __init__(self, ttl=5):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # type: dict
+        self._in_flight = {}  # type: dict
+        self._generations = collections.Counter()  # type: collections.Counter
+
+    def exists(self, resource_mngr):
+        """Cached result of `resource_mngr.exists()`."""
+        return self._get(
+            (resource_mngr.SERVICE_TYPE, resource_mngr.__class__.__name__),
+            resource_mngr.exists
+        )
+
+    def _get(self, key, fetch):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                return entry[1]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                owner = False
+            else:
+                owner = True
+                future = concurrent.futures.Future()
+                self._in_flight[key] = future
+                generation = self._generations[key]
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as exc:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            # Don't cache a result that was invalidated while being fetched.
+            if generation == self._generations[key]:
+                self._entries[key] = (time.time(), value)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, service_type, resource_type):
+        key = (service_type, resource_type)
+        with self._lock:
+            self._generations[key] += 1
+            self._entries.pop(key, None)
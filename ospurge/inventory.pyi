@@ -0,0 +1,27 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+from typing import Optional
+
+from ospurge.resources.base import ServiceResource
+
+
+class Inventory(object):
+    def __init__(self, ttl: float=5) -> None:
+        ...
+
+    def exists(self, resource_mngr: ServiceResource) -> bool:
+        ...
+
+    def invalidate(
+        self, service_type: Optional[str], resource_type: str
+    ) -> None:
+        ...
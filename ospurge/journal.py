@@ -0,0 +1,114 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import json
+import logging
+import os
+import threading
+import time
+
+_journals = {}  # type: dict
+_journals_lock = threading.Lock()
+
+
+class Journal(object):
+    """
+    Append-only record of the progress of a purge, so that a purge that
+    crashed or was interrupted can be resumed where it stopped.
+
+    The journal is a file with one JSON object per line, recording either a
+    resource deleted by a resource manager or a resource manager that is
+    done, along with the project they belong to. Lines are flushed as soon
+    as they are written, a truncated last line (the process died while
+    writing it) is ignored when the journal is loaded back.
+
+    A single `Journal` is shared by all the threads of a process.
+    """
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = set()  # type: set
+        self._deleted = set()  # type: set
+        truncated = False
+        if resume and os.path.exists(path):
+            truncated = self._load()
+        self._file = open(path, 'a')
+        if truncated:
+            # Don't append to the truncated line.
+            self._file.write('\n')
+
+    def _load(self):
+        line = '\n'
+        with open(self.path) as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning("Ignoring line %d of journal %s: %r",
+                                    number, self.path, line)
+                    continue
+                key = (record['project'], record['manager'])
+                if record['event'] == 'done':
+                    self._done.add(key)
+                elif record['event'] == 'deleted':
+                    self._deleted.add(key + (record['id'],))
+        return not line.endswith('\n')
+
+    def _write(self, record):
+        record['time'] = time.time()
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def is_done(self, project, manager):
+        """Whether `manager` is recorded as done for `project`."""
+        return (project, manager) in self._done
+
+    def is_deleted(self, project, manager, resource_id):
+        """Whether `manager` is recorded as having deleted `resource_id`."""
+        return (project, manager, resource_id) in self._deleted
+
+    def record_deleted(self, project, manager, resource_id):
+        self._write({'event': 'deleted', 'project': project,
+                     'manager': manager, 'id': resource_id})
+
+    def record_done(self, project, manager):
+        self._write({'event': 'done', 'project': project,
+                     'manager': manager})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def get_journal(options):
+    """
+    Return the `Journal` given with --journal or --resume, or None if there
+    is none. The journal is opened once per process, --resume loads the
+    progress it records.
+    """
+    path = options.resume or options.journal
+    if not path:
+        return None
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = Journal(path, resume=bool(options.resume))
+        return _journals[path]
+
+
+def close_journals():
+    """Close the journals opened by `get_journal()`."""
+    with _journals_lock:
+        journals = list(_journals.values())
+        _journals.clear()
+    for jrnl in journals:
+        jrnl.close()
@@ -0,0 +1,43 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+from typing import Optional
+
+
+class Journal(object):
+    def __init__(self, path: str, resume: bool=False) -> None:
+        ...
+
+    def is_done(self, project: str, manager: str) -> bool:
+        ...
+
+    def is_deleted(self, project: str, manager: str,
+                   resource_id: str) -> bool:
+        ...
+
+    def record_deleted(self, project: str, manager: str,
+                       resource_id: str) -> None:
+        ...
+
+    def record_done(self, project: str, manager: str) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def get_journal(options: argparse.Namespace) -> Optional[Journal]:
+    ...
+
+
+def close_journals() -> None:
+    ...
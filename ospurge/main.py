@@ -11,21 +11,41 @@
 #  License for the specific language governing permissions and limitations
 #  under the License.
 import argparse
+import collections
 import concurrent.futures
+import copy
 import logging
+import multiprocessing
 import operator
 import sys
 import threading
+import time
 import typing
 import traceback
 
 import os_client_config
 import shade
 
+from ospurge import clients
 from ospurge import exceptions
+from ospurge import exporter
+from ospurge import inventory
+from ospurge import journal
+from ospurge import metrics
+from ospurge import pipeline
+from ospurge import plan
+from ospurge import recording
+from ospurge import scheduler
+from ospurge import throttle
+from ospurge import trace
+from ospurge import tracker
 from ospurge import utils
+from ospurge.resources import base
 
 if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import Any  # noqa: F401
+    from typing import Dict  # noqa: F401
+    from typing import List  # noqa: F401
     from typing import Optional  # noqa: F401
 
 
@@ -39,6 +59,38 @@ def configure_logging(verbose):
         'requests.packages.urllib3.connectionpool').setLevel(logging.WARNING)
 
 
+def service_concurrency(value):
+    service_type, sep, limit = value.partition('=')
+    if not sep or not service_type or not limit.isdigit() or \
+            int(limit) < 1:
+        raise argparse.ArgumentTypeError(
+            "'{}' is not of the form SERVICE_TYPE=N".format(value))
+    return service_type, int(limit)
+
+
+def project_names(value):
+    """
+    Return the project `value`, or the projects listed in the file FILE, one
+    per line, if `value` is @FILE.
+    """
+    if not value.startswith('@'):
+        return [value]
+    try:
+        with open(value[1:]) as f:
+            return [line.strip() for line in f if line.strip()]
+    except (IOError, OSError) as exc:
+        raise argparse.ArgumentTypeError(
+            "can't read the projects of '{}': {}".format(value, exc))
+
+
+class AppendProjects(argparse.Action):
+    """Append the projects given to one --purge-project option."""
+    def __call__(self, parser, namespace, values, option_string=None):
+        projects = list(getattr(namespace, self.dest) or [])
+        projects.append([name for names in values for name in names])
+        setattr(namespace, self.dest, projects)
+
+
 def create_argument_parser():
     parser = argparse.ArgumentParser(
         description="Purge resources from an Openstack project."
@@ -74,24 +126,145 @@ def create_argument_parser():
         help="Do not purge the specified resource type. Repeat to exclude "
              "several types at once."
     )
+    parser.add_argument(
+        "--delete-concurrency", type=int, default=8, metavar="N",
+        help="Maximum number of concurrent delete calls against a service. "
+             "Defaults to 8."
+    )
+    parser.add_argument(
+        "--service-concurrency", action="append", type=service_concurrency,
+        metavar="SERVICE_TYPE=N",
+        help="Override --delete-concurrency for one service type (compute, "
+             "network, volume, image, object-store, load-balancer). Repeat "
+             "to override several services."
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, metavar="N",
+        help="Let the number of concurrent requests against a service "
+             "endpoint grow up to N while its latency stays flat. The "
+             "concurrency is cut back when the endpoint answers 429 or 503 "
+             "or slows down. Defaults to the configured concurrency."
+    )
+    parser.add_argument(
+        "--octavia-cascade", action="store_true",
+        help="Delete load balancers along with their listeners and pools "
+             "(Octavia cascade delete) instead of deleting pools, listeners "
+             "and load balancers one stage after the other."
+    )
+    parser.add_argument(
+        "--max-workers", type=int, metavar="N",
+        help="Maximum number of resource managers listing or deleting "
+             "resources at the same time. Defaults to the number of "
+             "selected resource managers."
+    )
+    parser.add_argument(
+        "--engine", choices=["threads", "asyncio"], default="threads",
+        help="How resource managers are run. With 'threads' (the default), "
+             "each resource manager holds a thread while it waits for its "
+             "prerequisites. With 'asyncio', they run as coroutines and "
+             "only their blocking calls use threads."
+    )
+    parser.add_argument(
+        "--project-concurrency", type=int, default=1, metavar="N",
+        help="Number of projects purged concurrently when several projects "
+             "are given to --purge-project. Defaults to 1."
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1, metavar="N",
+        help="Spread the projects given to --purge-project over N worker "
+             "processes, each authenticating once, to use several CPU "
+             "cores. Defaults to 1 (projects are purged by threads of a "
+             "single process, see --project-concurrency)."
+    )
+    parser.add_argument(
+        "--journal", metavar="FILE",
+        help="Record the resources deleted and the resource managers done "
+             "in FILE, so that the purge can be resumed with --resume if "
+             "it is interrupted."
+    )
+    parser.add_argument(
+        "--resume", metavar="FILE",
+        help="Resume the purge recorded in the journal FILE (see "
+             "--journal): resource managers that were done are skipped, "
+             "resources that were deleted are not deleted again. The "
+             "progress is still recorded in FILE."
+    )
+    parser.add_argument(
+        "--plan-out", metavar="FILE",
+        help="With --dry-run, write the resources that would be deleted to "
+             "FILE, one JSON object per line, to review them and delete "
+             "them later with --apply-plan."
+    )
+    parser.add_argument(
+        "--apply-plan", metavar="FILE",
+        help="Delete exactly the resources of the plan FILE written by "
+             "--plan-out, without listing the project again. Resources "
+             "that are already gone are ignored."
+    )
+    parser.add_argument(
+        "--metrics-report", metavar="FILE",
+        help="Write to FILE, at exit, a JSON report of the time spent by "
+             "every resource manager listing, deleting, checking its "
+             "prerequisites and polling, and of the requests made to every "
+             "API endpoint."
+    )
+    parser.add_argument(
+        "--metrics-file", metavar="FILE",
+        help="Write the metrics of the purge to FILE in the Prometheus text "
+             "format, every 15 seconds while it runs and once it is done, "
+             "for the textfile collector of the node_exporter. With "
+             "--processes, the metrics of a project are added once it is "
+             "purged."
+    )
+    parser.add_argument(
+        "--trace-out", metavar="FILE",
+        help="Write to FILE, at exit, a timeline of the purge in the Chrome "
+             "trace-event format (open it with https://ui.perfetto.dev): "
+             "listings, delete calls, prerequisite checks and waits, with "
+             "a track per thread."
+    )
+    parser.add_argument(
+        "--record", metavar="DIR",
+        help="Record the HTTP requests made to the cloud, their responses "
+             "and their latencies in DIR, to replay the purge later with "
+             "--replay. Request headers and bodies and the tokens issued "
+             "by Keystone are not recorded."
+    )
+    parser.add_argument(
+        "--replay", metavar="DIR",
+        help="Answer the HTTP requests with the responses recorded in DIR "
+             "by --record instead of sending them to the cloud, to profile "
+             "or debug a purge offline."
+    )
+    parser.add_argument(
+        "--replay-latency", type=float, default=0.0, metavar="SCALE",
+        help="With --replay, delay every response by its recorded latency "
+             "times SCALE: 1 replays the recorded latencies. Defaults to 0, "
+             "responses are served at once."
+    )
 
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument(
-        "--purge-project", metavar="ID_OR_NAME",
+        "--purge-project", metavar="ID_OR_NAME", dest="purge_projects",
+        action=AppendProjects, nargs="+", type=project_names,
         help="ID or Name of project to purge. This option requires "
-             "to authenticate with admin credentials."
+             "to authenticate with admin credentials. Several projects can "
+             "be given, and read from a file with @FILE, one per line."
     )
     group.add_argument(
         "--purge-own-project", action="store_true",
         help="Purge resources of the project used to authenticate. Useful "
              "if you don't have the admin credentials of the cloud."
     )
+    parser.set_defaults(purge_project=None)
     return parser
 
 
 class CredentialsManager(object):
-    def __init__(self, options):
+    def __init__(self, options, operator_cloud=None, exit=None):
         self.options = options
+        # Set when the purge of the project must stop.
+        self.exit = exit if exit is not None else threading.Event()
 
         self.revoke_role_after_purge = False
         self.disable_project_after_purge = False
@@ -99,12 +272,26 @@ class CredentialsManager(object):
         self.cloud = None  # type: Optional[shade.OpenStackCloud]
         self.operator_cloud = None  # type: Optional[shade.OperatorCloud]
 
+        # Listings shared by the `check_prerequisite()` of all the resource
+        # managers of the project.
+        self.inventory = inventory.Inventory()
+        # Polls the resources whose deletion goes on asynchronously.
+        self.tracker = tracker.DeletionTracker()
+
         if options.purge_own_project:
             self.cloud = shade.openstack_cloud(argparse=options)
+            # Before authenticating, so that the token request is recorded
+            # or replayed too.
+            self.mount(self.cloud)
             self.user_id = self.cloud.keystone_session.get_user_id()
             self.project_id = self.cloud.keystone_session.get_project_id()
         else:
-            self.operator_cloud = shade.operator_cloud(argparse=options)
+            # Reuse the `OperatorCloud`, and its token, of the other projects
+            # purged by the process.
+            if operator_cloud is None:
+                operator_cloud = shade.operator_cloud(argparse=options)
+                self.mount(operator_cloud)
+            self.operator_cloud = operator_cloud
             self.user_id = self.operator_cloud.keystone_session.get_user_id()
 
             project = self.operator_cloud.get_project(options.purge_project)
@@ -126,6 +313,7 @@ class CredentialsManager(object):
                     self.project_id
                 )
             )
+            self.mount(self.cloud)
 
         auth_args = self.cloud.cloud_config.get_auth_args()
         logging.warning(
@@ -134,6 +322,13 @@ class CredentialsManager(object):
             or auth_args.get('project_id')
         )
 
+    def mount(self, cloud):
+        """
+        Adapt the number of concurrent requests made through the session of
+        `cloud` to the load of each endpoint.
+        """
+        throttle.mount(cloud.keystone_session.session, self.options)
+
     def ensure_role_on_project(self):
         if self.operator_cloud and self.operator_cloud.grant_role(
                 self.options.admin_role_name,
@@ -166,68 +361,188 @@ class CredentialsManager(object):
                         "now also disabled", self.options.purge_project)
 
 
-def runner(resource_mngr, options, exit):
-    try:
-
-        if not (options.dry_run or options.resource):
-            resource_mngr.wait_for_check_prerequisite(exit)
-        for resource in resource_mngr.list():
+def delete_resources(resource_mngr, options, exit):
+    """List the resources of `resource_mngr` and delete them."""
+    # If we want to delete only specific resources, many things
+    # can go wrong, so we basically ignore all exceptions.
+    if options.resource:
+        exc = shade.OpenStackCloudException
+    else:
+        exc = shade.OpenStackCloudResourceNotFound
+
+    project = resource_mngr.cleanup_project_id
+    manager = resource_mngr.__class__.__name__
+    jrnl = journal.get_journal(options)
+    writer = plan.get_writer(options)
+    purge_plan = plan.get_plan(options)
+    stats = metrics.get_metrics()
+    if purge_plan is not None:
+        # Resources that were deleted since the plan was written are not
+        # found, which is ignored.
+        resources = resource_mngr.from_plan(
+            purge_plan.resources(project, manager))
+    else:
+        resources = stats.timed_list(manager, resource_mngr.list)
+
+    def resource_id(resource):
+        # Swift objects and containers have no ID.
+        return resource.get('id') or resource_mngr.to_str(resource)
+
+    def record_deleted(resources):
+        stats.record_resources(manager, 'deleted', len(resources))
+        if jrnl is not None:
+            for resource in resources:
+                jrnl.record_deleted(project, manager, resource_id(resource))
+
+    def delete_and_record(resource):
+        with stats.measure(manager, 'delete'):
+            resource_mngr.delete(resource)
+        record_deleted([resource])
+
+    def delete_batch_and_record(resources):
+        with stats.measure(manager, 'delete'):
+            resource_mngr.delete_batch(resources)
+        record_deleted(resources)
+
+    def delete(resource):
+        utils.call_and_ignore_exc(exc, delete_and_record, resource)
+        # Listings of this resource type are now out of date.
+        resource_mngr.inventory.invalidate(
+            resource_mngr.SERVICE_TYPE, resource_mngr.__class__.__name__)
+
+    def delete_batch(resources):
+        utils.call_and_ignore_exc(exc, delete_batch_and_record, resources)
+        resource_mngr.inventory.invalidate(
+            resource_mngr.SERVICE_TYPE, resource_mngr.__class__.__name__)
+
+    batch_size = resource_mngr.delete_batch_size()
+    batch = []  # type: List[Dict[str, Any]]
+
+    with pipeline.make_delete_pool(resource_mngr, options, exit) as pool:
+        for resource in resources:
             # No need to continue if requested to exit.
             if exit.is_set():
                 return
 
+            if jrnl is not None and jrnl.is_deleted(
+                    project, manager, resource_id(resource)):
+                # Deleted before the purge was resumed, its deletion may
+                # still be going on.
+                resource_mngr.skip(resource)
+                continue
+
             if resource_mngr.should_delete(resource):
                 logging.info("Going to delete %s",
                              resource_mngr.to_str(resource))
 
-                # If we are in dry run mode, don't actually delete the resource
+                # If we are in dry run mode, don't actually delete the
+                # resource
                 if options.dry_run:
+                    if writer is not None:
+                        writer.write(project, manager,
+                                     resource_mngr.to_str(resource), resource)
                     continue
 
-                # If we want to delete only specific resources, many things
-                # can go wrong, so we basically ignore all exceptions.
-                if options.resource:
-                    exc = shade.OpenStackCloudException
+                if batch_size > 1:
+                    batch.append(resource)
+                    if len(batch) >= batch_size:
+                        pool.submit(delete_batch, batch)
+                        batch = []
                 else:
-                    exc = shade.OpenStackCloudResourceNotFound
-
-                utils.call_and_ignore_exc(exc, resource_mngr.delete, resource)
-
-    except Exception as exc:
-        log = logging.error
-        recoverable = False
-        #traceback.print_exc()
-        def is_exception_recoverable(exc):
-            if exc.__class__.__name__.lower().endswith('endpointnotfound'):
+                    pool.submit(delete, resource)
+
+        if batch:
+            pool.submit(delete_batch, batch)
+
+    if not options.dry_run:
+        with stats.sleeping(manager, 'deletions'):
+            resource_mngr.wait_for_deletions(exit)
+        if jrnl is not None and not exit.is_set():
+            jrnl.record_done(project, manager)
+
+
+def handle_runner_error(resource_mngr, exc, exit):
+    """
+    Log the exception raised while dealing with `resource_mngr` and set
+    `exit`, unless the service is just not available.
+    """
+    log = logging.error
+    recoverable = False
+    #traceback.print_exc()
+    def is_exception_recoverable(exc):
+        if exc.__class__.__name__.lower().endswith('endpointnotfound'):
+            return True
+        elif hasattr(exc, 'inner_exception'):
+            # inner_exception is a tuple (type, value, traceback)
+            # mypy complains: "Exception" has no attribute
+            # "inner_exception"
+            exc_info = exc.inner_exception  # type: ignore
+            if exc_info[0].__name__.lower().endswith('endpointnotfound'):
                 return True
-            elif hasattr(exc, 'inner_exception'):
-                # inner_exception is a tuple (type, value, traceback)
-                # mypy complains: "Exception" has no attribute
-                # "inner_exception"
-                exc_info = exc.inner_exception  # type: ignore
-                if exc_info[0].__name__.lower().endswith('endpointnotfound'):
-                    return True
-            return False
-
-        if is_exception_recoverable(exc):
-            log = logging.info
-            recoverable = True
-        log("Can't deal with %s: %r", resource_mngr.__class__.__name__, exc)
-        if not recoverable:
-            exit.set()
+        return False
 
+    if is_exception_recoverable(exc):
+        log = logging.info
+        recoverable = True
+    log("Can't deal with %s: %r", resource_mngr.__class__.__name__, exc)
+    if not recoverable:
+        exit.set()
 
-@utils.monkeypatch_oscc_logging_warning
-def main():
-    parser = create_argument_parser()
 
-    cloud_config = os_client_config.OpenStackConfig()
-    cloud_config.register_argparse_arguments(parser, sys.argv)
+def check_prerequisite(resource_mngr, options, exit, deadline):
+    """
+    Check the prerequisites of `resource_mngr` for the scheduler. Return
+    True when it can start, False to check again later, and None to give up
+    on error or once `deadline` is passed.
+    """
+    if options.dry_run or options.resource:
+        return True
+    try:
+        with metrics.get_metrics().measure(resource_mngr.__class__.__name__,
+                                           'prerequisite'):
+            ready = resource_mngr.check_prerequisite()
+        if ready:
+            return True
+        if time.time() >= deadline:
+            raise exceptions.TimeoutError(
+                "Timeout exceeded waiting for check_prerequisite()")
+    except Exception as exc:
+        handle_runner_error(resource_mngr, exc, exit)
+        return None
+    logging.info("Waiting for check_prerequisite() in %s",
+                 resource_mngr.__class__.__name__)
+    return False
 
-    options = parser.parse_args()
-    configure_logging(options.verbose)
 
-    creds_manager = CredentialsManager(options=options)
+def runner(resource_mngr, options, exit):
+    """
+    Delete the resources of `resource_mngr`, whose prerequisites were met
+    (see `check_prerequisite()`).
+    """
+    try:
+        delete_resources(resource_mngr, options, exit)
+
+    except Exception as exc:
+        handle_runner_error(resource_mngr, exc, exit)
+
+
+def projects_to_purge(options):
+    """Return the projects given with --purge-project, without duplicates."""
+    projects = []  # type: List[str]
+    for values in options.purge_projects or []:
+        for project in values:
+            if project not in projects:
+                projects.append(project)
+    return projects
+
+
+def purge(options, exit, operator_cloud=None):
+    """
+    Purge the project of `options`. `exit` is set if something went wrong.
+    """
+    creds_manager = CredentialsManager(options=options,
+                                       operator_cloud=operator_cloud,
+                                       exit=exit)
     creds_manager.ensure_enabled_project()
     creds_manager.ensure_role_on_project()
 
@@ -237,20 +552,62 @@ def main():
         key=operator.methodcaller('order')
     )
 
-    # This is an `Event` used to signal whether one of the threads encountered
-    # an unrecoverable error, at which point all threads should exit because
-    # otherwise there's a chance the cleanup process never finishes.
-    exit = threading.Event()
+    # Skip the resource managers that were done before the purge was
+    # resumed. The scheduler doesn't wait for unselected dependencies.
+    jrnl = journal.get_journal(options)
+    if jrnl is not None:
+        for resource_manager in list(resource_managers):
+            name = resource_manager.__class__.__name__
+            if jrnl.is_done(creds_manager.project_id, name):
+                logging.info("Skipping %s, done according to the journal",
+                             name)
+                resource_managers.remove(resource_manager)
+
+    # Only the resource managers with resources in the plan have something
+    # to do.
+    purge_plan = plan.get_plan(options)
+    if purge_plan is not None:
+        planned = purge_plan.managers(creds_manager.project_id)
+        resource_managers = [
+            resource_manager for resource_manager in resource_managers
+            if resource_manager.__class__.__name__ in planned
+        ]
+
+    # Start every resource manager as soon as the resource managers it
+    # depends on are done, instead of having them all poll the cloud.
+    dependency_scheduler = scheduler.DependencyScheduler(
+        resource_managers, exit)
+
+    # Dummy functions so that the scheduler only has to pass the resource
+    # manager. The scheduler checks the prerequisites itself, so that
+    # resource managers waiting for them don't hold a thread.
+    deadlines = {}  # type: Dict[str, float]
+
+    def partial_check_prerequisite(resource_manager):
+        deadline = deadlines.setdefault(
+            resource_manager.__class__.__name__,
+            time.time() + base.PREREQUISITE_TIMEOUT)
+        return check_prerequisite(
+            resource_manager, options, exit, deadline)  # pragma: no cover
 
-    # Dummy function to work around `ThreadPoolExecutor.map()` not accepting
-    # a callable with arguments.
     def partial_runner(resource_manager):
         runner(resource_manager, options=options,
                exit=exit)  # pragma: no cover
 
+    # Enough threads for all the selected resource managers to run at once,
+    # unless limited with --max-workers.
+    max_workers = options.max_workers or max(len(resource_managers), 1)
+
     try:
-        with concurrent.futures.ThreadPoolExecutor(8) as executor:
-            executor.map(partial_runner, resource_managers)
+        if options.engine == 'asyncio':
+            # Imported here, the engine requires Python 3.5.
+            from ospurge import aio
+            aio.run(dependency_scheduler, options, exit, max_workers)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers) as executor:
+                dependency_scheduler.run(executor, partial_runner,
+                                         partial_check_prerequisite)
     except KeyboardInterrupt:
         exit.set()
 
@@ -260,7 +617,180 @@ def main():
     if creds_manager.disable_project_after_purge:
         creds_manager.disable_project()
 
-    sys.exit(int(exit.is_set()))
+
+def purge_project(options, project, exit, operator_cloud):
+    """Purge `project` with a copy of `options`, logging any error."""
+    project_options = copy.copy(options)
+    project_options.purge_project = project
+    try:
+        purge(project_options, exit, operator_cloud)
+    except Exception as exc:
+        logging.error("Can't purge project '%s': %r", project, exc)
+        exit.set()
+    finally:
+        # Don't keep the connections and clients of every purged project.
+        clients.close_session(project_options)
+
+
+# `OperatorCloud` of a worker process of --processes, shared by all the
+# projects the worker purges.
+_worker_operator_cloud = None  # type: Optional[shade.OperatorCloud]
+
+
+def purge_in_worker(options, project):
+    """
+    Purge `project` in a worker process of --processes. Return whether the
+    purge failed, the metrics recorded while purging it and, with
+    --trace-out, the trace events.
+    """
+    global _worker_operator_cloud
+    configure_logging(options.verbose)
+    if _worker_operator_cloud is None:
+        _worker_operator_cloud = shade.operator_cloud(argparse=options)
+        throttle.mount(_worker_operator_cloud.keystone_session.session,
+                       options)
+
+    exit = threading.Event()
+    metrics.collect()
+    tracer = trace.enable() if options.trace_out else None
+    purge_project(options, project, exit, _worker_operator_cloud)
+    events = tracer.events() if tracer is not None else []
+    return exit.is_set(), metrics.collect(), events
+
+
+def purge_projects(options, projects):
+    """
+    Purge `projects` concurrently, up to --project-concurrency at a time,
+    with the same admin credentials. With --processes, the projects are
+    spread over worker processes instead, each authenticating once. Return
+    the `exit` event of every project.
+    """
+    # An `Event` per project, so that a failure in a project doesn't stop
+    # the purge of the others.
+    exits = collections.OrderedDict(
+        (project, threading.Event()) for project in projects)
+
+    if options.processes > 1 and len(projects) > 1:
+        # Each process has its own GIL, so that decoding the responses of
+        # thousands of concurrent calls isn't bound to a single core. The
+        # workers are spawned rather than forked, as this process already
+        # runs threads (e.g. the exporter of --metrics-file).
+        executor = concurrent.futures.ProcessPoolExecutor(
+            min(options.processes, len(projects)),
+            mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {executor.submit(purge_in_worker, options, project):
+                       project for project in projects}
+            for future in concurrent.futures.as_completed(futures):
+                project = futures[future]
+                try:
+                    failed, worker_metrics, events = future.result()
+                    metrics.get_metrics().merge(worker_metrics)
+                    if trace.get_tracer() is not None:
+                        trace.get_tracer().merge(events)
+                except Exception as exc:
+                    logging.error("Can't purge project '%s': %r",
+                                  project, exc)
+                    failed = True
+                if failed:
+                    exits[project].set()
+        except KeyboardInterrupt:
+            for exit in exits.values():
+                exit.set()
+        finally:
+            executor.shutdown(wait=True)
+    else:
+        # Authenticate once, the token is reused for all the projects.
+        operator_cloud = shade.operator_cloud(argparse=options)
+        throttle.mount(operator_cloud.keystone_session.session, options)
+
+        if len(projects) == 1:
+            purge_project(options, projects[0], exits[projects[0]],
+                          operator_cloud)
+            return exits
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max(options.project_concurrency, 1))
+        try:
+            concurrent.futures.wait([
+                executor.submit(
+                    purge_project, options, project, exit, operator_cloud)
+                for project, exit in exits.items()
+            ])
+        except KeyboardInterrupt:
+            for exit in exits.values():
+                exit.set()
+        finally:
+            executor.shutdown(wait=True)
+
+    for project, exit in exits.items():
+        logging.warning("Project '%s': %s", project,
+                        "FAILED" if exit.is_set() else "purged")
+    return exits
+
+
+def write_metrics_report(options):
+    """Write the report of --metrics-report, if requested."""
+    if options.metrics_report:
+        metrics.get_metrics().write_report(options.metrics_report)
+
+
+@utils.monkeypatch_oscc_logging_warning
+def main():
+    parser = create_argument_parser()
+
+    cloud_config = os_client_config.OpenStackConfig()
+    cloud_config.register_argparse_arguments(parser, sys.argv)
+
+    options = parser.parse_args()
+    configure_logging(options.verbose)
+
+    if options.plan_out:
+        if not options.dry_run:
+            parser.error("--plan-out requires --dry-run")
+        # Start a new plan, the projects are appended to it.
+        open(options.plan_out, 'w').close()
+
+    if options.record and options.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    if options.replay:
+        try:
+            recording.get_replayer(options)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if options.trace_out:
+        trace.enable()
+
+    textfile = None
+    if options.metrics_file:
+        # Updated while the purge runs, for the textfile collector of the
+        # Prometheus node_exporter.
+        textfile = exporter.TextfileExporter(options.metrics_file)
+        textfile.start()
+
+    try:
+        if options.purge_own_project:
+            # This is an `Event` used to signal whether one of the threads
+            # encountered an unrecoverable error, at which point all threads
+            # should exit because otherwise there's a chance the cleanup
+            # process never finishes.
+            exit = threading.Event()
+            purge(options, exit)
+            failed = exit.is_set()
+        else:
+            exits = purge_projects(options, projects_to_purge(options))
+            failed = any(exit.is_set() for exit in exits.values())
+    finally:
+        journal.close_journals()
+        plan.close_writers()
+        recording.close_recorders()
+        if textfile is not None:
+            textfile.stop()
+        write_metrics_report(options)
+        if options.trace_out:
+            trace.get_tracer().write(options.trace_out)
+    sys.exit(int(failed))
 
 
 if __name__ == "__main__":  # pragma: no cover
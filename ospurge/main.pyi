@@ -13,8 +13,15 @@
 import argparse
 import threading
 import typing
+from typing import Any
+from typing import Dict
+from typing import List
 from typing import Optional  # noqa: F401
+from typing import Tuple
 
+import shade
+
+from ospurge import metrics
 from ospurge.resources.base import ServiceResource
 from ospurge import utils
 
@@ -23,12 +30,34 @@ def configure_logging(verbose: bool) -> None:
     ...
 
 
+def service_concurrency(value: str) -> Tuple[str, int]:
+    ...
+
+
+def project_names(value: str) -> List[str]:
+    ...
+
+
+class AppendProjects(argparse.Action):
+    def __call__(self, parser: argparse.ArgumentParser,
+                 namespace: argparse.Namespace, values: List[List[str]],
+                 option_string: Optional[str] = None) -> None:
+        ...
+
+
 def create_argument_parser() -> argparse.ArgumentParser:
     ...
 
 
 class CredentialsManager(object):
-    def __init__(self, options: argparse.Namespace) -> None:
+    def __init__(
+        self, options: argparse.Namespace,
+        operator_cloud: Optional[shade.OperatorCloud]=None,
+        exit: Optional[threading.Event]=None
+    ) -> None:
+        ...
+
+    def mount(self, cloud: shade.OpenStackCloud) -> None:
         ...
 
     def ensure_role_on_project(self) -> None:
@@ -44,6 +73,26 @@ class CredentialsManager(object):
         ...
 
 
+def delete_resources(
+        resource_mngr: ServiceResource, options: argparse.Namespace,
+        exit: threading.Event
+) -> None:
+    ...
+
+
+def handle_runner_error(
+        resource_mngr: ServiceResource, exc: Exception, exit: threading.Event
+) -> None:
+    ...
+
+
+def check_prerequisite(
+        resource_mngr: ServiceResource, options: argparse.Namespace,
+        exit: threading.Event, deadline: float
+) -> Optional[bool]:
+    ...
+
+
 def runner(
         resource_mngr: ServiceResource, options: argparse.Namespace,
         exit: threading.Event
@@ -51,6 +100,40 @@ def runner(
     ...
 
 
+def projects_to_purge(options: argparse.Namespace) -> List[str]:
+    ...
+
+
+def purge(
+    options: argparse.Namespace, exit: threading.Event,
+    operator_cloud: Optional[shade.OperatorCloud]=None
+) -> None:
+    ...
+
+
+def purge_project(
+    options: argparse.Namespace, project: str, exit: threading.Event,
+    operator_cloud: shade.OperatorCloud
+) -> None:
+    ...
+
+
+def purge_in_worker(
+    options: argparse.Namespace, project: str
+) -> Tuple[bool, metrics.Metrics, List[Dict[str, Any]]]:
+    ...
+
+
+def purge_projects(
+    options: argparse.Namespace, projects: List[str]
+) -> Dict[str, threading.Event]:
+    ...
+
+
+def write_metrics_report(options: argparse.Namespace) -> None:
+    ...
+
+
 @utils.monkeypatch_oscc_logging_warning
 def main() -> None:
     ...
@@ -0,0 +1,282 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import contextlib
+import json
+import threading
+import time
+import timeit
+
+from ospurge import trace
+
+# Clock measuring durations, not affected by changes of the system time.
+clock = timeit.default_timer
+
+# Upper bounds, in seconds, of the buckets of the latency histograms.
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+           float('inf'))
+
+# Latency quantiles estimated from the histograms.
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Stats(object):
+    """Call count, error count and latency histogram of an operation."""
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds, error=False):
+        self.count += 1
+        if error:
+            self.errors += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def quantile(self, q):
+        """
+        Estimate the `q` quantile of the latencies, interpolating linearly
+        within the histogram bucket it falls in.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(BUCKETS, self.buckets):
+            if count and seen + count >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else 0.0,
+            'max_seconds': self.max,
+            # Cumulative counts, like Prometheus histograms.
+            'histogram': [
+                ['+Inf' if bound == float('inf') else bound,
+                 sum(self.buckets[:i + 1])]
+                for i, bound in enumerate(BUCKETS)
+            ],
+            'quantiles': {str(q): self.quantile(q) for q in QUANTILES},
+        }
+
+
+class Metrics(object):
+    """
+    Where a purge spends its time, shared by all the threads of a process.
+
+    For every resource manager and every operation (`list`, `delete`,
+    `prerequisite` check, deletion `poll`) it records the call count, the
+    error count and a latency histogram, along with the time the resource
+    manager spent sleeping, waiting for its prerequisites or for
+    asynchronous deletions. Every HTTP request made through the throttled
+    sessions is recorded per endpoint, along with the time spent backing off
+    when the endpoint throttled us.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._operations = {}  # type: dict
+        self._requests = {}  # type: dict
+        self._backoffs = {}  # type: dict
+        self._sleeps = {}  # type: dict
+        self._resources = {}  # type: dict
+
+    def record(self, manager, operation, seconds, error=False):
+        with self._lock:
+            self._operations.setdefault(
+                (manager, operation), Stats()).add(seconds, error)
+
+    def record_resources(self, manager, event, count=1):
+        """Count `count` resources `listed` or `deleted` by `manager`."""
+        with self._lock:
+            key = (manager, event)
+            self._resources[key] = self._resources.get(key, 0) + count
+
+    def record_request(self, endpoint, seconds, error=False):
+        with self._lock:
+            self._requests.setdefault(endpoint, Stats()).add(seconds, error)
+
+    def record_backoff(self, endpoint, seconds):
+        """Record that a request to `endpoint` was throttled and retried
+        after sleeping `seconds`."""
+        with self._lock:
+            count, total = self._backoffs.get(endpoint, (0, 0.0))
+            self._backoffs[endpoint] = (count + 1, total + seconds)
+
+    def record_sleep(self, manager, reason, seconds):
+        """Record that `manager` slept `seconds` waiting for `reason`
+        (`prerequisite` or `deletions`)."""
+        with self._lock:
+            key = (manager, reason)
+            self._sleeps[key] = self._sleeps.get(key, 0.0) + seconds
+        tracer = trace.get_tracer()
+        if tracer is not None:
+            now = time.time()
+            tracer.wait(manager, reason, now - seconds, now)
+
+    @contextlib.contextmanager
+    def measure(self, manager, operation):
+        """Record the duration of the block, as an error if it raises."""
+        start = clock()
+        try:
+            with trace.span('{} {}'.format(manager, operation), operation):
+                yield
+        except Exception:
+            self.record(manager, operation, clock() - start, error=True)
+            raise
+        self.record(manager, operation, clock() - start)
+
+    @contextlib.contextmanager
+    def sleeping(self, manager, reason):
+        """Record the duration of the block as time `manager` slept
+        waiting for `reason`."""
+        start = clock()
+        try:
+            yield
+        finally:
+            self.record_sleep(manager, reason, clock() - start)
+
+    def timed_list(self, manager, list_resources):
+        """
+        Iterate over `list_resources()`, recording the time spent listing as
+        a single `list` operation. The time the caller spends between two
+        resources is not counted.
+        """
+        total = 0.0
+        error = False
+        started = time.time()
+        start = clock()
+        try:
+            resources = iter(list_resources())
+            while True:
+                try:
+                    resource = next(resources)
+                except StopIteration:
+                    return
+                finally:
+                    total += clock() - start
+                self.record_resources(manager, 'listed')
+                yield resource
+                start = clock()
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.record(manager, 'list', total, error)
+            tracer = trace.get_tracer()
+            if tracer is not None:
+                tracer.complete('{} list'.format(manager), 'list', started,
+                                time.time())
+
+    def merge(self, other):
+        """Add the metrics recorded by `other`, from another process."""
+        with self._lock:
+            self.started = min(self.started, other.started)
+            for mine, theirs in ((self._operations, other._operations),
+                                 (self._requests, other._requests)):
+                for key, stats in theirs.items():
+                    mine.setdefault(key, Stats()).merge(stats)
+            for key, seconds in other._sleeps.items():
+                self._sleeps[key] = self._sleeps.get(key, 0.0) + seconds
+            for key, count in other._resources.items():
+                self._resources[key] = self._resources.get(key, 0) + count
+            for endpoint, (count, total) in other._backoffs.items():
+                mine_count, mine_total = self._backoffs.get(
+                    endpoint, (0, 0.0))
+                self._backoffs[endpoint] = (mine_count + count,
+                                            mine_total + total)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def report(self):
+        with self._lock:
+            managers = {}  # type: dict
+            for (manager, operation), stats in self._operations.items():
+                managers.setdefault(manager, {'operations': {}, 'sleeps': {}})
+                managers[manager]['operations'][operation] = stats.to_dict()
+            for (manager, reason), seconds in self._sleeps.items():
+                managers.setdefault(manager, {'operations': {}, 'sleeps': {}})
+                managers[manager]['sleeps'][reason] = seconds
+            for (manager, event), count in self._resources.items():
+                managers.setdefault(manager, {'operations': {}, 'sleeps': {}})
+                managers[manager][event] = count
+
+            endpoints = {}  # type: dict
+            for endpoint, stats in self._requests.items():
+                endpoints[endpoint] = stats.to_dict()
+            for endpoint, (count, total) in self._backoffs.items():
+                entry = endpoints.setdefault(endpoint, Stats().to_dict())
+                entry['throttled'] = count
+                entry['backoff_seconds'] = total
+
+        for entry in managers.values():
+            entry.setdefault('listed', 0)
+            entry.setdefault('deleted', 0)
+            entry['working_seconds'] = sum(
+                op['total_seconds'] for op in entry['operations'].values())
+            entry['sleeping_seconds'] = sum(entry['sleeps'].values())
+        for entry in endpoints.values():
+            entry.setdefault('throttled', 0)
+            entry.setdefault('backoff_seconds', 0.0)
+        return {
+            'duration_seconds': time.time() - self.started,
+            'managers': managers,
+            'endpoints': endpoints,
+        }
+
+    def write_report(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Return the `Metrics` of the process."""
+    return _metrics
+
+
+def collect():
+    """Return the `Metrics` recorded so far and start new ones."""
+    global _metrics
+    collected, _metrics = _metrics, Metrics()
+    return collected
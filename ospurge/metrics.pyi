@@ -0,0 +1,91 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+from typing import Any
+from typing import Callable
+from typing import ContextManager
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Tuple
+
+clock = ...  # type: Callable[[], float]
+BUCKETS = ...  # type: Tuple[float, ...]
+QUANTILES = ...  # type: Tuple[float, ...]
+
+
+class Stats(object):
+    def __init__(self) -> None:
+        ...
+
+    def add(self, seconds: float, error: bool=False) -> None:
+        ...
+
+    def merge(self, other: 'Stats') -> None:
+        ...
+
+    def quantile(self, q: float) -> float:
+        ...
+
+    def to_dict(self) -> Dict[str, Any]:
+        ...
+
+
+class Metrics(object):
+    def __init__(self) -> None:
+        ...
+
+    def record(self, manager: str, operation: str, seconds: float,
+               error: bool=False) -> None:
+        ...
+
+    def record_resources(self, manager: str, event: str,
+                         count: int=1) -> None:
+        ...
+
+    def record_request(self, endpoint: str, seconds: float,
+                       error: bool=False) -> None:
+        ...
+
+    def record_backoff(self, endpoint: str, seconds: float) -> None:
+        ...
+
+    def record_sleep(self, manager: str, reason: str,
+                     seconds: float) -> None:
+        ...
+
+    def measure(self, manager: str, operation: str) -> ContextManager[None]:
+        ...
+
+    def sleeping(self, manager: str, reason: str) -> ContextManager[None]:
+        ...
+
+    def timed_list(
+        self, manager: str, list_resources: Callable[[], Iterable[Any]]
+    ) -> Iterator[Any]:
+        ...
+
+    def merge(self, other: 'Metrics') -> None:
+        ...
+
+    def report(self) -> Dict[str, Any]:
+        ...
+
+    def write_report(self, path: str) -> None:
+        ...
+
+
+def get_metrics() -> Metrics:
+    ...
+
+
+def collect() -> Metrics:
+    ...
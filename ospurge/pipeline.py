@@ -0,0 +1,122 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import threading
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import Optional  # noqa: F401
+
+_service_semaphores = {}  # type: dict
+_service_semaphores_lock = threading.Lock()
+
+
+def get_service_semaphore(service_type, limit):
+    """
+    Return the semaphore bounding the number of concurrent delete calls
+    against `service_type`. It is shared by all the resource managers of the
+    service, the first caller deciding of the limit.
+    """
+    with _service_semaphores_lock:
+        if service_type not in _service_semaphores:
+            _service_semaphores[service_type] = threading.BoundedSemaphore(
+                limit)
+        return _service_semaphores[service_type]
+
+
+def get_service_concurrency(service_type, options):
+    """
+    Return how many delete calls can run concurrently against `service_type`,
+    given the `--delete-concurrency` and `--service-concurrency` options.
+    """
+    limits = dict(options.service_concurrency or [])
+    return max(limits.get(service_type, options.delete_concurrency), 1)
+
+
+def make_delete_pool(resource_mngr, options, exit):
+    """Return the `DeletePool` to use to delete the resources of
+    `resource_mngr`."""
+    limit = get_service_concurrency(resource_mngr.SERVICE_TYPE, options)
+    # Let the adaptive limiters of the endpoints raise the concurrency up to
+    # --max-concurrency.
+    limit = max(limit, options.max_concurrency or 0)
+    return DeletePool(
+        limit, exit,
+        get_service_semaphore(resource_mngr.SERVICE_TYPE, limit)
+    )
+
+
+class DeletePool(object):
+    """
+    Run the delete calls of a resource manager in up to `workers` threads,
+    while the caller keeps listing resources.
+
+    The caller is the producer: it lists the resources and submits their
+    deletion, the workers are the consumers. At most twice as many calls as
+    workers can be pending, `submit()` blocks beyond that so that resources
+    are listed only as fast as they are deleted and memory use doesn't
+    depend on the number of resources. With a single worker, calls are
+    still made in the order they were submitted.
+
+    Calls are skipped once the `exit` event is set or once a previous call
+    raised. The first exception raised by a call is re-raised by the next
+    `submit()` or by `join()`, so that the caller can handle it exactly like
+    if the call had been made inline.
+    """
+    def __init__(self, workers, exit, semaphore=None):
+        self.exit = exit
+        self.semaphore = semaphore
+        self.error = None  # type: Optional[BaseException]
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.slots = threading.BoundedSemaphore(workers * 2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.join()
+        else:
+            # Don't hide the exception being raised behind an error of a
+            # delete call.
+            self.executor.shutdown(wait=True)
+
+    def _call(self, f, *args):
+        # Calls can stay queued for a while, don't make them if, in the
+        # meantime, we were asked to exit or another call failed.
+        if self.exit.is_set() or self.error is not None:
+            return
+        if self.semaphore is None:
+            f(*args)
+        else:
+            with self.semaphore:
+                f(*args)
+
+    def _done(self, future):
+        self.slots.release()
+        exc = future.exception()
+        if exc is not None and self.error is None:
+            self.error = exc
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def submit(self, f, *args):
+        self.raise_error()
+        self.slots.acquire()
+        future = self.executor.submit(self._call, f, *args)
+        future.add_done_callback(self._done)
+
+    def join(self):
+        self.executor.shutdown(wait=True)
+        self.raise_error()
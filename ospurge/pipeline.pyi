@@ -0,0 +1,60 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+import threading
+from typing import Any
+from typing import Callable
+from typing import Optional
+
+from ospurge.resources.base import ServiceResource
+
+
+def get_service_semaphore(
+    service_type: Optional[str], limit: int
+) -> threading.BoundedSemaphore:
+    ...
+
+
+def get_service_concurrency(
+    service_type: Optional[str], options: argparse.Namespace
+) -> int:
+    ...
+
+
+def make_delete_pool(
+    resource_mngr: ServiceResource, options: argparse.Namespace,
+    exit: threading.Event
+) -> 'DeletePool':
+    ...
+
+
+class DeletePool(object):
+    def __init__(
+        self, workers: int, exit: threading.Event,
+        semaphore: Optional[threading.BoundedSemaphore]=None
+    ) -> None:
+        ...
+
+    def __enter__(self) -> 'DeletePool':
+        ...
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        ...
+
+    def raise_error(self) -> None:
+        ...
+
+    def submit(self, f: Callable, *args: Any) -> None:
+        ...
+
+    def join(self) -> None:
+        ...
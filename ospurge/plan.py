@@ -0,0 +1,108 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import collections
+import json
+import threading
+
+_writers = {}  # type: dict
+_plans = {}  # type: dict
+_lock = threading.Lock()
+
+
+class PlanWriter(object):
+    """
+    Write the resources a dry run would delete to a plan, one JSON object
+    per line, so that they can be reviewed and deleted later with
+    `--apply-plan` without listing the project again.
+
+    Every line holds the project, the resource manager, the description of
+    the resource given by `to_str()` and the resource itself. Lines are
+    appended as resource managers list their resources, so that they come
+    in dependency order. A single `PlanWriter` is shared by all the threads
+    of a process.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def write(self, project, manager, description, resource):
+        line = json.dumps({'project': project, 'manager': manager,
+                           'description': description, 'resource': resource},
+                          sort_keys=True, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Plan(object):
+    """The resources of a plan written by `PlanWriter`, per resource
+    manager."""
+    def __init__(self, path):
+        self.path = path
+        self._resources = collections.OrderedDict()  # type: dict
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._resources.setdefault(
+                    (record['project'], record['manager']), []
+                ).append(record['resource'])
+
+    def managers(self, project):
+        """Names of the resource managers with resources of `project`."""
+        return [manager for p, manager in self._resources if p == project]
+
+    def resources(self, project, manager):
+        """Resources of `project` to delete with `manager`, in the order
+        they were listed."""
+        return list(self._resources.get((project, manager), []))
+
+
+def get_writer(options):
+    """
+    Return the `PlanWriter` of --plan-out, or None if there is none. The plan
+    is opened once per process.
+    """
+    if not options.plan_out:
+        return None
+    with _lock:
+        if options.plan_out not in _writers:
+            _writers[options.plan_out] = PlanWriter(options.plan_out)
+        return _writers[options.plan_out]
+
+
+def close_writers():
+    """Close the plans opened by `get_writer()`."""
+    with _lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def get_plan(options):
+    """
+    Return the `Plan` of --apply-plan, or None if there is none. The plan is
+    loaded once per process.
+    """
+    if not options.apply_plan:
+        return None
+    with _lock:
+        if options.apply_plan not in _plans:
+            _plans[options.apply_plan] = Plan(options.apply_plan)
+        return _plans[options.apply_plan]
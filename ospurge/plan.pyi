@@ -0,0 +1,52 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+class PlanWriter(object):
+    def __init__(self, path: str) -> None:
+        ...
+
+    def write(self, project: str, manager: str, description: str,
+              resource: Dict[str, Any]) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class Plan(object):
+    def __init__(self, path: str) -> None:
+        ...
+
+    def managers(self, project: str) -> List[str]:
+        ...
+
+    def resources(self, project: str,
+                  manager: str) -> List[Dict[str, Any]]:
+        ...
+
+
+def get_writer(options: argparse.Namespace) -> Optional[PlanWriter]:
+    ...
+
+
+def close_writers() -> None:
+    ...
+
+
+def get_plan(options: argparse.Namespace) -> Optional[Plan]:
+    ...
@@ -0,0 +1,254 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import base64
+import collections
+import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests import adapters
+from requests import structures
+from six.moves.urllib import parse as urllib_parse
+
+# Response headers that are not recorded as is: the tokens issued by
+# Keystone.
+SECRET_HEADERS = ('X-Subject-Token',)
+
+_recorders = {}  # type: dict
+_replayers = {}  # type: dict
+_lock = threading.Lock()
+
+
+def request_key(method, url):
+    """The method and the URL of a request, with its query sorted."""
+    parts = urllib_parse.urlsplit(url)
+    query = urllib_parse.urlencode(sorted(
+        urllib_parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return method, urllib_parse.urlunsplit(parts._replace(query=query))
+
+
+class Recorder(object):
+    """
+    Record the HTTP requests made by the process and their responses in
+    `directory`, one JSON object per line (--record).
+
+    Every process writes its own file. Request headers and bodies are not
+    recorded, as they hold the credentials, and neither are the tokens
+    issued by Keystone.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = os.path.join(directory, '{}.jsonl'.format(os.getpid()))
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a')
+
+    def record(self, request, response, started, elapsed):
+        """Record `response`, answered to `request` `elapsed` seconds after
+        `started` (as returned by `time.time()`)."""
+        headers = {
+            name: 'recorded' if name in SECRET_HEADERS else value
+            for name, value in response.headers.items()
+        }
+        record = {
+            'method': request.method, 'url': request.url,
+            'status': response.status_code, 'reason': response.reason,
+            'headers': headers, 'started': started, 'elapsed': elapsed,
+        }
+        content = response.content or b''
+        try:
+            record['body'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            record['body_base64'] = base64.b64encode(content).decode('ascii')
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Replayer(object):
+    """
+    Answer the HTTP requests with the responses recorded by `Recorder` in
+    `directory`, without any network access (--replay).
+
+    The responses to a request (method and URL) are served in the order they
+    were recorded, the last one being served again once they are exhausted,
+    so that polls and retries get the answers they got when recording.
+    Every response is delayed by its recorded latency times
+    `latency_scale`.
+    """
+    def __init__(self, directory, latency_scale=0.0):
+        self.directory = directory
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._responses = {}  # type: dict
+        self._missing = set()  # type: set
+
+        records = []
+        for path in glob.glob(os.path.join(directory, '*.jsonl')):
+            with open(path) as f:
+                records.extend(json.loads(line) for line in f
+                               if line.strip())
+        if not records:
+            raise ValueError(
+                "No recorded requests in '{}'".format(directory))
+        for record in sorted(records, key=lambda r: r['started']):
+            key = request_key(record['method'], record['url'])
+            self._responses.setdefault(key, collections.deque()).append(
+                record)
+
+    def next_record(self, request):
+        """The record of the next response to `request`, None if the
+        request was never recorded."""
+        key = request_key(request.method, request.url)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                if key not in self._missing:
+                    self._missing.add(key)
+                    logging.warning("No recorded response to %s %s",
+                                    request.method, request.url)
+                return None
+            if len(responses) > 1:
+                return responses.popleft()
+            return responses[0]
+
+    def send(self, request):
+        record = self.next_record(request)
+        if record is None:
+            record = {'status': 404, 'reason': 'Not Recorded',
+                      'headers': {'Content-Type': 'application/json'},
+                      'body': '{}', 'elapsed': 0.0}
+        if self.latency_scale:
+            time.sleep(record['elapsed'] * self.latency_scale)
+
+        response = requests.Response()
+        response.status_code = record['status']
+        response.reason = record['reason']
+        response.headers = structures.CaseInsensitiveDict(record['headers'])
+        # The body is already there, don't let `requests` decode it again.
+        response.headers.pop('Content-Encoding', None)
+        if 'body_base64' in record:
+            response._content = base64.b64decode(record['body_base64'])
+        else:
+            response._content = record['body'].encode('utf-8')
+        if 'X-Subject-Token' in response.headers:
+            response._content = _renew_token(response._content)
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=record['elapsed'])
+        return response
+
+
+class RecordingAdapter(adapters.HTTPAdapter):
+    """`requests` transport adapter recording the requests it sends and
+    their responses with `recorder`."""
+    def __init__(self, recorder, **kwargs):
+        self.recorder = recorder
+        super(RecordingAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        started = time.time()
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        self.recorder.record(request, response, started,
+                             time.time() - started)
+        return response
+
+
+class ReplayingAdapter(adapters.BaseAdapter):
+    """`requests` transport adapter answering the requests with the
+    responses of `replayer`, without any network access."""
+    def __init__(self, replayer):
+        super(ReplayingAdapter, self).__init__()
+        self.replayer = replayer
+
+    def send(self, request, **kwargs):
+        return self.replayer.send(request)
+
+    def close(self):
+        pass
+
+
+def _renew_token(content):
+    # Tokens recorded long ago have expired, keystoneauth would ask for a
+    # new one before every request.
+    try:
+        body = json.loads(content.decode('utf-8'))
+        body['token']['expires_at'] = time.strftime(
+            '%Y-%m-%dT%H:%M:%S.000000Z', time.gmtime(time.time() + 86400))
+    except (ValueError, KeyError, TypeError):
+        return content
+    return json.dumps(body).encode('utf-8')
+
+
+def get_recorder(options):
+    """
+    Return the `Recorder` of --record, or None if there is none. Every
+    process records in its own file.
+    """
+    if not options.record:
+        return None
+    key = (options.record, os.getpid())
+    with _lock:
+        if key not in _recorders:
+            _recorders[key] = Recorder(options.record)
+        return _recorders[key]
+
+
+def close_recorders():
+    """Close the recordings opened by `get_recorder()`."""
+    with _lock:
+        recorders = list(_recorders.values())
+        _recorders.clear()
+    for recorder in recorders:
+        recorder.close()
+
+
+def get_replayer(options):
+    """
+    Return the `Replayer` of --replay, or None if there is none. The
+    recording is loaded once per process.
+    """
+    if not options.replay:
+        return None
+    with _lock:
+        if options.replay not in _replayers:
+            _replayers[options.replay] = Replayer(
+                options.replay, options.replay_latency)
+        return _replayers[options.replay]
+
+
+def get_adapter(options, **kwargs):
+    """
+    Return the transport adapter replaying the requests with --replay or
+    recording them with --record, None otherwise. `kwargs` are given to the
+    `HTTPAdapter` the requests are recorded with.
+    """
+    replayer = get_replayer(options)
+    if replayer is not None:
+        return ReplayingAdapter(replayer)
+    recorder = get_recorder(options)
+    if recorder is not None:
+        return RecordingAdapter(recorder, **kwargs)
+    return None
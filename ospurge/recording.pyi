@@ -0,0 +1,86 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+import requests
+from requests import adapters
+
+
+def request_key(method: str, url: str) -> Tuple[str, str]:
+    ...
+
+
+class Recorder(object):
+    def __init__(self, directory: str) -> None:
+        ...
+
+    def record(self, request: requests.PreparedRequest,
+               response: requests.Response, started: float,
+               elapsed: float) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class Replayer(object):
+    def __init__(self, directory: str, latency_scale: float=0.0) -> None:
+        ...
+
+    def next_record(self, request: requests.PreparedRequest
+                    ) -> Optional[Dict[str, Any]]:
+        ...
+
+    def send(self, request: requests.PreparedRequest) -> requests.Response:
+        ...
+
+
+class RecordingAdapter(adapters.HTTPAdapter):
+    def __init__(self, recorder: Recorder, **kwargs: Any) -> None:
+        ...
+
+    def send(self, request: requests.PreparedRequest,
+             **kwargs: Any) -> requests.Response:
+        ...
+
+
+class ReplayingAdapter(adapters.BaseAdapter):
+    def __init__(self, replayer: Replayer) -> None:
+        ...
+
+    def send(self, request: requests.PreparedRequest,
+             **kwargs: Any) -> requests.Response:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def get_recorder(options: argparse.Namespace) -> Optional[Recorder]:
+    ...
+
+
+def close_recorders() -> None:
+    ...
+
+
+def get_replayer(options: argparse.Namespace) -> Optional[Replayer]:
+    ...
+
+
+def get_adapter(options: argparse.Namespace,
+                **kwargs: Any) -> Optional[adapters.BaseAdapter]:
+    ...
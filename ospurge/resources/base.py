@@ -12,7 +12,6 @@
 import abc
 import collections
 import logging
-import time
 from typing import TYPE_CHECKING
 
 try:
@@ -21,12 +20,18 @@ except ImportError:
     import inspect
 import six
 
-from ospurge import exceptions
-
 if TYPE_CHECKING:  # pragma: no cover
     import argparse  # noqa: F401
     import shade  # noqa: F401
+    from ospurge import inventory  # noqa: F401
+    from ospurge import main  # noqa: F401
+    from ospurge import tracker  # noqa: F401
     from typing import Optional  # noqa: F401
+    from typing import Tuple  # noqa: F401
+
+# How long a resource manager waits for its prerequisites, in seconds. Long
+# enough for incremental backups to be deleted one after the other.
+PREREQUISITE_TIMEOUT = 2700
 
 
 class MatchSignaturesMeta(type):
@@ -89,14 +94,24 @@ else:   # pragma: no cover here
 
 class BaseServiceResource(object):
     def __init__(self):
+        self.creds_manager = None  # type: Optional[main.CredentialsManager]
         self.cleanup_project_id = None  # type: Optional[str]
         self.cloud = None  # type: Optional[shade.OpenStackCloud]
         self.options = None  # type: Optional[argparse.Namespace]
+        self.inventory = None  # type: Optional[inventory.Inventory]
+        self.tracker = None  # type: Optional[tracker.DeletionTracker]
 
 
 class ServiceResource(six.with_metaclass(CodingStyleMixin,
                                          BaseServiceResource)):
     ORDER = None  # type: int
+    # Catalog type of the service the resources belong to. Used to share
+    # concurrency limits between all the resource types of a service.
+    SERVICE_TYPE = None  # type: Optional[str]
+    # Names of the `ServiceResource` subclasses that must be done before this
+    # one can start. `ORDER` is only used to break ties between managers that
+    # are ready at the same time.
+    DEPENDS_ON = ()  # type: Tuple[str, ...]
 
     def __init__(self, creds_manager):
         super(ServiceResource, self).__init__()
@@ -107,14 +122,21 @@ class ServiceResource(six.with_metaclass(CodingStyleMixin,
                     self.__module__, self.__class__.__name__)  # type: ignore
             )
 
+        self.creds_manager = creds_manager
         self.cleanup_project_id = creds_manager.project_id
         self.cloud = creds_manager.cloud
         self.options = creds_manager.options
+        self.inventory = creds_manager.inventory
+        self.tracker = creds_manager.tracker
+        self.exit = creds_manager.exit
 
     @classmethod
     def order(cls):
         return cls.ORDER
 
+    def depends_on(self):
+        return self.DEPENDS_ON
+
     def check_prerequisite(self):
         return True
 
@@ -122,6 +144,35 @@ class ServiceResource(six.with_metaclass(CodingStyleMixin,
     def list(self):
         raise NotImplementedError
 
+    def from_plan(self, resources):
+        """
+        Return the `resources` read from a plan (see --apply-plan), in the
+        order to delete them. They are the resources `list()` returned
+        during the dry run, in the same order, by default.
+        """
+        return resources
+
+    def exists(self):
+        """
+        Whether there is at least one resource left to delete. Stops at the
+        first one found, subclasses whose API can be asked for a single
+        resource override it with a cheaper query.
+        """
+        for resource in self.list():
+            if self.should_delete(resource):
+                return True
+        return False
+
+    def nothing_left(self, *resource_classes):
+        """
+        Whether no resource of any of `resource_classes` is left to delete in
+        the project. Meant to be used by `check_prerequisite()`.
+        """
+        return not any(
+            self.inventory.exists(resource_class(self.creds_manager))
+            for resource_class in resource_classes
+        )
+
     def should_delete(self, resource):
         project_id = resource.get('project_id', resource.get('tenant_id'))
         if project_id:
@@ -137,27 +188,33 @@ class ServiceResource(six.with_metaclass(CodingStyleMixin,
     def delete(self, resource):
         raise NotImplementedError
 
+    def skip(self, resource):
+        """
+        Called instead of `delete()` for a resource that was deleted before
+        the purge was resumed (see --resume), according to the journal. Its
+        deletion may still be going on. Does nothing by default.
+        """
+
+    def delete_batch_size(self):
+        """
+        How many resources `delete_batch()` can delete at once. Resource
+        types whose API can delete several resources in a single request
+        override it along with `delete_batch()`.
+        """
+        return 1
+
+    def delete_batch(self, resources):
+        for resource in resources:
+            self.delete(resource)
+
     @staticmethod
     @abc.abstractmethod
     def to_str(resource):
         raise NotImplementedError
 
-    def wait_for_check_prerequisite(self, exit):
-        # we have to wait for incremental backups to be deleted so we have to wait for quite a while
-        timeout = time.time() + 2700
-        sleep = 2
-        while time.time() < timeout:
-            if exit.is_set():
-                raise RuntimeError(
-                    "Resource manager exited because it was interrupted or "
-                    "another resource manager failed"
-                )
-            if self.check_prerequisite():
-                break
-            logging.info("Waiting for check_prerequisite() in %s",
-                         self.__class__.__name__)
-            time.sleep(sleep)
-            sleep = min(sleep * 2, 8)
-        else:
-            raise exceptions.TimeoutError(
-                "Timeout exceeded waiting for check_prerequisite()")
+    def wait_for_deletions(self, exit):
+        """
+        Called once all the delete calls returned, for resource types whose
+        deletion goes on asynchronously and must be waited for before
+        reporting the resource manager as done. Does nothing by default.
+        """
@@ -14,6 +14,7 @@ import threading
 from typing import Any
 from typing import Dict
 from typing import Iterable
+from typing import List
 from typing import Optional
 
 import six
@@ -58,6 +59,9 @@ class ServiceResource(six.with_metaclass(CodingStyleMixin, BaseServiceResource))
     def order(cls) -> int:
         ...
 
+    def depends_on(self) -> Iterable[str]:
+        ...
+
     def check_prerequisite(self) -> bool:
         ...
 
@@ -65,6 +69,17 @@ class ServiceResource(six.with_metaclass(CodingStyleMixin, BaseServiceResource))
     def list(self) -> Iterable:
         ...
 
+    def from_plan(
+        self, resources: List[Dict[str, Any]]
+    ) -> Iterable[Dict[str, Any]]:
+        ...
+
+    def exists(self) -> bool:
+        ...
+
+    def nothing_left(self, *resource_classes: type) -> bool:
+        ...
+
     def should_delete(self, resource: Dict[str, Any]) -> bool:
         ...
 
@@ -72,10 +87,19 @@ class ServiceResource(six.with_metaclass(CodingStyleMixin, BaseServiceResource))
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
+    def skip(self, resource: Dict[str, Any]) -> None:
+        ...
+
+    def delete_batch_size(self) -> int:
+        ...
+
+    def delete_batch(self, resources: List[Dict[str, Any]]) -> None:
+        ...
+
     @staticmethod
     @abc.abstractmethod
     def to_str(resource: Dict[str, Any]) -> str:
         ...
 
-    def wait_for_check_prerequisite(self, exit: threading.Event) -> None:
+    def wait_for_deletions(self, exit: threading.Event) -> None:
         ...
@@ -9,36 +9,160 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+import collections
+import concurrent.futures
+import threading
+import typing
+
+import shade
+import six
+
+from ospurge import utils
 from ospurge.resources import base
-import time
-import logging
+from ospurge.resources import nova
+from shade import meta
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import Any  # noqa: F401
+    from typing import Dict  # noqa: F401
+    from typing import List  # noqa: F401
+
 
 class Backups(base.ServiceResource):
     ORDER = 33
-
-    currently_deleting = {}
+    SERVICE_TYPE = 'volume'
+
+    def __init__(self, creds_manager):
+        super(Backups, self).__init__(creds_manager)
+        # IDs of the backups that must be gone before deleting a backup: its
+        # incremental backups.
+        self.blockers = {}  # type: Dict[str, List[str]]
+        # Completion of the deletion of every listed backup.
+        self.deletions = {}  # type: Dict[str, concurrent.futures.Future]
+        # Deletions still going on in Cinder.
+        self.deleting = []  # type: list
+        self.deleting_lock = threading.Lock()
+
+    def list_backups(self):
+        return utils.paginate(
+            self.cloud._volume_client, '/backups/detail', 'backups')
 
     def list(self):
-        return self.cloud.list_volume_backups()
-
-    def wait_for_deletion(self, id):
-        # wait until a backup is deleted 
-        logging.info("Waiting for deletion of backup with id " + str(id))
-        sleep = 2
-        while True:
-            backup = self.cloud.get_volume_backup(id)
-            if backup is None:
-                return 
-            else:
-                time.sleep(sleep)
+        return self.order_backups(self.list_backups())
+
+    def from_plan(self, resources):
+        # The chains must be rebuilt to delete them in parallel.
+        return self.order_backups(resources)
+
+    def order_backups(self, backups):
+        # Incremental backups must be deleted before the backup they are
+        # based on, but the backups of different volumes don't depend on
+        # each other. Build the chain of backups of each volume and yield
+        # the newest backup of every volume, then the next one... so that
+        # the chains are deleted in parallel.
+        chains = collections.OrderedDict()  # type: Dict[str, List[Any]]
+        for backup in backups:
+            chains.setdefault(backup['volume_id'], []).append(backup)
+
+        for volume_id, chain in chains.items():
+            chain.sort(key=lambda b: b.get('created_at') or '', reverse=True)
+            blockers = {}  # type: Dict[str, List[str]]
+            for newer, backup in zip([None] + chain, chain):
+                # Without `parent_id` (older API versions), assume that every
+                # backup is based on the previous one.
+                if 'parent_id' in backup:
+                    blockers[backup['id']] = [
+                        b['id'] for b in chain
+                        if b.get('parent_id') == backup['id']]
+                else:
+                    blockers[backup['id']] = [newer['id']] if newer else []
+            chains[volume_id] = self.sort_chain(chain, blockers)
+
+            with self.deleting_lock:
+                self.blockers.update(blockers)
+                for backup in chain:
+                    self.deletions[backup['id']] = concurrent.futures.Future()
+
+        for backups in six.moves.zip_longest(*chains.values()):
+            for backup in backups:
+                if backup is not None:
+                    yield backup
+
+    @staticmethod
+    def sort_chain(chain, blockers):
+        """Sort `chain` so that every backup comes after its blockers."""
+        done = set()  # type: set
+        remaining = list(chain)
+        sorted_chain = []
+        while remaining:
+            ready = [b for b in remaining
+                     if done.issuperset(blockers[b['id']])]
+            # Blockers that are not part of the listing (or a loop) must not
+            # hide the rest of the chain.
+            for backup in ready or remaining:
+                done.add(backup['id'])
+                sorted_chain.append(backup)
+                remaining.remove(backup)
+        return sorted_chain
+
+    def exists(self):
+        data = self.cloud._volume_client.get(
+            '/backups', params={'limit': 1})
+        return meta.get_and_munchify('backups', data) != []
+
+    def list_statuses(self):
+        return {backup['id']: backup['status']
+                for backup in self.list_backups()}
 
     def delete(self, resource):
-        if resource['volume_id'] in self.currently_deleting:
-            self.wait_for_deletion(self.currently_deleting[resource['volume_id']])
+        with self.deleting_lock:
+            deletion = self.deletions.setdefault(
+                resource['id'], concurrent.futures.Future())
+            blockers = [self.deletions[backup_id]
+                        for backup_id in self.blockers.get(resource['id'], [])]
+
+        try:
+            # The newer backups of the chain are deleted by other workers
+            # and were submitted before this one.
+            self.tracker.wait(blockers, exit=self.exit)
+            if self.exit.is_set():
+                # The blockers may still be there.
+                return
+            self.cloud.delete_volume_backup(resource['id'])
+        except shade.OpenStackCloudResourceNotFound:
+            # Already gone, it no longer blocks the older backups.
+            deletion.set_result(None)
+            raise
+        except Exception as exc:
+            deletion.set_exception(exc)
+            raise
+        self.track(resource['id'], deletion)
+
+    def skip(self, resource):
+        # Deleted before the purge was resumed: the older backups of the
+        # chain must wait until it is actually gone.
+        with self.deleting_lock:
+            deletion = self.deletions.setdefault(
+                resource['id'], concurrent.futures.Future())
+        self.track(resource['id'], deletion)
+
+    def track(self, backup_id, deletion):
+        """Resolve `deletion` once the backup `backup_id` is gone."""
+        def done(future):
+            if future.exception() is not None:
+                deletion.set_exception(future.exception())
+            else:
+                deletion.set_result(None)
 
-        self.currently_deleting[resource['volume_id']] = resource['id'] 
-        self.cloud.delete_volume_backup(resource['id'])
+        future = self.tracker.track('Backups', backup_id, self.list_statuses)
+        future.add_done_callback(done)
+        with self.deleting_lock:
+            self.deleting.append(future)
 
+    def wait_for_deletions(self, exit):
+        with self.deleting_lock:
+            futures = list(self.deleting)
+        self.tracker.wait(futures, exit=exit)
 
     @staticmethod
     def to_str(resource):
@@ -48,9 +172,16 @@ class Backups(base.ServiceResource):
 
 class Snapshots(base.ServiceResource):
     ORDER = 36
+    SERVICE_TYPE = 'volume'
 
     def list(self):
-        return self.cloud.list_volume_snapshots()
+        return utils.paginate(
+            self.cloud._volume_client, '/snapshots/detail', 'snapshots')
+
+    def exists(self):
+        data = self.cloud._volume_client.get(
+            '/snapshots', params={'limit': 1})
+        return meta.get_and_munchify('snapshots', data) != []
 
     def delete(self, resource):
         self.cloud.delete_volume_snapshot(resource['id'])
@@ -63,20 +194,45 @@ class Snapshots(base.ServiceResource):
 
 class Volumes(base.ServiceResource):
     ORDER = 65
+    SERVICE_TYPE = 'volume'
+    DEPENDS_ON = ('Servers', 'Snapshots')
+
+    def __init__(self, creds_manager):
+        super(Volumes, self).__init__(creds_manager)
+        self.deleting = []  # type: list
+        self.deleting_lock = threading.Lock()
 
     def check_prerequisite(self):
-        return (self.cloud.list_volume_snapshots() == [] and
-                self.cloud.list_servers() == [])
+        return self.nothing_left(Snapshots, nova.Servers)
 
     def list(self):
-        return self.cloud.list_volumes()
+        return utils.paginate(
+            self.cloud._volume_client, '/volumes/detail', 'volumes',
+            normalize=self.cloud._normalize_volumes)
+
+    def exists(self):
+        data = self.cloud._volume_client.get(
+            '/volumes', params={'limit': 1})
+        return meta.get_and_munchify('volumes', data) != []
 
     def should_delete(self, resource):
         attr = 'os-vol-tenant-attr:tenant_id'
         return resource[attr] == self.cleanup_project_id
 
+    def list_statuses(self):
+        return {volume['id']: volume['status'] for volume in self.list()}
+
     def delete(self, resource):
-        self.cloud.delete_volume(resource['id'])
+        self.cloud.delete_volume(resource['id'], wait=False)
+        future = self.tracker.track(
+            'Volumes', resource['id'], self.list_statuses)
+        with self.deleting_lock:
+            self.deleting.append(future)
+
+    def wait_for_deletions(self, exit):
+        with self.deleting_lock:
+            futures = list(self.deleting)
+        self.tracker.wait(futures, exit=exit)
 
     @staticmethod
     def to_str(resource):
@@ -9,20 +9,62 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+import concurrent.futures
+import threading
 from typing import Any
 from typing import Dict
 from typing import Iterable
+from typing import List
 
+from ospurge.main import CredentialsManager  # noqa: F401
 from ospurge.resources import base
 
 
 class Backups(base.ServiceResource):
+    def __init__(self, creds_manager: 'CredentialsManager') -> None:
+        ...
+
+    def list_backups(self) -> Iterable:
+        ...
+
     def list(self) -> Iterable:
         ...
 
+    def from_plan(
+        self, resources: List[Dict[str, Any]]
+    ) -> Iterable[Dict[str, Any]]:
+        ...
+
+    def order_backups(
+        self, backups: Iterable[Dict[str, Any]]
+    ) -> Iterable[Dict[str, Any]]:
+        ...
+
+    @staticmethod
+    def sort_chain(
+        chain: List[Dict[str, Any]], blockers: Dict[str, List[str]]
+    ) -> List[Dict[str, Any]]:
+        ...
+
+    def exists(self) -> bool:
+        ...
+
+    def list_statuses(self) -> Dict[str, str]:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
+    def skip(self, resource: Dict[str, Any]) -> None:
+        ...
+
+    def track(self, backup_id: str,
+              deletion: concurrent.futures.Future) -> None:
+        ...
+
+    def wait_for_deletions(self, exit: threading.Event) -> None:
+        ...
+
     @staticmethod
     def to_str(resource: Dict[str, Any]) -> str:
         ...
@@ -32,6 +74,9 @@ class Snapshots(base.ServiceResource):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -41,18 +86,30 @@ class Snapshots(base.ServiceResource):
 
 
 class Volumes(base.ServiceResource):
+    def __init__(self, creds_manager: 'CredentialsManager') -> None:
+        ...
+
     def check_prerequisite(self) -> bool:
         ...
 
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def should_delete(self, resource: Dict[str, Any]) -> bool:
         ...
 
+    def list_statuses(self) -> Dict[str, str]:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
+    def wait_for_deletions(self, exit: threading.Event) -> None:
+        ...
+
     @staticmethod
     def to_str(resource: Dict[str, Any]) -> str:
         ...
@@ -9,14 +9,34 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+import itertools
+
+from ospurge import utils
 from ospurge.resources import base
 from ospurge.resources.base import BaseServiceResource
 
 
 class ListImagesMixin(BaseServiceResource):
+    def list_images(self, filters=None):
+        # Only the v2 API has marker based pagination and server side
+        # filters.
+        if not self.cloud._is_client_version('image', 2):
+            return self.cloud.list_images()
+        return utils.paginate(
+            self.cloud._image_client, '/images', 'images', params=filters,
+            normalize=self.cloud._normalize_images)
+
     def list_images_by_owner(self):
-        images = []
-        for image in self.cloud.list_images():
+        filters = [{'owner': self.cleanup_project_id}]
+        if (self.options.delete_shared_resources is False and
+                self.cloud._is_client_version('image', 2)):
+            # Public images are kept, don't even list them. Community
+            # images are owned by the project like private and shared ones.
+            filters = [dict(filters[0], visibility=visibility)
+                       for visibility in ('private', 'shared', 'community')]
+
+        for image in itertools.chain.from_iterable(
+                self.list_images(f) for f in filters):
             if image['owner'] != self.cleanup_project_id:
                 continue
 
@@ -26,13 +46,12 @@ class ListImagesMixin(BaseServiceResource):
                 if self.options.delete_shared_resources is False:
                     continue
 
-            images.append(image)
-
-        return images
+            yield image
 
 
 class Images(base.ServiceResource, ListImagesMixin):
     ORDER = 53
+    SERVICE_TYPE = 'image'
 
     def list(self):
         return self.list_images_by_owner()
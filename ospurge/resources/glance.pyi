@@ -12,12 +12,18 @@
 from typing import Any
 from typing import Dict
 from typing import Iterable
+from typing import Optional
 
 from ospurge.resources import base
 from ospurge.resources.base import BaseServiceResource
 
 
 class ListImagesMixin(BaseServiceResource):
+    def list_images(
+        self, filters: Optional[Dict[str, Any]]=None
+    ) -> Iterable[Dict[str, Any]]:
+        ...
+
     def list_images_by_owner(self) -> Iterable[Dict[str, Any]]:
         ...
 
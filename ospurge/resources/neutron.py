@@ -9,6 +9,7 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+from ospurge import utils
 from ospurge.resources import base
 import logging
 import os
@@ -16,21 +17,36 @@ from keystoneauth1 import identity
 from keystoneauth1 import session
 from shade import meta
 import ospurge.resources.octavia as octavia
-from ospurge.resources.neutron_vpnaas import getNeutronClient
+from ospurge.resources import cinder
+from ospurge.resources import neutron_vpnaas
+from ospurge.resources import nova
+
+ROUTER_INTERFACE_OWNERS = ['network:router_interface',
+                           'network:ha_router_replicated_interface']
 
 
 
 class FloatingIPs(base.ServiceResource):
     ORDER = 25
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('Servers',)
 
     def check_prerequisite(self):
         # We can't delete a FIP if it's attached
-        return self.cloud.list_servers() == []
+        return self.nothing_left(nova.Servers)
 
     def list(self):
-        return self.cloud.search_floating_ips(filters={
-            'tenant_id': self.cleanup_project_id
-        })
+        return utils.paginate(
+            self.cloud._network_client, '/floatingips.json', 'floatingips',
+            params={'tenant_id': self.cleanup_project_id},
+            normalize=self.cloud._normalize_floating_ips)
+
+    def exists(self):
+        data = self.cloud._network_client.get(
+            '/floatingips.json',
+            params={'tenant_id': self.cleanup_project_id, 'limit': 1}
+        )
+        return meta.get_and_munchify('floatingips', data) != []
 
     def delete(self, resource):
         self.cloud.delete_floating_ip(resource['id'])
@@ -42,22 +58,25 @@ class FloatingIPs(base.ServiceResource):
 
 class RouterInterfaces(base.ServiceResource):
     ORDER = 42
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('Servers', 'FloatingIPs')
 
     def check_prerequisite(self):
-        return (
-            self.cloud.list_servers() == [] and
-            self.cloud.search_floating_ips(
-                filters={'tenant_id': self.cleanup_project_id}
-            ) == []
-        )
+        return self.nothing_left(nova.Servers, FloatingIPs)
 
     def list(self):
-        router_interfaces = self.cloud.list_ports(
-            filters={'device_owner': ['network:router_interface','network:ha_router_replicated_interface'],
-                     'tenant_id': self.cleanup_project_id}
+        return utils.paginate(
+            self.cloud._network_client, '/ports.json', 'ports',
+            params={'device_owner': ROUTER_INTERFACE_OWNERS,
+                    'tenant_id': self.cleanup_project_id})
+
+    def exists(self):
+        data = self.cloud._network_client.get(
+            '/ports.json',
+            params={'device_owner': ROUTER_INTERFACE_OWNERS,
+                    'tenant_id': self.cleanup_project_id, 'limit': 1}
         )
-        return router_interfaces
-        
+        return meta.get_and_munchify('ports', data) != []
 
     def delete(self, resource):
         self.cloud.remove_router_interface({'id': resource['device_id']},
@@ -71,16 +90,22 @@ class RouterInterfaces(base.ServiceResource):
 
 class Routers(base.ServiceResource):
     ORDER = 44
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('RouterInterfaces', 'VPNServices')
 
     def check_prerequisite(self):
-        ports = self.cloud.list_ports(
-                filters={'tenant_id': self.cleanup_project_id,
-                         'device_owner': ['network:router_interface','network:ha_router_replicated_interface']}
-            )
-        return ports == []
+        return self.nothing_left(RouterInterfaces)
 
     def list(self):
-        return self.cloud.list_routers()
+        return utils.paginate(
+            self.cloud._network_client, '/routers.json', 'routers')
+
+    def exists(self):
+        data = self.cloud._network_client.get(
+            '/routers.json',
+            params={'tenant_id': self.cleanup_project_id, 'limit': 1}
+        )
+        return meta.get_and_munchify('routers', data) != []
 
     def delete(self, resource):
         self.cloud.delete_router(resource['id'])
@@ -93,18 +118,34 @@ class Routers(base.ServiceResource):
 
 class Ports(base.ServiceResource):
     ORDER = 46
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('LoadBalancers', 'Volumes')
 
 
     def check_prerequisite(self):
-        client = octavia.getOctaviaClient(self.options)
-        return meta.get_and_munchify('loadbalancers', client.load_balancer_list()) == [] and self.cloud.list_volumes() == []
+        return self.nothing_left(octavia.LoadBalancers, cinder.Volumes)
 
     def list(self):
-        ports = self.cloud.list_ports(
-            filters={'tenant_id': self.cleanup_project_id}
-        )
-        excluded = ['network:dhcp', 'network:router_interface', 'network:ha_router_replicated_interface']
-        return [p for p in ports if p['device_owner'] not in excluded]
+        return self.list_ports()
+
+    def list_ports(self, fields=None):
+        params = {'tenant_id': self.cleanup_project_id}
+        if fields:
+            params['fields'] = fields
+        excluded = ['network:dhcp'] + ROUTER_INTERFACE_OWNERS
+        for port in utils.paginate(
+                self.cloud._network_client, '/ports.json', 'ports',
+                params=params):
+            if port['device_owner'] not in excluded:
+                yield port
+
+    def exists(self):
+        # Neutron can't leave the DHCP and router interface ports out, which
+        # may come first: page through the owners of the ports instead of
+        # asking for a single one.
+        for _ in self.list_ports(fields=['id', 'device_owner']):
+            return True
+        return False
 
     def delete(self, resource):
         self.cloud.delete_port(resource['id'])
@@ -117,29 +158,29 @@ class Ports(base.ServiceResource):
 
 class Networks(base.ServiceResource):
     ORDER = 48
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('Ports', 'RouterInterfaces', 'EndpointGroups')
 
     def check_prerequisite(self):
-        ports = self.cloud.list_ports(
-            filters={'tenant_id': self.cleanup_project_id}
-        )
-        excluded = ['network:dhcp']
-
-        client = getNeutronClient(self.options)
-        endpoint_groups = meta.get_and_munchify('endpoint_groups', client.list_endpoint_groups())
-         
-        return [p for p in ports if p['device_owner'] not in excluded] == [] and endpoint_groups == []
+        # Only DHCP ports are left once Ports and RouterInterfaces are done.
+        return self.nothing_left(Ports, RouterInterfaces,
+                                 neutron_vpnaas.EndpointGroups)
 
     def list(self):
-        networks = []
-        for network in self.cloud.list_networks(
-                filters={'tenant_id': self.cleanup_project_id}
-        ):
+        for network in utils.paginate(
+                self.cloud._network_client, '/networks.json', 'networks',
+                params={'tenant_id': self.cleanup_project_id}):
             if network['router:external'] is True:
                 if not self.options.delete_shared_resources:
                     continue
-            networks.append(network)
+            yield network
 
-        return networks
+    def exists(self):
+        params = {'tenant_id': self.cleanup_project_id, 'limit': 1}
+        if not self.options.delete_shared_resources:
+            params['router:external'] = False
+        data = self.cloud._network_client.get('/networks.json', params=params)
+        return meta.get_and_munchify('networks', data) != []
 
     def delete(self, resource):
         self.cloud.delete_network(resource['id'])
@@ -152,15 +193,30 @@ class Networks(base.ServiceResource):
 
 class SecurityGroups(base.ServiceResource):
     ORDER = 49
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('LoadBalancers', 'Ports')
 
     def check_prerequisite(self):
-        client = octavia.getOctaviaClient(self.options)
-        return meta.get_and_munchify('loadbalancers', client.load_balancer_list()) == []
+        return self.nothing_left(octavia.LoadBalancers)
 
     def list(self):
-        return [sg for sg in self.cloud.list_security_groups(
-            filters={'tenant_id': self.cleanup_project_id})
-            if sg['name'] != 'default']
+        for sg in utils.paginate(
+                self.cloud._network_client, '/security-groups.json',
+                'security_groups',
+                params={'tenant_id': self.cleanup_project_id},
+                normalize=self.cloud._normalize_secgroups):
+            if sg['name'] != 'default':
+                yield sg
+
+    def exists(self):
+        # A project has a single default security group: if there are others,
+        # at least one of them comes in the first two.
+        data = self.cloud._network_client.get(
+            '/security-groups.json',
+            params={'tenant_id': self.cleanup_project_id, 'limit': 2}
+        )
+        return any(sg['name'] != 'default' for sg in
+                   meta.get_and_munchify('security_groups', data))
 
     def delete(self, resource):
         self.cloud.delete_security_group(resource['id'])
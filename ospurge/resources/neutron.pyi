@@ -12,6 +12,9 @@
 from typing import Any
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
 
 from ospurge.resources import base
 
@@ -23,6 +26,9 @@ class FloatingIPs(base.ServiceResource):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -38,6 +44,9 @@ class RouterInterfaces(base.ServiceResource):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -53,6 +62,9 @@ class Routers(base.ServiceResource):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -62,9 +74,20 @@ class Routers(base.ServiceResource):
 
 
 class Ports(base.ServiceResource):
+    def check_prerequisite(self) -> bool:
+        ...
+
     def list(self) -> Iterable:
         ...
 
+    def list_ports(
+        self, fields: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        ...
+
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -80,6 +103,9 @@ class Networks(base.ServiceResource):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -89,9 +115,15 @@ class Networks(base.ServiceResource):
 
 
 class SecurityGroups(base.ServiceResource):
+    def check_prerequisite(self) -> bool:
+        ...
+
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -9,11 +9,11 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+from ospurge import clients
 from ospurge.resources import base
+from ospurge.resources.base import BaseServiceResource
 import logging
 import os
-from keystoneauth1 import identity
-from keystoneauth1 import session
 from shade import meta
 from neutronclient.v2_0 import client
 
@@ -21,28 +21,37 @@ from neutronclient.v2_0 import client
 # shade does not have any functions for handling VPN resources 
 # so we have to work on the "barebones" Neutron client
 def getNeutronClient(options):
-        authurl = options.os_auth_url
-        user_name = options.os_username
-        pass_word = options.os_password
-        tenantname = options.purge_project
-        os_region_name = options.os_region_name
-
-        auth = identity.V3Password(auth_url=authurl,
-                               username=user_name,
-                               user_domain_name='Default',
-                               password=pass_word,
-                               project_name=tenantname,
-                               project_domain_name='Default')
-        sess = session.Session(auth=auth) 
-        network_client = client.Client(session=sess, region_name=os_region_name)
-        return network_client
-
-class IpSecSiteConnections(base.ServiceResource):
+        def make_client(sess):
+            return client.Client(session=sess, region_name=options.os_region_name)
+
+        return clients.get_client('network', options, make_client)
+
+
+# The listings are filtered on the project to purge by Neutron, so that
+# admin credentials don't fetch the VPN resources of every project.
+class ListVPNResourcesMixin(BaseServiceResource):
+    def list_ipsec_site_connections(self):
+        client = getNeutronClient(self.options)
+        return meta.get_and_munchify('ipsec_site_connections', client.list_ipsec_site_connections(
+            tenant_id=self.cleanup_project_id))
+
+    def list_endpoint_groups(self):
+        client = getNeutronClient(self.options)
+        return meta.get_and_munchify('endpoint_groups', client.list_endpoint_groups(
+            tenant_id=self.cleanup_project_id))
+
+class IpSecSiteConnections(base.ServiceResource, ListVPNResourcesMixin):
     ORDER = 26
+    SERVICE_TYPE = 'network'
 
     def list(self):
+        return self.list_ipsec_site_connections()
+
+    def exists(self):
         client = getNeutronClient(self.options)
-        return meta.get_and_munchify('ipsec_site_connections', client.list_ipsec_site_connections())
+        pages = client.list_ipsec_site_connections(
+            retrieve_all=False, tenant_id=self.cleanup_project_id, limit=1)
+        return meta.get_and_munchify('ipsec_site_connections', next(pages)) != []
 
     def delete(self, resource):
         client = getNeutronClient(self.options)
@@ -53,16 +62,24 @@ class IpSecSiteConnections(base.ServiceResource):
         return "IPSec Site Connection (id='{}')".format(resource['id'])
 
 
-class VPNServices(base.ServiceResource):
+class VPNServices(base.ServiceResource, ListVPNResourcesMixin):
     ORDER = 27
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('IpSecSiteConnections',)
 
     def check_prerequisite(self):
-        client = getNeutronClient(self.options)
-        return meta.get_and_munchify('ipsec_site_connections', client.list_ipsec_site_connections()) == []
+        return self.nothing_left(IpSecSiteConnections)
 
     def list(self):
         client = getNeutronClient(self.options)
-        return meta.get_and_munchify('vpnservices', client.list_vpnservices())
+        return meta.get_and_munchify('vpnservices', client.list_vpnservices(
+            tenant_id=self.cleanup_project_id))
+
+    def exists(self):
+        client = getNeutronClient(self.options)
+        pages = client.list_vpnservices(
+            retrieve_all=False, tenant_id=self.cleanup_project_id, limit=1)
+        return meta.get_and_munchify('vpnservices', next(pages)) != []
 
     def delete(self, resource):
         client = getNeutronClient(self.options)
@@ -73,16 +90,22 @@ class VPNServices(base.ServiceResource):
         return "VPN Service (id='{}')".format(resource['id'])
 
 
-class EndpointGroups(base.ServiceResource):
+class EndpointGroups(base.ServiceResource, ListVPNResourcesMixin):
     ORDER = 28
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('IpSecSiteConnections',)
 
     def check_prerequisite(self):
-        client = getNeutronClient(self.options)
-        return meta.get_and_munchify('ipsec_site_connections', client.list_ipsec_site_connections()) == []
+        return self.nothing_left(IpSecSiteConnections)
 
     def list(self):
+        return self.list_endpoint_groups()
+
+    def exists(self):
         client = getNeutronClient(self.options)
-        return meta.get_and_munchify('endpoint_groups', client.list_endpoint_groups())
+        pages = client.list_endpoint_groups(
+            retrieve_all=False, tenant_id=self.cleanup_project_id, limit=1)
+        return meta.get_and_munchify('endpoint_groups', next(pages)) != []
 
     def delete(self, resource):
         client = getNeutronClient(self.options)
@@ -93,16 +116,18 @@ class EndpointGroups(base.ServiceResource):
         return "Endpoint Group (id='{}')".format(resource['id'])
 
 
-class IKEPolicies(base.ServiceResource):
+class IKEPolicies(base.ServiceResource, ListVPNResourcesMixin):
     ORDER = 29
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('IpSecSiteConnections',)
 
     def check_prerequisite(self):
-        client = getNeutronClient(self.options)
-        return meta.get_and_munchify('ipsec_site_connections', client.list_ipsec_site_connections()) == []
+        return self.nothing_left(IpSecSiteConnections)
 
     def list(self):
         client = getNeutronClient(self.options)
-        return meta.get_and_munchify('ikepolicies', client.list_ikepolicies())
+        return meta.get_and_munchify('ikepolicies', client.list_ikepolicies(
+            tenant_id=self.cleanup_project_id))
 
     def delete(self, resource):
         client = getNeutronClient(self.options)
@@ -112,16 +137,18 @@ class IKEPolicies(base.ServiceResource):
     def to_str(resource):
         return "IKE Policy (id='{}')".format(resource['id'])
 
-class IPSecPolicies(base.ServiceResource):
+class IPSecPolicies(base.ServiceResource, ListVPNResourcesMixin):
     ORDER = 30
+    SERVICE_TYPE = 'network'
+    DEPENDS_ON = ('IpSecSiteConnections',)
 
     def check_prerequisite(self):
-        client = getNeutronClient(self.options)
-        return meta.get_and_munchify('ipsec_site_connections', client.list_ipsec_site_connections()) == []
+        return self.nothing_left(IpSecSiteConnections)
 
     def list(self):
         client = getNeutronClient(self.options)
-        return meta.get_and_munchify('ipsecpolicies', client.list_ipsecpolicies())
+        return meta.get_and_munchify('ipsecpolicies', client.list_ipsecpolicies(
+            tenant_id=self.cleanup_project_id))
 
     def delete(self, resource):
         client = getNeutronClient(self.options)
@@ -9,14 +9,24 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+from ospurge import utils
 from ospurge.resources import base
+from shade import meta
 
 
 class Servers(base.ServiceResource):
     ORDER = 15
+    SERVICE_TYPE = 'compute'
 
     def list(self):
-        return self.cloud.list_servers()
+        return utils.paginate(
+            self.cloud._compute_client, '/servers/detail', 'servers',
+            normalize=self.cloud._normalize_servers)
+
+    def exists(self):
+        data = self.cloud._compute_client.get(
+            '/servers', params={'limit': 1})
+        return meta.get_and_munchify('servers', data) != []
 
     def delete(self, resource):
         self.cloud.delete_server(resource['id'])
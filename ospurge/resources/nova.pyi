@@ -20,6 +20,9 @@ class Servers(base.ServiceResource):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -9,12 +9,13 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+from ospurge import clients
 from ospurge.resources import base
+from ospurge.resources.base import BaseServiceResource
 from octaviaclient.api.v2 import octavia
-from keystoneauth1 import identity
-from keystoneauth1 import session
 from shade import meta
 import os
+import threading
 import traceback
 import logging
 
@@ -22,52 +23,119 @@ import logging
 # shade does not have any functions for handling loadbalancers 
 # so we have to work on the "barebones" client
 def getOctaviaClient(options):
-        authurl = options.os_auth_url
-        user_name = options.os_username
-        pass_word = options.os_password
-        tenantname = options.purge_project
-        os_region_name = options.os_region_name
-
-        auth = identity.V3Password(auth_url=authurl,
-                               username=user_name,
-                               user_domain_name='Default',
-                               password=pass_word,
-                               project_name=tenantname,
-                               project_domain_name='Default')
-        sess = session.Session(auth=auth) 
-        endpoint = sess.get_endpoint(service_type = 'load-balancer', region_name = os_region_name)
-        return octavia.OctaviaAPI(endpoint = endpoint, session=sess)
-
-class LoadBalancers(base.ServiceResource):
+        def make_client(sess):
+            endpoint = sess.get_endpoint(service_type = 'load-balancer', region_name = options.os_region_name)
+            return octavia.OctaviaAPI(endpoint = endpoint, session=sess)
+
+        return clients.get_client('load-balancer', options, make_client)
+
+
+# The listings are filtered on the project to purge by Octavia, so that
+# admin credentials don't fetch the load balancers of every project.
+class ListLoadBalancerResourcesMixin(BaseServiceResource):
+    def list_load_balancers(self):
+        client = getOctaviaClient(self.options)
+        return meta.get_and_munchify('loadbalancers', client.load_balancer_list(
+            project_id=self.cleanup_project_id))
+
+    def list_listeners(self):
+        client = getOctaviaClient(self.options)
+        return meta.get_and_munchify('listeners', client.listener_list(
+            project_id=self.cleanup_project_id))
+
+    def list_pools(self):
+        client = getOctaviaClient(self.options)
+        return meta.get_and_munchify('pools', client.pool_list(
+            project_id=self.cleanup_project_id))
+
+    def cascade(self):
+        # With --octavia-cascade, listeners and pools are deleted by Octavia
+        # along with their load balancer.
+        return self.options.octavia_cascade is True
+
+
+class LoadBalancers(base.ServiceResource, ListLoadBalancerResourcesMixin):
     ORDER = 43
+    SERVICE_TYPE = 'load-balancer'
+    DEPENDS_ON = ('Listeners', 'Pools')
+
+    def __init__(self, creds_manager):
+        super(LoadBalancers, self).__init__(creds_manager)
+        # Load balancers being deleted in cascade.
+        self.deleting = []  # type: list
+        self.deleting_lock = threading.Lock()
+
+    def depends_on(self):
+        if self.cascade():
+            return ()
+        return self.DEPENDS_ON
 
     def check_prerequisite(self):
-        client = getOctaviaClient(self.options)
-        return meta.get_and_munchify('listeners', client.listener_list()) == [] and meta.get_and_munchify('pools', client.pool_list()) == []
+        if self.cascade():
+            return True
+        return self.nothing_left(Listeners, Pools)
 
     def list(self):
+        return self.list_load_balancers()
+
+    def list_statuses(self):
+        return {lb['id']: lb['provisioning_status']
+                for lb in self.list_load_balancers()}
+
+    def exists(self):
         client = getOctaviaClient(self.options)
-        return meta.get_and_munchify('loadbalancers', client.load_balancer_list())
+        return meta.get_and_munchify('loadbalancers', client.load_balancer_list(
+            project_id=self.cleanup_project_id, limit=1)) != []
 
     def delete(self, resource):
         client = getOctaviaClient(self.options)
-        client.load_balancer_delete(resource['id'])
+        if not self.cascade():
+            client.load_balancer_delete(resource['id'])
+            return
+
+        client.load_balancer_delete(resource['id'], cascade=True)
+        future = self.tracker.track(
+            'LoadBalancers', resource['id'], self.list_statuses)
+        with self.deleting_lock:
+            self.deleting.append(future)
+
+    def wait_for_deletions(self, exit):
+        # Cascade deletes are asynchronous.
+        with self.deleting_lock:
+            futures = list(self.deleting)
+        self.tracker.wait(futures, exit=exit)
 
     @staticmethod
     def to_str(resource):
         return "Load Balancer (id='{}', name='{}')".format(
             resource['id'], resource['name'])
 
-class Listeners(base.ServiceResource):
+class Listeners(base.ServiceResource, ListLoadBalancerResourcesMixin):
     ORDER = 41
+    SERVICE_TYPE = 'load-balancer'
+    DEPENDS_ON = ('Pools',)
+
+    def depends_on(self):
+        if self.cascade():
+            return ()
+        return self.DEPENDS_ON
 
     def check_prerequisite(self):
-        client = getOctaviaClient(self.options)
-        return meta.get_and_munchify('pools', client.pool_list()) == []
+        if self.cascade():
+            return True
+        return self.nothing_left(Pools)
 
     def list(self):
+        if self.cascade():
+            return []
+        return self.list_listeners()
+
+    def exists(self):
+        if self.cascade():
+            return False
         client = getOctaviaClient(self.options)
-        return meta.get_and_munchify('listeners', client.listener_list())
+        return meta.get_and_munchify('listeners', client.listener_list(
+            project_id=self.cleanup_project_id, limit=1)) != []
 
     def delete(self, resource):
         client = getOctaviaClient(self.options)
@@ -78,12 +146,21 @@ class Listeners(base.ServiceResource):
         return "Listener (id='{}', name='{}')".format(
             resource['id'], resource['name'])
 
-class Pools(base.ServiceResource):
+class Pools(base.ServiceResource, ListLoadBalancerResourcesMixin):
     ORDER = 40
+    SERVICE_TYPE = 'load-balancer'
         
     def list(self):
+        if self.cascade():
+            return []
+        return self.list_pools()
+
+    def exists(self):
+        if self.cascade():
+            return False
         client = getOctaviaClient(self.options)
-        return meta.get_and_munchify('pools', client.pool_list())
+        return meta.get_and_munchify('pools', client.pool_list(
+            project_id=self.cleanup_project_id, limit=1)) != []
 
     def delete(self, resource):
         client = getOctaviaClient(self.options)
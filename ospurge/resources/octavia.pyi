@@ -9,28 +9,73 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+import threading
 from typing import Any
 from typing import Dict
 from typing import Iterable
+from typing import List
 
+from ospurge.main import CredentialsManager  # noqa: F401
 from ospurge.resources import base
+from ospurge.resources.base import BaseServiceResource
 
 
-class LoadBalancers(base.ServiceResource):
+class ListLoadBalancerResourcesMixin(BaseServiceResource):
+    def list_load_balancers(self) -> List[Dict[str, Any]]:
+        ...
+
+    def list_listeners(self) -> List[Dict[str, Any]]:
+        ...
+
+    def list_pools(self) -> List[Dict[str, Any]]:
+        ...
+
+    def cascade(self) -> bool:
+        ...
+
+
+class LoadBalancers(base.ServiceResource, ListLoadBalancerResourcesMixin):
+    def __init__(self, creds_manager: 'CredentialsManager') -> None:
+        ...
+
+    def depends_on(self) -> Iterable[str]:
+        ...
+
+    def check_prerequisite(self) -> bool:
+        ...
+
     def list(self) -> Iterable:
         ...
 
+    def list_statuses(self) -> Dict[str, str]:
+        ...
+
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
+    def wait_for_deletions(self, exit: threading.Event) -> None:
+        ...
+
     @staticmethod
     def to_str(resource: Dict[str, Any]) -> str:
         ...
 
-class Listeners(base.ServiceResource):
+class Listeners(base.ServiceResource, ListLoadBalancerResourcesMixin):
+    def depends_on(self) -> Iterable[str]:
+        ...
+
+    def check_prerequisite(self) -> bool:
+        ...
+
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -38,10 +83,13 @@ class Listeners(base.ServiceResource):
     def to_str(resource: Dict[str, Any]) -> str:
         ...
 
-class Pools(base.ServiceResource):
+class Pools(base.ServiceResource, ListLoadBalancerResourcesMixin):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
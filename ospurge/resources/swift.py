@@ -9,10 +9,20 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+import logging
+import typing
+
+import shade
+from six.moves.urllib import parse as urllib_parse
+
 from ospurge.resources import base
 from ospurge.resources.base import BaseServiceResource
+from ospurge.resources import cinder
 from ospurge.resources import glance
 
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import Optional  # noqa: F401
+
 
 class ListObjectsMixin(BaseServiceResource):
     def list_objects(self):
@@ -21,21 +31,75 @@ class ListObjectsMixin(BaseServiceResource):
                 obj['container_name'] = container['name']
                 yield obj
 
+    def has_objects(self):
+        # Ask every container for a single object instead of listing them.
+        for container in self.cloud.list_containers():
+            if self.cloud._object_store_client.get(
+                    self.cloud._get_object_endpoint(container['name']),
+                    params={'format': 'json', 'limit': 1}):
+                return True
+        return False
+
 
 class Objects(base.ServiceResource, glance.ListImagesMixin, ListObjectsMixin):
     ORDER = 73
+    SERVICE_TYPE = 'object-store'
+    DEPENDS_ON = ('Images', 'Backups')
+
+    def __init__(self, creds_manager):
+        super(Objects, self).__init__(creds_manager)
+        self._bulk_delete_limit = None  # type: Optional[int]
 
     def check_prerequisite(self):
-        return (self.list_images_by_owner() == [] and
-                self.cloud.list_volume_backups() == [])
+        return self.nothing_left(glance.Images, cinder.Backups)
 
     def list(self):
         for item in self.list_objects():
             yield item
 
+    def exists(self):
+        return self.has_objects()
+
     def delete(self, resource):
         self.cloud.delete_object(resource['container_name'], resource['name'])
 
+    def delete_batch_size(self):
+        # Ask /info once whether the bulk middleware is there, and how many
+        # objects it accepts per request.
+        if self._bulk_delete_limit is None:
+            try:
+                capabilities = self.cloud.get_object_capabilities()
+            except shade.OpenStackCloudException as exc:
+                logging.info("Can't get Swift capabilities: %r", exc)
+                capabilities = {}
+            bulk_delete = capabilities.get('bulk_delete') or {}
+            self._bulk_delete_limit = max(
+                bulk_delete.get('max_deletes_per_request', 1), 1)
+        return self._bulk_delete_limit
+
+    def delete_batch(self, resources):
+        if self.delete_batch_size() == 1:
+            super(Objects, self).delete_batch(resources)
+            return
+
+        data = '\n'.join(
+            urllib_parse.quote('/{}/{}'.format(
+                resource['container_name'], resource['name']))
+            for resource in resources
+        )
+        result = self.cloud._object_store_client.post(
+            self.cloud._object_store_client.get_endpoint(),
+            params={'bulk-delete': ''}, data=data,
+            headers={'Content-Type': 'text/plain',
+                     'Accept': 'application/json'},
+        )
+        # Failures are reported in the body, the request itself succeeds.
+        if result['Errors'] or not result['Response Status'].startswith('2'):
+            raise shade.OpenStackCloudException(
+                "Bulk delete of {} objects failed with status '{}': "
+                "{}".format(len(resources), result['Response Status'],
+                            result['Errors']))
+
     @staticmethod
     def to_str(resource):
         return "Object '{}' from Container '{}'".format(
@@ -44,13 +108,19 @@ class Objects(base.ServiceResource, glance.ListImagesMixin, ListObjectsMixin):
 
 class Containers(base.ServiceResource, ListObjectsMixin):
     ORDER = 75
+    SERVICE_TYPE = 'object-store'
+    DEPENDS_ON = ('Objects',)
 
     def check_prerequisite(self):
-        return list(self.list_objects()) == []
+        return self.nothing_left(Objects)
 
     def list(self):
         return self.cloud.list_containers()
 
+    def exists(self):
+        return self.cloud._object_store_client.get(
+            '/', params={'format': 'json', 'limit': 1}) != []
+
     def delete(self, resource):
         self.cloud.delete_container(resource['name'])
 
@@ -13,7 +13,9 @@ from typing import Any
 from typing import Dict
 from typing import Iterable
 from typing import Iterator
+from typing import List
 
+from ospurge.main import CredentialsManager  # noqa: F401
 from ospurge.resources import base
 from ospurge.resources.base import BaseServiceResource
 from ospurge.resources import glance
@@ -23,17 +25,32 @@ class ListObjectsMixin(BaseServiceResource):
     def list_objects(self) -> Iterator[Dict[str, Any]]:
         ...
 
+    def has_objects(self) -> bool:
+        ...
+
 
 class Objects(base.ServiceResource, glance.ListImagesMixin, ListObjectsMixin):
+    def __init__(self, creds_manager: 'CredentialsManager') -> None:
+        ...
+
     def check_prerequisite(self) -> bool:
         ...
 
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
+    def delete_batch_size(self) -> int:
+        ...
+
+    def delete_batch(self, resources: List[Dict[str, Any]]) -> None:
+        ...
+
     @staticmethod
     def to_str(resource: Dict[str, Any]) -> str:
         ...
@@ -46,6 +63,9 @@ class Containers(base.ServiceResource, ListObjectsMixin):
     def list(self) -> Iterable:
         ...
 
+    def exists(self) -> bool:
+        ...
+
     def delete(self, resource: Dict[str, Any]) -> None:
         ...
 
@@ -0,0 +1,168 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import logging
+import operator
+import time
+
+from ospurge import metrics
+
+
+def topological_order(resources, dependencies):
+    """
+    Return the values of `resources`, resource managers or their classes by
+    class name, in an order that respects `dependencies` (the names each
+    name depends on), `ORDER` being used to break ties.
+    """
+    dependencies = {k: set(v) for k, v in dependencies.items()}
+    ordered = []
+    while dependencies:
+        ready = sorted(
+            (k for k, v in dependencies.items() if not v),
+            key=lambda k: resources[k].order()
+        )
+        if not ready:
+            raise ValueError(
+                "Circular dependency between resource managers: "
+                "{}".format(', '.join(sorted(dependencies)))
+            )
+        ordered.extend(resources[k] for k in ready)
+        for name in ready:
+            del dependencies[name]
+        for deps in dependencies.values():
+            deps.difference_update(ready)
+    return ordered
+
+
+def backoff(delay=None):
+    """
+    Return the delay before checking again the prerequisites of a resource
+    manager that waited `delay` seconds: 2 seconds, then 4, then every 8
+    seconds.
+    """
+    if delay is None:
+        return 2
+    return min(delay * 2, 8)
+
+
+class DependencyScheduler(object):
+    """
+    Run resource managers as soon as all the resource managers they depend on
+    (see `ServiceResource.DEPENDS_ON`) are done.
+
+    Dependencies on resource managers that were not selected (`--resource` or
+    `--excluderesource`) are ignored.
+    """
+    def __init__(self, resource_managers, exit):
+        self.exit = exit
+        self.resource_managers = {
+            mngr.__class__.__name__: mngr for mngr in resource_managers
+        }
+        self.dependencies = {
+            name: set(dep for dep in mngr.depends_on()
+                      if dep in self.resource_managers)
+            for name, mngr in self.resource_managers.items()
+        }
+        # Fail early if there is a circular dependency.
+        self.topological_order()
+
+    def topological_order(self):
+        """Return the resource managers in an order that respects their
+        dependencies, `ORDER` being used to break ties."""
+        return topological_order(self.resource_managers, self.dependencies)
+
+    def run(self, executor, fn, prerequisite=None):
+        """
+        Call `fn(resource_manager)` in `executor` for every resource manager,
+        each one being submitted the moment its dependencies are done.
+        Returns when all submitted calls are done. No new call is submitted
+        once the `exit` event is set.
+
+        If given, `prerequisite(resource_manager)` is called in `executor`
+        first. While it returns False, the resource manager is parked,
+        without holding a thread of `executor`, and checked again later
+        (see `backoff()`). Returning None
+        gives up on the resource manager, which is then considered done.
+        """
+        pending = {k: set(v) for k, v in self.dependencies.items()}
+        running = {}  # type: dict
+        checking = {}  # type: dict
+        # Name of the parked resource managers -> time of their next check
+        parked = {}  # type: dict
+        parked_at = {}  # type: dict
+        delays = {}  # type: dict
+
+        def check(name):
+            mngr = self.resource_managers[name]
+            checking[executor.submit(prerequisite, mngr)] = name
+
+        def start(name):
+            logging.debug("Starting %s", name)
+            running[executor.submit(fn, self.resource_managers[name])] = name
+
+        def finish(name):
+            for deps in pending.values():
+                deps.discard(name)
+
+        while pending or running or checking or parked:
+            if self.exit.is_set():
+                parked.clear()
+            else:
+                ready = sorted(
+                    (self.resource_managers[k]
+                     for k, v in pending.items() if not v),
+                    key=operator.methodcaller('order')
+                )
+                for mngr in ready:
+                    name = mngr.__class__.__name__
+                    del pending[name]
+                    if prerequisite is None:
+                        start(name)
+                    else:
+                        check(name)
+
+                now = time.time()
+                for name in [k for k, v in parked.items() if v <= now]:
+                    del parked[name]
+                    metrics.get_metrics().record_sleep(
+                        name, 'prerequisite', now - parked_at.pop(name))
+                    check(name)
+
+            if not (running or checking):
+                if not parked:
+                    break
+                # Park on the `exit` event, so that we stop waiting as soon
+                # as we are asked to exit.
+                self.exit.wait(min(parked.values()) - time.time())
+                continue
+
+            timeout = None
+            if parked:
+                timeout = max(min(parked.values()) - time.time(), 0)
+            done, _ = concurrent.futures.wait(
+                list(running) + list(checking), timeout=timeout,
+                return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future in running:
+                    finish(running.pop(future))
+                    continue
+
+                name = checking.pop(future)
+                result = future.result()
+                if result is None or self.exit.is_set():
+                    finish(name)
+                elif result:
+                    start(name)
+                else:
+                    delays[name] = backoff(delays.get(name))
+                    parked_at[name] = time.time()
+                    parked[name] = parked_at[name] + delays[name]
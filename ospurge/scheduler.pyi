@@ -0,0 +1,51 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+
+from ospurge.resources.base import ServiceResource
+
+
+def topological_order(
+    resources: Dict[str, Any], dependencies: Dict[str, Set[str]]
+) -> List[Any]:
+    ...
+
+
+def backoff(delay: Optional[float] = None) -> float:
+    ...
+
+
+class DependencyScheduler(object):
+    def __init__(
+        self, resource_managers: Iterable[ServiceResource],
+        exit: threading.Event
+    ) -> None:
+        ...
+
+    def topological_order(self) -> List[ServiceResource]:
+        ...
+
+    def run(
+        self, executor: concurrent.futures.Executor,
+        fn: Callable[[ServiceResource], None],
+        prerequisite: Optional[
+            Callable[[ServiceResource], Optional[bool]]]=None
+    ) -> None:
+        ...
@@ -0,0 +1,884 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import bisect
+import collections
+import itertools
+import json
+import math
+import re
+import threading
+import time
+import uuid
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib import parse as urllib_parse
+
+ROUTER_INTERFACE_OWNERS = ('network:router_interface',
+                           'network:ha_router_replicated_interface')
+
+# Number of resources of every type in each seeded project. 'large' is the
+# size of the projects that take hours to purge on our clouds.
+PROFILES = {
+    'small': {
+        'servers': 10, 'floatingips': 5, 'routers': 2,
+        'router_interfaces': 4, 'networks': 4, 'ports': 40,
+        'security_groups': 5, 'volumes': 10, 'snapshots': 5,
+        'backups': 5, 'images': 3, 'loadbalancers': 2, 'listeners': 2,
+        'pools': 2, 'vpnservices': 1, 'ipsec_site_connections': 2,
+        'endpoint_groups': 2, 'ikepolicies': 1, 'ipsecpolicies': 1,
+        'containers': 3, 'objects': 300,
+    },
+    'medium': {
+        'servers': 100, 'floatingips': 50, 'routers': 5,
+        'router_interfaces': 20, 'networks': 20, 'ports': 500,
+        'security_groups': 30, 'volumes': 150, 'snapshots': 50,
+        'backups': 50, 'images': 20, 'loadbalancers': 10, 'listeners': 20,
+        'pools': 20, 'vpnservices': 3, 'ipsec_site_connections': 10,
+        'endpoint_groups': 6, 'ikepolicies': 3, 'ipsecpolicies': 3,
+        'containers': 20, 'objects': 50000,
+    },
+    'large': {
+        'servers': 800, 'floatingips': 300, 'routers': 20,
+        'router_interfaces': 100, 'networks': 100, 'ports': 3000,
+        'security_groups': 200, 'volumes': 1000, 'snapshots': 400,
+        'backups': 400, 'images': 100, 'loadbalancers': 50,
+        'listeners': 100, 'pools': 100, 'vpnservices': 10,
+        'ipsec_site_connections': 40, 'endpoint_groups': 20,
+        'ikepolicies': 10, 'ipsecpolicies': 10,
+        'containers': 100, 'objects': 1000000,
+    },
+}
+
+# Collections of every service: (service, path, kind, JSON key). The path is
+# relative to the versioned endpoint of the service.
+COLLECTIONS = [
+    ('compute', 'servers', 'servers', 'servers'),
+    ('network', 'floatingips', 'floatingips', 'floatingips'),
+    ('network', 'ports', 'ports', 'ports'),
+    ('network', 'routers', 'routers', 'routers'),
+    ('network', 'networks', 'networks', 'networks'),
+    ('network', 'security-groups', 'security_groups', 'security_groups'),
+    ('network', 'vpn/ipsec-site-connections', 'ipsec_site_connections',
+     'ipsec_site_connections'),
+    ('network', 'vpn/vpnservices', 'vpnservices', 'vpnservices'),
+    ('network', 'vpn/endpoint-groups', 'endpoint_groups', 'endpoint_groups'),
+    ('network', 'vpn/ikepolicies', 'ikepolicies', 'ikepolicies'),
+    ('network', 'vpn/ipsecpolicies', 'ipsecpolicies', 'ipsecpolicies'),
+    ('volume', 'volumes', 'volumes', 'volumes'),
+    ('volume', 'snapshots', 'snapshots', 'snapshots'),
+    ('volume', 'backups', 'backups', 'backups'),
+    ('image', 'images', 'images', 'images'),
+    ('load-balancer', 'lbaas/loadbalancers', 'loadbalancers',
+     'loadbalancers'),
+    ('load-balancer', 'lbaas/listeners', 'listeners', 'listeners'),
+    ('load-balancer', 'lbaas/pools', 'pools', 'pools'),
+]
+
+# Resources referencing a resource, which can't be deleted while they exist:
+# kind -> [(referencing kind, attribute holding the ID)].
+REFERENCES = {
+    'networks': [('ports', 'network_id')],
+    'routers': [('ports', 'device_id')],
+    'volumes': [('snapshots', 'volume_id')],
+    'loadbalancers': [('listeners', 'loadbalancer_id'),
+                      ('pools', 'loadbalancer_id')],
+    'listeners': [('pools', 'listener_id')],
+    'vpnservices': [('ipsec_site_connections', 'vpnservice_id')],
+    'ikepolicies': [('ipsec_site_connections', 'ikepolicy_id')],
+    'ipsecpolicies': [('ipsec_site_connections', 'ipsecpolicy_id')],
+    'endpoint_groups': [('ipsec_site_connections', 'local_ep_group_id'),
+                        ('ipsec_site_connections', 'peer_ep_group_id')],
+}
+
+# Resources deleted asynchronously: kind -> (status attribute, status while
+# being deleted). They are listed until `delete_delay` seconds after the
+# DELETE request.
+ASYNC_DELETES = {
+    'servers': ('status', 'DELETED'),
+    'volumes': ('status', 'deleting'),
+    'snapshots': ('status', 'deleting'),
+    'backups': ('status', 'deleting'),
+    'loadbalancers': ('provisioning_status', 'PENDING_DELETE'),
+}
+
+# Services listing the resources of every project to admins.
+ADMIN_SERVICES = ('network', 'image', 'load-balancer')
+
+# Attribute holding the project of the resources of every service.
+PROJECT_ATTRIBUTES = {
+    'compute': 'tenant_id',
+    'network': 'tenant_id',
+    'volume': 'project_id',
+    'image': 'owner',
+    'load-balancer': 'project_id',
+}
+
+
+class Table(object):
+    """
+    Rows sorted by key, as the APIs sort their listings for the `marker`
+    pagination. Deleted keys are only dropped from the index once they
+    outnumber the rows, so that deleting millions of Swift objects doesn't
+    shift the index millions of times.
+    """
+    def __init__(self):
+        self.rows = {}  # type: dict
+        self._keys = []  # type: list
+        self._sorted = True
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, key, row):
+        if key not in self.rows:
+            self._keys.append(key)
+            self._sorted = False
+        self.rows[key] = row
+
+    def remove(self, key):
+        return self.rows.pop(key, None) is not None
+
+    def values(self):
+        return self.rows.values()
+
+    def page(self, marker=None, limit=None, match=None):
+        """
+        Return the keys after `marker` of the rows for which `match(row)` is
+        true, at most `limit` of them, and whether there are more.
+        """
+        if not self._sorted or len(self._keys) > 2 * len(self.rows) + 64:
+            self._keys = sorted(self.rows)
+            self._sorted = True
+        start = bisect.bisect_right(self._keys, marker) if marker else 0
+        keys = []
+        for key in itertools.islice(self._keys, start, None):
+            row = self.rows.get(key)
+            if row is None or (match is not None and not match(row)):
+                continue
+            if limit is not None and len(keys) == limit:
+                return keys, True
+            keys.append(key)
+        return keys, False
+
+
+# Services of the cloud, each served on its own port like on a real cloud,
+# so that clients keep a pool of connections per endpoint.
+SERVICES = ('identity', 'compute', 'network', 'volume', 'image',
+            'load-balancer', 'object-store')
+
+
+class FakeCloud(object):
+    """
+    OpenStack cloud served on localhost, holding its resources in memory:
+    Keystone and the compute, network (with VPNaaS), volume, image,
+    load-balancer and object-store endpoints that ospurge uses.
+
+    Every request is delayed by `latency` seconds. Listings are cut into
+    pages of at most `page_size` resources (`swift_listing_limit` objects
+    for Swift), like `osapi_max_limit`; Neutron only paginates when asked
+    to. Swift bulk deletes take at most `bulk_delete_limit` objects, or are
+    not supported if it is None. Volumes, snapshots, backups, servers and
+    load balancers are only gone `delete_delay` seconds after being
+    deleted. Beyond `rate_limit` requests per second to an endpoint,
+    requests are refused with 429 and a `Retry-After` header. Deleting a
+    resource still referenced by others fails, as it does on a real cloud.
+
+    The requests are counted by service and method in `requests`.
+    """
+    def __init__(self, latency=0.0, page_size=1000, delete_delay=0.0,
+                 rate_limit=None, swift_listing_limit=10000,
+                 bulk_delete_limit=10000):
+        self.latency = latency
+        self.page_size = page_size
+        self.delete_delay = delete_delay
+        self.rate_limit = rate_limit
+        self.swift_listing_limit = swift_listing_limit
+        self.bulk_delete_limit = bulk_delete_limit
+
+        self.endpoints = {service: FakeEndpoint(self, service)
+                          for service in SERVICES}
+        self.urls = {service: endpoint.url
+                     for service, endpoint in self.endpoints.items()}
+        self.auth_url = self.urls['identity'] + '/identity/v3'
+
+        self.lock = threading.RLock()
+        self.requests = collections.Counter()  # type: collections.Counter
+        self.tables = {kind: Table() for _, _, kind, _ in COLLECTIONS}
+        # Swift containers of every project: {project_id: {name: Table}}.
+        self.containers = {}  # type: dict
+        self.projects = collections.OrderedDict()  # type: dict
+        self.tokens = {}  # type: dict
+        self.admin_project = self.add_project('admin')
+        self.user_id = uuid.uuid4().hex
+        # Time at which the resources being deleted are gone.
+        self._gone_at = {}  # type: dict
+
+    def start(self):
+        for endpoint in self.endpoints.values():
+            # Poll often so that stop() doesn't wait half a second for
+            # every endpoint.
+            thread = threading.Thread(target=endpoint.serve_forever,
+                                      kwargs={'poll_interval': 0.01})
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        for endpoint in self.endpoints.values():
+            endpoint.shutdown()
+            endpoint.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def add_project(self, name):
+        project_id = uuid.uuid4().hex
+        self.projects[project_id] = {
+            'id': project_id, 'name': name, 'enabled': True,
+            'domain_id': 'default', 'description': '',
+            'is_domain': False, 'parent_id': 'default',
+        }
+        self.containers[project_id] = {}
+        return project_id
+
+    def find_project(self, name_or_id):
+        for project in self.projects.values():
+            if name_or_id in (project['id'], project['name']):
+                return project
+        return None
+
+    def catalog(self, project_id):
+        endpoints = [
+            ('identity', '/identity/v3'),
+            ('compute', '/compute/v2.1'),
+            ('network', '/network'),
+            ('volumev2', '/volume/v2/' + project_id),
+            ('volumev3', '/volume/v3/' + project_id),
+            ('block-storage', '/volume/v3/' + project_id),
+            ('image', '/image'),
+            ('load-balancer', '/load-balancer'),
+            ('object-store', '/object-store/v1/AUTH_' + project_id),
+        ]
+        return [{
+            'id': service_type, 'type': service_type, 'name': service_type,
+            'endpoints': [{
+                'id': '{}-{}'.format(service_type, interface),
+                'interface': interface, 'region': 'RegionOne',
+                'region_id': 'RegionOne',
+                'url': self.urls[path.split('/')[1]] + path,
+            } for interface in ('public', 'internal', 'admin')],
+        } for service_type, path in endpoints]
+
+    def seed(self, name, profile='small', **counts):
+        """
+        Create a project and its resources, as many of every type as in the
+        `profile` (see `PROFILES`) unless given in `counts`. Return the ID of
+        the project.
+        """
+        counts = dict(PROFILES[profile], **counts)
+        project_id = self.add_project(name)
+        with self.lock:
+            _Seeder(self, project_id, counts).seed()
+        return project_id
+
+    def add(self, kind, row):
+        with self.lock:
+            self.tables[kind].add(row['id'], row)
+        return row
+
+    def add_objects(self, project_id, container, names):
+        """Add the objects `names` to a Swift container of the project."""
+        with self.lock:
+            table = self.containers[project_id].setdefault(container, Table())
+            for name in names:
+                table.add(name, 1)
+
+    def remaining(self, project_id):
+        """Number of resources of every type left in the project."""
+        with self.lock:
+            self._expire()
+            counts = {}
+            for service, _, kind, _ in COLLECTIONS:
+                attribute = PROJECT_ATTRIBUTES[service]
+                counts[kind] = sum(1 for row in self.tables[kind].values()
+                                   if row[attribute] == project_id)
+            # Ports left behind by Neutron itself.
+            counts['ports'] -= sum(
+                1 for row in self.tables['ports'].values()
+                if row['tenant_id'] == project_id and
+                row['device_owner'] == 'network:dhcp')
+            # Every project keeps its default security group.
+            counts['security_groups'] -= sum(
+                1 for row in self.tables['security_groups'].values()
+                if row['tenant_id'] == project_id and
+                row['name'] == 'default')
+            containers = self.containers[project_id]
+            counts['containers'] = len(containers)
+            counts['objects'] = sum(len(t) for t in containers.values())
+        return counts
+
+    def stats(self):
+        """Requests received by service and method, and their total."""
+        with self.lock:
+            return {'total': sum(self.requests.values()),
+                    'requests': {' '.join(key): count for key, count
+                                 in sorted(self.requests.items())}}
+
+    def _expire(self):
+        now = time.time()
+        for (kind, key), gone_at in list(self._gone_at.items()):
+            if gone_at <= now:
+                del self._gone_at[(kind, key)]
+                self._remove(kind, self.tables[kind].rows.get(key))
+
+    def _remove(self, kind, row):
+        if row is None:
+            return
+        self.tables[kind].remove(row['id'])
+        if kind == 'networks':
+            # Neutron deletes the DHCP ports along with their network.
+            for port in list(self.tables['ports'].values()):
+                if port['network_id'] == row['id']:
+                    self.tables['ports'].remove(port['id'])
+        elif kind == 'loadbalancers':
+            # Cascade delete.
+            for child_kind in ('listeners', 'pools'):
+                for child in list(self.tables[child_kind].values()):
+                    if child['loadbalancer_id'] == row['id']:
+                        self.tables[child_kind].remove(child['id'])
+
+    def visible(self, kind, row, project_id):
+        """
+        Whether a token scoped to `project_id` can see `row`. Tokens scoped
+        to the admin project are admin tokens.
+        """
+        service = _SERVICES[kind]
+        if project_id == self.admin_project and service in ADMIN_SERVICES:
+            return True
+        if kind == 'images' and row['visibility'] == 'public':
+            return True
+        return row[PROJECT_ATTRIBUTES[service]] == project_id
+
+    def list(self, kind, project_id, query, limit, marker):
+        attribute = PROJECT_ATTRIBUTES[_SERVICES[kind]]
+        filters = {}
+        for name, values in query.items():
+            if name in ('limit', 'marker', 'fields', 'sort_key', 'sort_dir',
+                        'all_tenants', 'all_projects'):
+                continue
+            if name in ('tenant_id', 'project_id', 'owner'):
+                name = attribute
+            filters[name] = values
+
+        def match(row):
+            if not self.visible(kind, row, project_id):
+                return False
+            return all(str(row.get(name)) in values
+                       for name, values in filters.items())
+
+        with self.lock:
+            self._expire()
+            table = self.tables[kind]
+            keys, more = table.page(marker, limit, match)
+            return [table.rows[key] for key in keys], more
+
+    def delete(self, kind, project_id, key, cascade=False):
+        """
+        Delete the resource, return the HTTP status of the answer: 404 if
+        it doesn't exist, 409 if it is in use.
+        """
+        with self.lock:
+            self._expire()
+            row = self.tables[kind].rows.get(key)
+            if row is None or not self.visible(kind, row, project_id):
+                return 404
+            if (kind, key) in self._gone_at:
+                return 409
+            for other_kind, reference in REFERENCES.get(kind, []):
+                if cascade:
+                    break
+                for other in self.tables[other_kind].values():
+                    if other.get(reference) != key:
+                        continue
+                    if (kind == 'networks' and
+                            other['device_owner'] == 'network:dhcp'):
+                        continue
+                    if (kind == 'routers' and other['device_owner']
+                            not in ROUTER_INTERFACE_OWNERS):
+                        continue
+                    return 409
+            if kind in ASYNC_DELETES and self.delete_delay > 0:
+                status_attribute, status = ASYNC_DELETES[kind]
+                row[status_attribute] = status
+                self._gone_at[(kind, key)] = time.time() + self.delete_delay
+            else:
+                self._remove(kind, row)
+            return 204
+
+
+_SERVICES = {kind: service for service, _, kind, _ in COLLECTIONS}
+
+
+class _Seeder(object):
+    """Create the resources of a project for `FakeCloud.seed()`."""
+    def __init__(self, cloud, project_id, counts):
+        self.cloud = cloud
+        self.project_id = project_id
+        self.counts = counts
+        self.sequence = itertools.count()
+
+    def ids(self, kind):
+        return [self.add(kind)['id'] for _ in range(self.counts[kind])]
+
+    def add(self, kind, **attributes):
+        number = next(self.sequence)
+        row = {
+            'id': str(uuid.uuid4()),
+            'name': '{}-{}'.format(kind, number),
+            'created_at': '2018-01-01T00:00:{:02d}Z'.format(number % 60),
+            'tenant_id': self.project_id,
+            'project_id': self.project_id,
+        }
+        row.update(_TEMPLATES.get(kind, {}))
+        row.update(attributes)
+        if kind == 'images':
+            row['owner'] = self.project_id
+        return self.cloud.add(kind, row)
+
+    def seed(self):
+        for _ in range(self.counts['servers']):
+            self.add('servers', status='ACTIVE', user_id=self.cloud.user_id)
+
+        self.add('security_groups', name='default')
+        self.ids('security_groups')
+
+        networks = self.ids('networks')
+        for network_id in networks:
+            self.add('ports', network_id=network_id,
+                     device_owner='network:dhcp', device_id='dhcp')
+        for i in range(self.counts['ports']):
+            self.add('ports', network_id=networks[i % len(networks)])
+        for i in range(self.counts['floatingips']):
+            self.add('floatingips', floating_network_id=networks[0])
+
+        routers = self.ids('routers')
+        for i in range(self.counts['router_interfaces']):
+            self.add('ports', network_id=networks[i % len(networks)],
+                     device_owner='network:router_interface',
+                     device_id=routers[i % len(routers)])
+
+        volumes = []
+        for _ in range(self.counts['volumes']):
+            volume = self.add('volumes', status='available')
+            volume['os-vol-tenant-attr:tenant_id'] = self.project_id
+            volumes.append(volume['id'])
+        for i in range(self.counts['snapshots']):
+            self.add('snapshots', volume_id=volumes[i % len(volumes)])
+        for i in range(self.counts['backups']):
+            self.add('backups', volume_id=volumes[i % len(volumes)])
+
+        self.ids('images')
+
+        loadbalancers = self.ids('loadbalancers')
+        listeners = []
+        for i in range(self.counts['listeners']):
+            listeners.append(self.add(
+                'listeners',
+                loadbalancer_id=loadbalancers[i % len(loadbalancers)],
+                loadbalancers=[{'id': loadbalancers[i % len(loadbalancers)]}]
+            ))
+        for i in range(self.counts['pools']):
+            listener = listeners[i % len(listeners)]
+            self.add('pools', loadbalancer_id=listener['loadbalancer_id'],
+                     listener_id=listener['id'])
+
+        vpnservices = [self.add('vpnservices', router_id=routers[0])['id']
+                       for _ in range(self.counts['vpnservices'])]
+        endpoint_groups = self.ids('endpoint_groups')
+        ikepolicies = self.ids('ikepolicies')
+        ipsecpolicies = self.ids('ipsecpolicies')
+        for i in range(self.counts['ipsec_site_connections']):
+            self.add(
+                'ipsec_site_connections',
+                vpnservice_id=vpnservices[i % len(vpnservices)],
+                ikepolicy_id=ikepolicies[i % len(ikepolicies)],
+                ipsecpolicy_id=ipsecpolicies[i % len(ipsecpolicies)],
+                local_ep_group_id=endpoint_groups[i % len(endpoint_groups)],
+                peer_ep_group_id=endpoint_groups[-1 - i %
+                                                 len(endpoint_groups)])
+
+        containers = self.cloud.containers[self.project_id]
+        names = ['container-{}'.format(i)
+                 for i in range(self.counts['containers'])]
+        for name in names:
+            containers[name] = Table()
+        for i in range(self.counts['objects']):
+            # Objects are rows of their container, without copies of their
+            # name, so that millions of them fit in memory.
+            containers[names[i % len(names)]].add('obj-{:08d}'.format(i), 1)
+
+
+# Attributes of the resources of every type, for the normalization of shade.
+_TEMPLATES = {
+    'servers': {'addresses': {}, 'flavor': {'id': 'flavor'},
+                'image': {'id': 'image'}, 'metadata': {}, 'links': [],
+                'OS-EXT-AZ:availability_zone': 'nova',
+                'OS-EXT-STS:task_state': None,
+                'OS-EXT-STS:vm_state': 'active', 'key_name': None,
+                'security_groups': [], 'created': '2018-01-01T00:00:00Z',
+                'updated': '2018-01-01T00:00:00Z'},
+    'networks': {'router:external': False, 'shared': False,
+                 'status': 'ACTIVE', 'subnets': [], 'admin_state_up': True},
+    'ports': {'device_owner': '', 'device_id': '', 'status': 'ACTIVE',
+              'fixed_ips': [], 'mac_address': 'fa:16:3e:00:00:00',
+              'security_groups': [], 'admin_state_up': True},
+    'routers': {'status': 'ACTIVE', 'admin_state_up': True,
+                'external_gateway_info': None},
+    'floatingips': {'status': 'DOWN', 'floating_ip_address': '192.0.2.1',
+                    'fixed_ip_address': None, 'port_id': None,
+                    'router_id': None},
+    'security_groups': {'description': '', 'security_group_rules': []},
+    'volumes': {'size': 1, 'attachments': [], 'metadata': {},
+                'bootable': 'false', 'availability_zone': 'nova',
+                'volume_type': None},
+    'snapshots': {'status': 'available', 'size': 1, 'metadata': {}},
+    'backups': {'status': 'available', 'size': 1, 'parent_id': None,
+                'is_incremental': False},
+    'images': {'status': 'active', 'visibility': 'private',
+               'container_format': 'bare', 'disk_format': 'raw',
+               'size': 0, 'min_disk': 0, 'min_ram': 0, 'tags': [],
+               'protected': False},
+    'loadbalancers': {'provisioning_status': 'ACTIVE',
+                      'operating_status': 'ONLINE', 'listeners': [],
+                      'pools': []},
+    'listeners': {'provisioning_status': 'ACTIVE', 'protocol': 'HTTP',
+                  'protocol_port': 80},
+    'pools': {'provisioning_status': 'ACTIVE', 'protocol': 'HTTP',
+              'lb_algorithm': 'ROUND_ROBIN'},
+    'vpnservices': {'status': 'ACTIVE'},
+    'ipsec_site_connections': {'status': 'ACTIVE'},
+}
+
+_VERSIONED_PATH = re.compile(
+    r'^/(?P<service>[a-z-]+)(/v[0-9.]+)?(?P<rest>/.*)?$')
+
+
+class FakeEndpoint(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """The endpoint of a service of a `FakeCloud`, on its own port."""
+    daemon_threads = True
+    # Enough pending connections for hundreds of concurrent clients.
+    request_queue_size = 1024
+
+    def __init__(self, cloud, service):
+        BaseHTTPServer.HTTPServer.__init__(
+            self, ('127.0.0.1', 0), FakeCloudHandler)
+        self.cloud = cloud
+        self.service = service
+        self.url = 'http://127.0.0.1:{}'.format(self.server_port)
+        self._lock = threading.Lock()
+        self._allowance = float(cloud.rate_limit or 0)
+        self._last_request = time.time()
+
+    def throttle(self):
+        """
+        Return the seconds to wait if over the `rate_limit` of the cloud,
+        else None.
+        """
+        rate_limit = self.cloud.rate_limit
+        if not rate_limit:
+            return None
+        with self._lock:
+            now = time.time()
+            self._allowance = min(
+                self._allowance + (now - self._last_request) * rate_limit,
+                rate_limit)
+            self._last_request = now
+            if self._allowance < 1:
+                return (1 - self._allowance) / rate_limit
+            self._allowance -= 1
+        return None
+
+
+class FakeCloudHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode() if length else ''
+
+    def handle_request(self):
+        cloud = self.server.cloud  # type: FakeCloud
+        url = urllib_parse.urlparse(self.path)
+        match = _VERSIONED_PATH.match(url.path)
+        service = match.group('service') if match else 'unknown'
+        # Read the body even if the request is refused, the connection is
+        # reused.
+        body = self.read_body()
+        with cloud.lock:
+            cloud.requests[(self.server.service, self.command)] += 1
+
+        wait = self.server.throttle()
+        if wait is not None:
+            return self.reply(429, {'message': 'Rate limit exceeded'}, {
+                'Retry-After': str(int(math.ceil(wait)))})
+        if cloud.latency:
+            time.sleep(cloud.latency)
+
+        query = urllib_parse.parse_qs(url.query, keep_blank_values=True)
+        if url.path == '/info':
+            capabilities = {'swift': {}}  # type: dict
+            if cloud.bulk_delete_limit is not None:
+                capabilities['bulk_delete'] = {
+                    'max_deletes_per_request': cloud.bulk_delete_limit}
+            return self.reply(200, capabilities)
+        if match is None:
+            return self.reply(404)
+        rest = (match.group('rest') or '/').rstrip('/') or '/'
+        if service == 'identity':
+            return self.handle_identity(rest, body)
+
+        token = cloud.tokens.get(self.headers.get('X-Auth-Token'))
+        if token is None:
+            return self.reply(401, {'error': 'Unauthorized'})
+        project_id = token['project']['id'] if 'project' in token else None
+
+        if service == 'object-store':
+            return self.handle_swift(rest, query, body)
+        if rest == '/':
+            return self.reply(200, self.versions(service))
+        if service == 'volume':
+            # Strip the project ID.
+            rest = '/' + rest.lstrip('/').partition('/')[2]
+        if rest.endswith('.json'):
+            rest = rest[:-len('.json')]
+        return self.handle_collection(service, rest, query, body, project_id)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = \
+        handle_request
+
+    def versions(self, service):
+        url = '{}/{}/'.format(self.server.url, service)
+        version = {'compute': 'v2.1', 'network': 'v2.0', 'volume': 'v3',
+                   'image': 'v2', 'load-balancer': 'v2'}.get(service, 'v1')
+        return {'versions': [{
+            'id': '{}.0'.format(version) if service == 'image' else version,
+            'status': 'CURRENT', 'version': '', 'min_version': '',
+            'links': [{'rel': 'self', 'href': url + version + '/'}],
+        }]}
+
+    def handle_identity(self, rest, body):
+        cloud = self.server.cloud  # type: FakeCloud
+        if rest in ('/', ''):
+            return self.reply(200, {'version': {
+                'id': 'v3.10', 'status': 'stable',
+                'links': [{'rel': 'self',
+                           'href': self.server.url + '/identity/v3/'}],
+                'media-types': [{
+                    'base': 'application/json',
+                    'type': 'application/vnd.openstack.identity-v3+json'}],
+            }})
+        if rest == '/auth/tokens' and self.command == 'POST':
+            return self.issue_token(json.loads(body)['auth'])
+        if rest.startswith('/projects'):
+            return self.handle_projects(rest)
+        if rest.startswith('/users/'):
+            return self.reply(200, {'user': {
+                'id': cloud.user_id, 'name': 'admin',
+                'domain_id': 'default', 'enabled': True}})
+        if rest == '/users':
+            return self.reply(200, {'users': [{
+                'id': cloud.user_id, 'name': 'admin',
+                'domain_id': 'default', 'enabled': True}]})
+        if rest == '/roles':
+            return self.reply(200, {'roles': [
+                {'id': 'admin', 'name': 'admin'}]})
+        if rest == '/role_assignments':
+            return self.reply(200, {'role_assignments': []})
+        return self.reply(404)
+
+    def issue_token(self, auth):
+        cloud = self.server.cloud  # type: FakeCloud
+        scope = auth.get('scope', {}).get('project', {})
+        project = cloud.find_project(
+            scope.get('id') or scope.get('name') or cloud.admin_project)
+        if project is None:
+            return self.reply(401, {'error': 'Unknown project'})
+        token_id = uuid.uuid4().hex
+        token = {
+            'methods': ['password'],
+            'expires_at': time.strftime(
+                '%Y-%m-%dT%H:%M:%S.000000Z', time.gmtime(time.time() + 3600)),
+            'issued_at': time.strftime(
+                '%Y-%m-%dT%H:%M:%S.000000Z', time.gmtime()),
+            'user': {'id': cloud.user_id, 'name': 'admin',
+                     'domain': {'id': 'default', 'name': 'Default'}},
+            'project': {'id': project['id'], 'name': project['name'],
+                        'domain': {'id': 'default', 'name': 'Default'}},
+            'roles': [{'id': 'admin', 'name': 'admin'}],
+            'catalog': cloud.catalog(project['id']),
+        }
+        with cloud.lock:
+            cloud.tokens[token_id] = token
+        return self.reply(201, {'token': token},
+                          {'X-Subject-Token': token_id})
+
+    def handle_projects(self, rest):
+        cloud = self.server.cloud  # type: FakeCloud
+        parts = rest.split('/')
+        if len(parts) == 2:
+            return self.reply(200, {'projects': list(
+                cloud.projects.values())})
+        project = cloud.find_project(parts[2])
+        if project is None:
+            return self.reply(404)
+        if len(parts) > 3:
+            # Role grants and revocations.
+            return self.reply(204)
+        return self.reply(200, {'project': project})
+
+    def handle_collection(self, service, rest, query, body, project_id):
+        cloud = self.server.cloud  # type: FakeCloud
+        for collection_service, path, kind, key in COLLECTIONS:
+            prefix = '/' + path
+            if collection_service == service and (
+                    rest == prefix or rest.startswith(prefix + '/')):
+                break
+        else:
+            return self.reply(404)
+        parts = [p for p in rest[len(prefix):].split('/') if p]
+        if parts == ['detail']:
+            parts = []
+
+        if not parts:
+            if self.command != 'GET':
+                return self.reply(405)
+            return self.list_collection(service, path, kind, key, query,
+                                        project_id)
+
+        resource_id = parts[0]
+        if len(parts) == 2 and parts[1] == 'remove_router_interface':
+            port_id = json.loads(body).get('port_id')
+            status = cloud.delete('ports', project_id, port_id)
+            return self.reply(200 if status == 204 else status,
+                              {'id': resource_id, 'port_id': port_id})
+        if self.command == 'DELETE':
+            cascade = query.get('cascade') == ['true']
+            status = cloud.delete(kind, project_id, resource_id, cascade)
+            if status == 204 and service in ('volume', 'compute'):
+                status = 202
+            return self.reply(status)
+        rows, _ = cloud.list(kind, project_id, {'id': [resource_id]},
+                              None, None)
+        if not rows:
+            return self.reply(404)
+        return self.reply(200, {key[:-1]: rows[0]})
+
+    def list_collection(self, service, path, kind, key, query, project_id):
+        cloud = self.server.cloud  # type: FakeCloud
+        limit = int(query['limit'][0]) if 'limit' in query else None
+        if service != 'network' or limit is not None:
+            # Neutron only paginates when asked to.
+            limit = min(limit or cloud.page_size, cloud.page_size)
+        marker = query.get('marker', [None])[0]
+        rows, more = cloud.list(kind, project_id, query, limit, marker)
+        body = {key: rows}  # type: dict
+        if more and rows:
+            params = dict((name, values) for name, values in query.items()
+                          if name not in ('marker', 'limit'))
+            params.update(marker=[rows[-1]['id']], limit=[limit])
+            href = '/{}/{}?{}'.format(
+                self.path.split('?')[0].rsplit('/' + path, 1)[0].strip('/'),
+                path, urllib_parse.urlencode(params, doseq=True))
+            if service == 'image':
+                body['next'] = '/v2/{}?{}'.format(
+                    path, urllib_parse.urlencode(params, doseq=True))
+            else:
+                body['{}_links'.format(key)] = [
+                    {'rel': 'next', 'href': self.server.url + href}]
+        return self.reply(200, body)
+
+    def handle_swift(self, rest, query, body):
+        cloud = self.server.cloud  # type: FakeCloud
+        account, _, path = rest.lstrip('/').partition('/')
+        containers = cloud.containers.get(account[len('AUTH_'):])
+        if containers is None:
+            return self.reply(404)
+        container_name, _, object_name = urllib_parse.unquote(
+            path).partition('/')
+
+        if self.command == 'POST' and 'bulk-delete' in query:
+            deleted = 0
+            names = body.splitlines()
+            with cloud.lock:
+                for name in names:
+                    container, _, obj = urllib_parse.unquote(
+                        name)[1:].partition('/')
+                    if container in containers and \
+                            containers[container].remove(obj):
+                        deleted += 1
+            return self.reply(200, {
+                'Number Deleted': deleted,
+                'Number Not Found': len(names) - deleted,
+                'Response Status': '200 OK', 'Errors': []})
+
+        limit = min(int(query.get('limit', [cloud.swift_listing_limit])[0]),
+                    cloud.swift_listing_limit)
+        marker = query.get('marker', [None])[0]
+        with cloud.lock:
+            if not container_name:
+                names = sorted(containers)
+                if marker:
+                    names = names[bisect.bisect_right(names, marker):]
+                return self.reply(200, [
+                    {'name': name, 'count': len(containers[name]),
+                     'bytes': 0} for name in names[:limit]])
+
+            container = containers.get(container_name)
+            if container is None:
+                return self.reply(404)
+            if not object_name:
+                if self.command == 'DELETE':
+                    if len(container):
+                        return self.reply(409)
+                    del containers[container_name]
+                    return self.reply(204)
+                names, _ = container.page(marker, limit)
+                return self.reply(200, [
+                    {'name': name, 'bytes': 0, 'hash': '',
+                     'content_type': 'application/octet-stream',
+                     'last_modified': '2018-01-01T00:00:00.000000'}
+                    for name in names])
+
+            if object_name not in container.rows:
+                return self.reply(404)
+            if self.command == 'DELETE':
+                container.remove(object_name)
+                return self.reply(204)
+            return self.reply(200, headers={'X-Object-Meta-Fake': 'true'})
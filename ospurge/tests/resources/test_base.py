@@ -9,31 +9,14 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
-import time
-
 import six
 
-from ospurge import exceptions
 from ospurge.resources import base
 from ospurge.tests import mock
 from ospurge.tests import unittest
 import logging
 
 
-def generate_timeout_series(timeout):
-    """Generate a series of times that exceeds the given timeout.
-    Yields a series of fake time.time() floating point numbers
-    such that the difference between each pair in the series just
-    exceeds the timeout value that is passed in.  Useful for
-    mocking time.time() in methods that otherwise wait for timeout
-    seconds.
-    """
-    iteration = 0
-    while True:
-        iteration += 1
-        yield (iteration * timeout) + iteration
-
-
 class SignatureMismatch(Exception):
     pass
 
@@ -174,9 +157,14 @@ class TestServiceResource(unittest.TestCase):
                          creds_manager.project_id)
 
         self.assertEqual(12, resource_manager.order())
+        self.assertEqual((), resource_manager.depends_on())
         self.assertEqual(True, resource_manager.check_prerequisite())
 
         self.assertRaises(NotImplementedError, resource_manager.delete, '')
+        self.assertIsNone(resource_manager.wait_for_deletions(mock.Mock()))
+        self.assertEqual(1, resource_manager.delete_batch_size())
+        self.assertRaises(NotImplementedError,
+                          resource_manager.delete_batch, [''])
         self.assertRaises(NotImplementedError, resource_manager.to_str, '')
         self.assertRaises(NotImplementedError, resource_manager.list)
 
@@ -197,44 +185,37 @@ class TestServiceResource(unittest.TestCase):
         resource.get.side_effect = [42, resource_manager.cleanup_project_id]
         self.assertEqual(True, resource_manager.should_delete(resource))
 
-    @mock.patch('time.sleep', autospec=True)
     @mock.patch.multiple(base.ServiceResource, ORDER=12,
                          __abstractmethods__=set())
-    @mock.patch.object(base.ServiceResource, 'check_prerequisite',
-                       return_value=False)
-    def test_wait_for_check_prerequisite_runtimeerror(
-            self, mock_check_prerequisite, mock_sleep):
+    def test_exists(self):
         resource_manager = base.ServiceResource(mock.Mock())
-        mock_exit = mock.Mock(is_set=mock.Mock(return_value=False))
-
-        with mock.patch('time.time') as mock_time:
-            mock_time.side_effect = generate_timeout_series(675)
-            self.assertRaisesRegex(
-                exceptions.TimeoutError, "^Timeout exceeded .*",
-                resource_manager.wait_for_check_prerequisite, mock_exit
-            )
-        self.assertEqual(mock_check_prerequisite.call_args_list,
-                         [mock.call()] * (2700 // 675 - 1))
-        self.assertEqual(mock_sleep.call_args_list,
-                         [mock.call(i) for i in (2, 4, 8)])
-
-        mock_sleep.reset_mock()
-        mock_check_prerequisite.reset_mock()
-        mock_exit.is_set.return_value = True
-        self.assertRaisesRegex(
-            RuntimeError, ".* exited because it was interrupted .*",
-            resource_manager.wait_for_check_prerequisite, mock_exit
-        )
+        resources = [{'project_id': 'foo'},
+                     {'project_id': resource_manager.cleanup_project_id},
+                     {'project_id': resource_manager.cleanup_project_id}]
+
+        with mock.patch.object(resource_manager, 'list',
+                               return_value=resources):
+            self.assertEqual(True, resource_manager.exists())
+
+        with mock.patch.object(resource_manager, 'list',
+                               return_value=resources[:1]):
+            self.assertEqual(False, resource_manager.exists())
 
-    @mock.patch('time.sleep', mock.Mock(spec_set=time.sleep))
     @mock.patch.multiple(base.ServiceResource, ORDER=12,
                          __abstractmethods__=set())
-    def test_wait_for_check_prerequisite_nominal(self):
-        resource_manager = base.ServiceResource(mock.Mock())
-
-        with mock.patch.object(resource_manager, 'check_prerequisite') as m:
-            m.side_effect = [False, False, True]
-            resource_manager.wait_for_check_prerequisite(
-                mock.Mock(is_set=mock.Mock(return_value=False)))
+    def test_nothing_left(self):
+        creds_manager = mock.Mock()
+        resource_manager = base.ServiceResource(creds_manager)
+        foo = mock.Mock()
+        bar = mock.Mock()
+
+        creds_manager.inventory.exists.side_effect = [False, False]
+        self.assertEqual(True, resource_manager.nothing_left(foo, bar))
+        self.assertEqual(
+            [mock.call(foo.return_value), mock.call(bar.return_value)],
+            creds_manager.inventory.exists.call_args_list
+        )
+        foo.assert_called_once_with(creds_manager)
 
-        self.assertEqual(3, m.call_count)
+        creds_manager.inventory.exists.side_effect = [True]
+        self.assertEqual(False, resource_manager.nothing_left(foo, bar))
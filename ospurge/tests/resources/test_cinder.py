@@ -9,28 +9,202 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+import concurrent.futures
+import threading
 import unittest
 
 import shade
 
+from ospurge import inventory
+from ospurge import tracker
 from ospurge.resources import cinder
+from ospurge.resources import nova
 from ospurge.tests import mock
 
 
 class TestBackups(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0),
+            exit=threading.Event())
 
-    def test_list(self):
-        self.assertIs(self.cloud.list_volume_backups.return_value,
-                      cinder.Backups(self.creds_manager).list())
-        self.cloud.list_volume_backups.assert_called_once_with()
+    @mock.patch('ospurge.utils.paginate')
+    def test_list_backups(self, mock_paginate):
+        self.assertIs(mock_paginate.return_value,
+                      cinder.Backups(self.creds_manager).list_backups())
+        mock_paginate.assert_called_once_with(
+            self.cloud._volume_client, '/backups/detail', 'backups')
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        mock_paginate.return_value = iter([
+            {'id': 'a1', 'volume_id': 'a', 'parent_id': None,
+             'created_at': '2018-01-01T00:00:00'},
+            {'id': 'b1', 'volume_id': 'b', 'parent_id': None,
+             'created_at': '2018-01-01T00:00:00'},
+            {'id': 'a3', 'volume_id': 'a', 'parent_id': 'a2',
+             'created_at': '2018-01-03T00:00:00'},
+            {'id': 'a2', 'volume_id': 'a', 'parent_id': 'a1',
+             'created_at': '2018-01-02T00:00:00'},
+            {'id': 'b2', 'volume_id': 'b', 'parent_id': 'b1',
+             'created_at': '2018-01-02T00:00:00'},
+        ])
+        backups = cinder.Backups(self.creds_manager)
+
+        # The chains of the volumes are interleaved, newest backup first.
+        self.assertEqual(['a3', 'b2', 'a2', 'b1', 'a1'],
+                         [b['id'] for b in backups.list()])
+        self.assertEqual(
+            {'a3': [], 'a2': ['a3'], 'a1': ['a2'], 'b2': [], 'b1': ['b2']},
+            backups.blockers)
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_list_without_parent_id(self, mock_paginate):
+        mock_paginate.return_value = iter([
+            {'id': 'a1', 'volume_id': 'a', 'created_at': '2018-01-01'},
+            {'id': 'a2', 'volume_id': 'a', 'created_at': '2018-01-02'},
+        ])
+        backups = cinder.Backups(self.creds_manager)
+
+        self.assertEqual(['a2', 'a1'], [b['id'] for b in backups.list()])
+        self.assertEqual({'a2': [], 'a1': ['a2']}, backups.blockers)
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_from_plan(self, mock_paginate):
+        backups = cinder.Backups(self.creds_manager)
+        planned = [
+            {'id': 'a1', 'volume_id': 'a', 'parent_id': None},
+            {'id': 'a2', 'volume_id': 'a', 'parent_id': 'a1'},
+        ]
+
+        self.assertEqual(['a2', 'a1'],
+                         [b['id'] for b in backups.from_plan(planned)])
+        self.assertEqual({'a2': [], 'a1': ['a2']}, backups.blockers)
+        mock_paginate.assert_not_called()
+
+    def test_exists(self):
+        self.cloud._volume_client.get.return_value = {'backups': [{}]}
+        self.assertEqual(True, cinder.Backups(self.creds_manager).exists())
+        self.cloud._volume_client.get.assert_called_once_with(
+            '/backups', params={'limit': 1})
 
     def test_delete(self):
-        backup = mock.MagicMock()
-        self.assertIsNone(cinder.Backups(self.creds_manager).delete(backup))
-        self.cloud.delete_volume_backup.assert_called_once_with(backup['id'])
+        tracker = self.creds_manager.tracker
+        tracker.track.return_value = concurrent.futures.Future()
+        backups = cinder.Backups(self.creds_manager)
+
+        self.assertIsNone(backups.delete({'id': 'b1'}))
+        tracker.wait.assert_called_once_with([], exit=self.creds_manager.exit)
+        self.cloud.delete_volume_backup.assert_called_once_with('b1')
+        tracker.track.assert_called_once_with(
+            'Backups', 'b1', backups.list_statuses)
+
+        self.assertFalse(backups.deletions['b1'].done())
+        tracker.track.return_value.set_result(None)
+        self.assertIsNone(backups.deletions['b1'].result(timeout=0))
+
+        exit = mock.Mock()
+        backups.wait_for_deletions(exit)
+        tracker.wait.assert_called_with(
+            [tracker.track.return_value], exit=exit)
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_delete_chains_in_parallel(self, mock_paginate):
+        mock_paginate.return_value = iter([
+            {'id': 'a1', 'volume_id': 'a', 'parent_id': None},
+            {'id': 'a2', 'volume_id': 'a', 'parent_id': 'a1'},
+            {'id': 'b1', 'volume_id': 'b', 'parent_id': None},
+        ])
+        self.creds_manager.tracker = tracker.DeletionTracker()
+        futures = {}
+
+        def track(resource_type, backup_id, list_statuses):
+            futures[backup_id] = concurrent.futures.Future()
+            return futures[backup_id]
+
+        backups = cinder.Backups(self.creds_manager)
+        with mock.patch.object(self.creds_manager.tracker, 'track',
+                               side_effect=track):
+            with concurrent.futures.ThreadPoolExecutor(3) as executor:
+                calls = [executor.submit(backups.delete, backup)
+                         for backup in backups.list()]
+                concurrent.futures.wait(calls[:2])
+
+                # a1 waits for a2 to be gone, b1 doesn't wait for anything.
+                self.assertEqual(
+                    [mock.call('a2'), mock.call('b1')],
+                    sorted(self.cloud.delete_volume_backup.call_args_list))
+                self.assertFalse(calls[2].done())
+
+                futures['a2'].set_result(None)
+                calls[2].result(timeout=10)
+                self.cloud.delete_volume_backup.assert_called_with('a1')
+
+    def test_delete_on_exit(self):
+        self.creds_manager.exit.set()
+        backups = cinder.Backups(self.creds_manager)
+        backups.blockers = {'a1': ['a2']}
+        backups.deletions['a2'] = concurrent.futures.Future()
+
+        # The blocker is no longer waited for, and may still be there.
+        self.assertIsNone(backups.delete({'id': 'a1'}))
+        self.cloud.delete_volume_backup.assert_not_called()
+
+    def test_skip(self):
+        tracker = self.creds_manager.tracker
+        tracker.track.return_value = concurrent.futures.Future()
+        backups = cinder.Backups(self.creds_manager)
+        backups.blockers = {'a1': ['a2']}
+        backups.deletions['a2'] = concurrent.futures.Future()
+
+        # Deleted before the purge was resumed, a2 is tracked until it is
+        # gone.
+        backups.skip({'id': 'a2'})
+        self.cloud.delete_volume_backup.assert_not_called()
+        tracker.track.assert_called_once_with(
+            'Backups', 'a2', backups.list_statuses)
+        self.assertFalse(backups.deletions['a2'].done())
+        tracker.track.return_value.set_result(None)
+        self.assertIsNone(backups.deletions['a2'].result(timeout=0))
+
+    def test_delete_failure(self):
+        self.cloud.delete_volume_backup.side_effect = (
+            shade.OpenStackCloudException(''))
+        backups = cinder.Backups(self.creds_manager)
+        backups.blockers = {'a1': ['a2']}
+
+        self.assertRaises(shade.OpenStackCloudException,
+                          backups.delete, {'id': 'a2'})
+        # The deletion of the backups based on a2 fails as well.
+        self.assertRaises(shade.OpenStackCloudException,
+                          backups.deletions['a2'].result, 0)
+
+    def test_delete_not_found(self):
+        tracker = self.creds_manager.tracker
+        tracker.wait.side_effect = lambda futures, exit: [
+            future.result() for future in futures]
+        self.cloud.delete_volume_backup.side_effect = [
+            shade.OpenStackCloudResourceNotFound(''), None]
+        backups = cinder.Backups(self.creds_manager)
+        backups.blockers = {'a1': ['a2']}
+
+        self.assertRaises(shade.OpenStackCloudResourceNotFound,
+                          backups.delete, {'id': 'a2'})
+        # a2 is gone, the backup it was based on is deleted.
+        self.assertIsNone(backups.deletions['a2'].result(timeout=0))
+        backups.delete({'id': 'a1'})
+        self.assertEqual(
+            [mock.call('a2'), mock.call('a1')],
+            self.cloud.delete_volume_backup.call_args_list)
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_list_statuses(self, mock_paginate):
+        mock_paginate.return_value = iter(
+            [{'id': 'b1', 'status': 'deleting'}])
+        self.assertEqual({'b1': 'deleting'},
+                         cinder.Backups(self.creds_manager).list_statuses())
 
     def test_to_string(self):
         backup = mock.MagicMock()
@@ -41,12 +215,23 @@ class TestBackups(unittest.TestCase):
 class TestSnapshots(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_list(self):
-        self.assertIs(self.cloud.list_volume_snapshots.return_value,
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        self.assertIs(mock_paginate.return_value,
                       cinder.Snapshots(self.creds_manager).list())
-        self.cloud.list_volume_snapshots.assert_called_once_with()
+        mock_paginate.assert_called_once_with(
+            self.cloud._volume_client, '/snapshots/detail', 'snapshots')
+
+    def test_exists(self):
+        self.cloud._volume_client.get.return_value = {'snapshots': []}
+        self.assertEqual(
+            False, cinder.Snapshots(self.creds_manager).exists())
+        self.cloud._volume_client.get.assert_called_once_with(
+            '/snapshots', params={'limit': 1})
 
     def test_delete(self):
         snapshot = mock.MagicMock()
@@ -64,21 +249,38 @@ class TestSnapshots(unittest.TestCase):
 class TestVolumes(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud, project_id=42)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud, project_id=42,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_check_prerequisite(self):
-        self.cloud.list_volume_snapshots.return_value = []
+    @mock.patch.object(nova.Servers, 'exists')
+    @mock.patch.object(cinder.Snapshots, 'exists')
+    def test_check_prerequisite(self, m_snapshots, m_servers):
+        m_snapshots.return_value = False
+        m_servers.return_value = True
         self.assertEqual(
             False,
             cinder.Volumes(self.creds_manager).check_prerequisite()
         )
-        self.cloud.list_volume_snapshots.assert_called_once_with()
-        self.cloud.list_servers.assert_called_once_with()
+        m_servers.return_value = False
+        self.assertEqual(
+            True,
+            cinder.Volumes(self.creds_manager).check_prerequisite()
+        )
 
-    def test_list(self):
-        self.assertIs(self.cloud.list_volumes.return_value,
+    def test_exists(self):
+        self.cloud._volume_client.get.return_value = {'volumes': [{}]}
+        self.assertEqual(True, cinder.Volumes(self.creds_manager).exists())
+        self.cloud._volume_client.get.assert_called_once_with(
+            '/volumes', params={'limit': 1})
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        self.assertIs(mock_paginate.return_value,
                       cinder.Volumes(self.creds_manager).list())
-        self.cloud.list_volumes.assert_called_once_with()
+        mock_paginate.assert_called_once_with(
+            self.cloud._volume_client, '/volumes/detail', 'volumes',
+            normalize=self.cloud._normalize_volumes)
 
     def test_should_delete(self):
         self.assertEqual(
@@ -94,8 +296,17 @@ class TestVolumes(unittest.TestCase):
 
     def test_delete(self):
         volume = mock.MagicMock()
-        self.assertIsNone(cinder.Volumes(self.creds_manager).delete(volume))
-        self.cloud.delete_volume.assert_called_once_with(volume['id'])
+        volumes = cinder.Volumes(self.creds_manager)
+        self.assertIsNone(volumes.delete(volume))
+        self.cloud.delete_volume.assert_called_once_with(
+            volume['id'], wait=False)
+        self.creds_manager.tracker.track.assert_called_once_with(
+            'Volumes', volume['id'], volumes.list_statuses)
+
+        exit = mock.Mock()
+        volumes.wait_for_deletions(exit)
+        self.creds_manager.tracker.wait.assert_called_once_with(
+            [self.creds_manager.tracker.track.return_value], exit=exit)
 
     def test_to_string(self):
         volume = mock.MagicMock()
@@ -13,6 +13,7 @@ import unittest
 
 import shade
 
+from ospurge import inventory
 from ospurge.resources import glance
 from ospurge.tests import mock
 
@@ -23,38 +24,75 @@ class TestListImagesMixin(unittest.TestCase):
         self.img_lister = glance.ListImagesMixin()
         self.img_lister.cloud = self.cloud
         self.img_lister.cleanup_project_id = 42
-        self.img_lister.options = None
+        self.img_lister.options = mock.Mock(delete_shared_resources=True)
 
-    def test_list_images_by_owner_no_image(self):
-        self.cloud.list_images.return_value = []
-        self.assertEqual([], self.img_lister.list_images_by_owner())
+    @mock.patch.object(glance.ListImagesMixin, 'list_images')
+    def test_list_images_by_owner_no_image(self, mock_list_images):
+        mock_list_images.return_value = []
+        self.assertEqual([], list(self.img_lister.list_images_by_owner()))
+        mock_list_images.assert_called_once_with({'owner': 42})
 
-    def test_list_images_by_owner_different_owner(self):
-        self.cloud.list_images.return_value = [
+    @mock.patch.object(glance.ListImagesMixin, 'list_images')
+    def test_list_images_by_owner_different_owner(self, mock_list_images):
+        mock_list_images.return_value = [
             {'owner': 84},
             {'owner': 85}
         ]
-        self.assertEqual([], self.img_lister.list_images_by_owner())
+        self.assertEqual([], list(self.img_lister.list_images_by_owner()))
 
-    def test_list_images_by_owner_public_images(self):
-        self.cloud.list_images.return_value = [
+    @mock.patch.object(glance.ListImagesMixin, 'list_images')
+    def test_list_images_by_owner_public_images(self, mock_list_images):
+        mock_list_images.return_value = [
             {'owner': 42, 'is_public': True},
             {'owner': 42, 'visibility': 'public'},
         ]
-        with mock.patch.object(self.img_lister, 'options',
-                               mock.Mock(delete_shared_resources=True)):
-            self.assertEqual(self.cloud.list_images.return_value,
-                             self.img_lister.list_images_by_owner())
+        self.assertEqual(mock_list_images.return_value,
+                         list(self.img_lister.list_images_by_owner()))
 
-        with mock.patch.object(self.img_lister, 'options',
-                               mock.Mock(delete_shared_resources=False)):
-            self.assertEqual([], self.img_lister.list_images_by_owner())
+        self.cloud._is_client_version.return_value = False
+        self.img_lister.options.delete_shared_resources = False
+        self.assertEqual([], list(self.img_lister.list_images_by_owner()))
+
+    @mock.patch.object(glance.ListImagesMixin, 'list_images')
+    def test_list_images_by_owner_without_public_images(
+            self, mock_list_images):
+        self.img_lister.options.delete_shared_resources = False
+        self.cloud._is_client_version.return_value = True
+        community = {'owner': 42, 'id': 3, 'visibility': 'community'}
+        mock_list_images.side_effect = [[{'owner': 42, 'id': 1}],
+                                        [{'owner': 42, 'id': 2}],
+                                        [community]]
+        self.assertEqual(
+            [{'owner': 42, 'id': 1}, {'owner': 42, 'id': 2}, community],
+            list(self.img_lister.list_images_by_owner()))
+        self.assertEqual(
+            [mock.call({'owner': 42, 'visibility': 'private'}),
+             mock.call({'owner': 42, 'visibility': 'shared'}),
+             mock.call({'owner': 42, 'visibility': 'community'})],
+            mock_list_images.call_args_list
+        )
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_list_images(self, mock_paginate):
+        self.cloud._is_client_version.return_value = True
+        self.assertIs(mock_paginate.return_value,
+                      self.img_lister.list_images({'owner': 42}))
+        self.cloud._is_client_version.assert_called_once_with('image', 2)
+        mock_paginate.assert_called_once_with(
+            self.cloud._image_client, '/images', 'images',
+            params={'owner': 42}, normalize=self.cloud._normalize_images)
+
+        self.cloud._is_client_version.return_value = False
+        self.assertIs(self.cloud.list_images.return_value,
+                      self.img_lister.list_images())
 
 
 class TestImages(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud, project_id=42)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud, project_id=42,
+            inventory=inventory.Inventory(ttl=0))
 
     @mock.patch.object(glance.ListImagesMixin, 'list_images_by_owner')
     def test_list(self, mock_list_images_by_owner):
@@ -13,32 +13,54 @@ import unittest
 
 import shade
 
+from ospurge import inventory
 from ospurge.resources import neutron
+from ospurge.resources import neutron_vpnaas
+from ospurge.resources import nova
 from ospurge.tests import mock
 
 
 class TestFloatingIPs(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
     def test_check_prerequisite(self):
-        self.cloud.list_servers.return_value = ['vm1']
+        with mock.patch.object(nova.Servers, 'exists', return_value=True):
+            self.assertEqual(
+                False,
+                neutron.FloatingIPs(self.creds_manager).check_prerequisite()
+            )
+        with mock.patch.object(nova.Servers, 'exists', return_value=False):
+            self.assertEqual(
+                True,
+                neutron.FloatingIPs(self.creds_manager).check_prerequisite()
+            )
+
+    def test_exists(self):
+        self.cloud._network_client.get.return_value = {'floatingips': []}
         self.assertEqual(
-            False,
-            neutron.FloatingIPs(self.creds_manager).check_prerequisite()
+            False, neutron.FloatingIPs(self.creds_manager).exists())
+        self.cloud._network_client.get.assert_called_once_with(
+            '/floatingips.json',
+            params={'tenant_id': self.creds_manager.project_id, 'limit': 1}
         )
-        self.cloud.list_servers.return_value = []
+
+        self.cloud._network_client.get.return_value = {
+            'floatingips': [{'id': 'fip'}]}
         self.assertEqual(
-            True,
-            neutron.FloatingIPs(self.creds_manager).check_prerequisite()
-        )
+            True, neutron.FloatingIPs(self.creds_manager).exists())
 
-    def test_list(self):
-        self.assertIs(self.cloud.search_floating_ips.return_value,
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        self.assertIs(mock_paginate.return_value,
                       neutron.FloatingIPs(self.creds_manager).list())
-        self.cloud.search_floating_ips.assert_called_once_with(
-            filters={'tenant_id': self.creds_manager.project_id}
+        mock_paginate.assert_called_once_with(
+            self.cloud._network_client, '/floatingips.json', 'floatingips',
+            params={'tenant_id': self.creds_manager.project_id},
+            normalize=self.cloud._normalize_floating_ips
         )
 
     def test_delete(self):
@@ -56,31 +78,44 @@ class TestFloatingIPs(unittest.TestCase):
 class TestRouterInterfaces(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_check_prerequisite(self):
+    @mock.patch.object(neutron.FloatingIPs, 'exists')
+    @mock.patch.object(nova.Servers, 'exists')
+    def test_check_prerequisite(self, m_servers, m_fips):
         ifaces_manager = neutron.RouterInterfaces(self.creds_manager)
 
-        self.cloud.list_servers.return_value = []
-        self.cloud.search_floating_ips.return_value = ["foo"]
+        m_servers.return_value = False
+        m_fips.return_value = True
         self.assertEqual(False, ifaces_manager.check_prerequisite())
 
-        self.cloud.search_floating_ips.return_value = []
+        m_fips.return_value = False
         self.assertEqual(True, ifaces_manager.check_prerequisite())
 
-        self.cloud.list_servers.return_value = ["bar"]
+        m_servers.return_value = True
         self.assertEqual(False, ifaces_manager.check_prerequisite())
 
-        self.cloud.search_floating_ips.assert_called_with(
-            filters={'tenant_id': self.creds_manager.project_id}
+    def test_exists(self):
+        self.cloud._network_client.get.return_value = {'ports': [{}]}
+        self.assertEqual(
+            True, neutron.RouterInterfaces(self.creds_manager).exists())
+        self.cloud._network_client.get.assert_called_once_with(
+            '/ports.json',
+            params={'device_owner': ['network:router_interface',
+                                     'network:ha_router_replicated_interface'],
+                    'tenant_id': self.creds_manager.project_id, 'limit': 1}
         )
 
-    def test_list(self):
-        self.assertIs(self.cloud.list_ports.return_value,
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        self.assertIs(mock_paginate.return_value,
                       neutron.RouterInterfaces(self.creds_manager).list())
-        self.cloud.list_ports.assert_called_once_with(
-            filters={'device_owner': ['network:router_interface', 'network:ha_router_replicated_interface'],
-                     'tenant_id': self.creds_manager.project_id}
+        mock_paginate.assert_called_once_with(
+            self.cloud._network_client, '/ports.json', 'ports',
+            params={'device_owner': ['network:router_interface', 'network:ha_router_replicated_interface'],
+                    'tenant_id': self.creds_manager.project_id}
         )
 
     def test_delete(self):
@@ -103,26 +138,35 @@ class TestRouterInterfaces(unittest.TestCase):
 class TestRouters(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_check_prerequisite(self):
-        self.cloud.list_ports.return_value = []
+    @mock.patch.object(neutron.RouterInterfaces, 'exists')
+    def test_check_prerequisite(self, m_exists):
+        m_exists.return_value = False
         self.assertEqual(
             True, neutron.Routers(self.creds_manager).check_prerequisite())
 
-        self.cloud.list_ports.return_value = ['foo']
+        m_exists.return_value = True
         self.assertEqual(
             False, neutron.Routers(self.creds_manager).check_prerequisite())
 
-        self.cloud.list_ports.assert_called_with(
-            filters={'device_owner': ['network:router_interface','network:ha_router_replicated_interface'],
-                     'tenant_id': self.creds_manager.project_id}
-        )
-
-    def test_list(self):
-        self.assertIs(self.cloud.list_routers.return_value,
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        self.assertIs(mock_paginate.return_value,
                       neutron.Routers(self.creds_manager).list())
-        self.cloud.list_routers.assert_called_once_with()
+        mock_paginate.assert_called_once_with(
+            self.cloud._network_client, '/routers.json', 'routers')
+
+    def test_exists(self):
+        self.cloud._network_client.get.return_value = {'routers': [{}]}
+        self.assertEqual(
+            True, neutron.Routers(self.creds_manager).exists())
+        self.cloud._network_client.get.assert_called_once_with(
+            '/routers.json',
+            params={'tenant_id': self.creds_manager.project_id, 'limit': 1}
+        )
 
     def test_delete(self):
         router = mock.MagicMock()
@@ -138,18 +182,39 @@ class TestRouters(unittest.TestCase):
 class TestPorts(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_list(self):
-        self.cloud.list_ports.return_value = [
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        mock_paginate.return_value = iter([
             {'device_owner': 'network:dhcp'},
             {'device_owner': 'network:router_interface'},
             {'device_owner': ''}
-        ]
-        ports = neutron.Ports(self.creds_manager).list()
+        ])
+        ports = list(neutron.Ports(self.creds_manager).list())
         self.assertEqual([{'device_owner': ''}], ports)
-        self.cloud.list_ports.assert_called_once_with(
-            filters={'tenant_id': self.creds_manager.project_id})
+        mock_paginate.assert_called_once_with(
+            self.cloud._network_client, '/ports.json', 'ports',
+            params={'tenant_id': self.creds_manager.project_id})
+
+    @mock.patch('ospurge.utils.paginate')
+    def test_exists(self, mock_paginate):
+        mock_paginate.return_value = iter([
+            {'device_owner': 'network:dhcp'},
+            {'device_owner': 'network:router_interface'},
+        ])
+        self.assertEqual(False, neutron.Ports(self.creds_manager).exists())
+        # Only the owners of the ports are fetched.
+        mock_paginate.assert_called_once_with(
+            self.cloud._network_client, '/ports.json', 'ports',
+            params={'tenant_id': self.creds_manager.project_id,
+                    'fields': ['id', 'device_owner']})
+
+        mock_paginate.return_value = iter([
+            {'device_owner': 'network:dhcp'}, {'device_owner': ''}])
+        self.assertEqual(True, neutron.Ports(self.creds_manager).exists())
 
     def test_delete(self):
         port = mock.MagicMock()
@@ -165,36 +230,63 @@ class TestPorts(unittest.TestCase):
 class TestNetworks(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
-
-    @mock.patch('ospurge.resources.neutron.getNeutronClient', mock.Mock())
-    def test_check_prerequisite(self):
-        with mock.patch('shade.meta.get_and_munchify', return_value=[]):
-            self.cloud.list_ports.return_value = [{'device_owner': 'network:dhcp'}]
-            self.assertEqual(
-                True, neutron.Networks(self.creds_manager).check_prerequisite())
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
+
+    @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
+    @mock.patch.object(neutron_vpnaas.EndpointGroups, 'exists')
+    @mock.patch.object(neutron.RouterInterfaces, 'exists')
+    @mock.patch.object(neutron.Ports, 'exists')
+    def test_check_prerequisite(self, m_ports, m_ifaces, m_groups):
+        m_ports.return_value = False
+        m_ifaces.return_value = False
+        m_groups.return_value = False
+        self.assertEqual(
+            True, neutron.Networks(self.creds_manager).check_prerequisite())
 
-            self.cloud.list_ports.return_value = [{'device_owner': 'compute:None'}]
-            self.assertEqual(
-                False, neutron.Networks(self.creds_manager).check_prerequisite())
+        m_groups.return_value = True
+        self.assertEqual(
+            False, neutron.Networks(self.creds_manager).check_prerequisite())
 
-            self.cloud.list_ports.assert_called_with(
-                filters={'tenant_id': self.creds_manager.project_id}
-            )
+        m_groups.return_value = False
+        m_ports.return_value = True
+        self.assertEqual(
+            False, neutron.Networks(self.creds_manager).check_prerequisite())
 
-    def test_list(self):
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        mock_paginate.side_effect = lambda *args, **kwargs: iter([
+            {'router:external': True}, {'router:external': True}])
         self.creds_manager.options.delete_shared_resources = False
-        self.cloud.list_networks.return_value = [
-            {'router:external': True}, {'router:external': True}]
-        nw_list = neutron.Networks(self.creds_manager).list()
+        nw_list = list(neutron.Networks(self.creds_manager).list())
         self.assertEqual(0, len(nw_list))
 
         self.creds_manager.options.delete_shared_resources = True
-        nw_list = neutron.Networks(self.creds_manager).list()
+        nw_list = list(neutron.Networks(self.creds_manager).list())
         self.assertEqual(2, len(nw_list))
 
-        self.cloud.list_networks.assert_called_with(
-            filters={'tenant_id': self.creds_manager.project_id}
+        mock_paginate.assert_called_with(
+            self.cloud._network_client, '/networks.json', 'networks',
+            params={'tenant_id': self.creds_manager.project_id}
+        )
+
+    def test_exists(self):
+        self.cloud._network_client.get.return_value = {'networks': []}
+        self.creds_manager.options.delete_shared_resources = False
+        self.assertEqual(
+            False, neutron.Networks(self.creds_manager).exists())
+        self.cloud._network_client.get.assert_called_once_with(
+            '/networks.json',
+            params={'tenant_id': self.creds_manager.project_id, 'limit': 1,
+                    'router:external': False}
+        )
+
+        self.creds_manager.options.delete_shared_resources = True
+        neutron.Networks(self.creds_manager).exists()
+        self.cloud._network_client.get.assert_called_with(
+            '/networks.json',
+            params={'tenant_id': self.creds_manager.project_id, 'limit': 1}
         )
 
     def test_delete(self):
@@ -211,18 +303,40 @@ class TestNetworks(unittest.TestCase):
 class TestSecurityGroups(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_list(self):
-        self.cloud.list_security_groups.return_value = [
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        mock_paginate.return_value = iter([
             {'name': 'default'}, {'name': 'bar'}
-        ]
+        ])
         self.assertEqual(
-            1, len(neutron.SecurityGroups(self.creds_manager).list()))
-        self.cloud.list_security_groups.assert_called_once_with(
-            filters={'tenant_id': self.creds_manager.project_id}
+            [{'name': 'bar'}],
+            list(neutron.SecurityGroups(self.creds_manager).list()))
+        mock_paginate.assert_called_once_with(
+            self.cloud._network_client, '/security-groups.json',
+            'security_groups',
+            params={'tenant_id': self.creds_manager.project_id},
+            normalize=self.cloud._normalize_secgroups
         )
 
+    def test_exists(self):
+        self.cloud._network_client.get.return_value = {
+            'security_groups': [{'name': 'default'}]}
+        self.assertEqual(
+            False, neutron.SecurityGroups(self.creds_manager).exists())
+        self.cloud._network_client.get.assert_called_once_with(
+            '/security-groups.json',
+            params={'tenant_id': self.creds_manager.project_id, 'limit': 2}
+        )
+
+        self.cloud._network_client.get.return_value = {
+            'security_groups': [{'name': 'default'}, {'name': 'bar'}]}
+        self.assertEqual(
+            True, neutron.SecurityGroups(self.creds_manager).exists())
+
     def test_delete(self):
         sg = mock.MagicMock()
         self.assertIsNone(
@@ -13,14 +13,40 @@ import unittest
 
 import shade
 
+from ospurge import inventory
 from ospurge.resources import neutron_vpnaas
 from ospurge.tests import mock
 
 
+class TestListVPNResourcesMixin(unittest.TestCase):
+    def setUp(self):
+        self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud, project_id=42,
+            inventory=inventory.Inventory(ttl=0))
+        self.client = mock.MagicMock()
+
+    def test_listings_are_filtered_on_project(self):
+        with mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', return_value=self.client):
+            neutron_vpnaas.IpSecSiteConnections(self.creds_manager).list()
+            neutron_vpnaas.VPNServices(self.creds_manager).list()
+            neutron_vpnaas.EndpointGroups(self.creds_manager).list()
+            neutron_vpnaas.IKEPolicies(self.creds_manager).list()
+            neutron_vpnaas.IPSecPolicies(self.creds_manager).list()
+        for method in (self.client.list_ipsec_site_connections,
+                       self.client.list_vpnservices,
+                       self.client.list_endpoint_groups,
+                       self.client.list_ikepolicies,
+                       self.client.list_ipsecpolicies):
+            method.assert_called_once_with(tenant_id=42)
+
+
 class TestIpSecSiteConnections(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
     @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
@@ -29,6 +55,17 @@ class TestIpSecSiteConnections(unittest.TestCase):
             self.assertIs(shade.meta.get_and_munchify.return_value,
                       neutron_vpnaas.IpSecSiteConnections(self.creds_manager).list())
 
+    def test_exists(self):
+        self.client.list_ipsec_site_connections.return_value = iter(
+            [{'ipsec_site_connections': [{'id': 'conn1'}]}])
+        with mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', return_value=self.client):
+            self.assertEqual(
+                True,
+                neutron_vpnaas.IpSecSiteConnections(self.creds_manager).exists())
+        self.client.list_ipsec_site_connections.assert_called_once_with(
+            retrieve_all=False, tenant_id=self.creds_manager.project_id,
+            limit=1)
+
     def test_delete(self):
         sg = mock.MagicMock()
         with mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', return_value=self.client) as m:
@@ -45,21 +82,23 @@ class TestIpSecSiteConnections(unittest.TestCase):
 class TestVPNServices(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
-    @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
-    def test_check_prerequisite(self):
-        with mock.patch('shade.meta.get_and_munchify', return_value=["conn1"]):
-            self.assertEqual(
-                False,
-                neutron_vpnaas.VPNServices(self.creds_manager).check_prerequisite()
-            )
-        with mock.patch('shade.meta.get_and_munchify', return_value=[]):
-            self.assertEqual(
-                True,
-                neutron_vpnaas.VPNServices(self.creds_manager).check_prerequisite()
-            )
+    @mock.patch.object(neutron_vpnaas.IpSecSiteConnections, 'exists')
+    def test_check_prerequisite(self, m_exists):
+        m_exists.return_value = True
+        self.assertEqual(
+            False,
+            neutron_vpnaas.VPNServices(self.creds_manager).check_prerequisite()
+        )
+        m_exists.return_value = False
+        self.assertEqual(
+            True,
+            neutron_vpnaas.VPNServices(self.creds_manager).check_prerequisite()
+        )
 
     @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
     def test_list(self):
@@ -67,6 +106,17 @@ class TestVPNServices(unittest.TestCase):
             self.assertIs(shade.meta.get_and_munchify.return_value,
                       neutron_vpnaas.VPNServices(self.creds_manager).list())
 
+    def test_exists(self):
+        self.client.list_vpnservices.return_value = iter([{'vpnservices': []}])
+        with mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient',
+                        return_value=self.client):
+            self.assertEqual(
+                False,
+                neutron_vpnaas.VPNServices(self.creds_manager).exists())
+        self.client.list_vpnservices.assert_called_once_with(
+            retrieve_all=False, tenant_id=self.creds_manager.project_id,
+            limit=1)
+
     def test_delete(self):
         sg = mock.MagicMock()
         with mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', return_value=self.client) as m:
@@ -83,21 +133,23 @@ class TestVPNServices(unittest.TestCase):
 class TestEndpointGroups(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
-    @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
-    def test_check_prerequisite(self):
-        with mock.patch('shade.meta.get_and_munchify', return_value=["conn1"]):
-            self.assertEqual(
-                False,
-                neutron_vpnaas.EndpointGroups(self.creds_manager).check_prerequisite()
-            )
-        with mock.patch('shade.meta.get_and_munchify', return_value=[]):
-            self.assertEqual(
-                True,
-                neutron_vpnaas.EndpointGroups(self.creds_manager).check_prerequisite()
-            )
+    @mock.patch.object(neutron_vpnaas.IpSecSiteConnections, 'exists')
+    def test_check_prerequisite(self, m_exists):
+        m_exists.return_value = True
+        self.assertEqual(
+            False,
+            neutron_vpnaas.EndpointGroups(self.creds_manager).check_prerequisite()
+        )
+        m_exists.return_value = False
+        self.assertEqual(
+            True,
+            neutron_vpnaas.EndpointGroups(self.creds_manager).check_prerequisite()
+        )
 
     @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
     def test_list(self):
@@ -105,6 +157,18 @@ class TestEndpointGroups(unittest.TestCase):
             self.assertIs(shade.meta.get_and_munchify.return_value,
                       neutron_vpnaas.EndpointGroups(self.creds_manager).list())
 
+    def test_exists(self):
+        self.client.list_endpoint_groups.return_value = iter(
+            [{'endpoint_groups': []}])
+        with mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient',
+                        return_value=self.client):
+            self.assertEqual(
+                False,
+                neutron_vpnaas.EndpointGroups(self.creds_manager).exists())
+        self.client.list_endpoint_groups.assert_called_once_with(
+            retrieve_all=False, tenant_id=self.creds_manager.project_id,
+            limit=1)
+
     def test_delete(self):
         sg = mock.MagicMock()
         with mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', return_value=self.client) as m:
@@ -122,21 +186,23 @@ class TestEndpointGroups(unittest.TestCase):
 class TestIKEPolicies(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
-    @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
-    def test_check_prerequisite(self):
-        with mock.patch('shade.meta.get_and_munchify', return_value=["conn1"]):
-            self.assertEqual(
-                False,
-                neutron_vpnaas.IKEPolicies(self.creds_manager).check_prerequisite()
-            )
-        with mock.patch('shade.meta.get_and_munchify', return_value=[]):
-            self.assertEqual(
-                True,
-                neutron_vpnaas.IKEPolicies(self.creds_manager).check_prerequisite()
-            )
+    @mock.patch.object(neutron_vpnaas.IpSecSiteConnections, 'exists')
+    def test_check_prerequisite(self, m_exists):
+        m_exists.return_value = True
+        self.assertEqual(
+            False,
+            neutron_vpnaas.IKEPolicies(self.creds_manager).check_prerequisite()
+        )
+        m_exists.return_value = False
+        self.assertEqual(
+            True,
+            neutron_vpnaas.IKEPolicies(self.creds_manager).check_prerequisite()
+        )
 
     @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
     def test_list(self):
@@ -160,21 +226,23 @@ class TestIKEPolicies(unittest.TestCase):
 class TestIPSecPolicies(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
-    @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
-    def test_check_prerequisite(self):
-        with mock.patch('shade.meta.get_and_munchify', return_value=["conn1"]):
-            self.assertEqual(
-                False,
-                neutron_vpnaas.IPSecPolicies(self.creds_manager).check_prerequisite()
-            )
-        with mock.patch('shade.meta.get_and_munchify', return_value=[]):
-            self.assertEqual(
-                True,
-                neutron_vpnaas.IPSecPolicies(self.creds_manager).check_prerequisite()
-            )
+    @mock.patch.object(neutron_vpnaas.IpSecSiteConnections, 'exists')
+    def test_check_prerequisite(self, m_exists):
+        m_exists.return_value = True
+        self.assertEqual(
+            False,
+            neutron_vpnaas.IPSecPolicies(self.creds_manager).check_prerequisite()
+        )
+        m_exists.return_value = False
+        self.assertEqual(
+            True,
+            neutron_vpnaas.IPSecPolicies(self.creds_manager).check_prerequisite()
+        )
 
     @mock.patch('ospurge.resources.neutron_vpnaas.getNeutronClient', mock.Mock())
     def test_list(self):
@@ -13,6 +13,7 @@ import unittest
 
 import shade
 
+from ospurge import inventory
 from ospurge.resources import nova
 from ospurge.tests import mock
 
@@ -20,12 +21,23 @@ from ospurge.tests import mock
 class TestServers(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_list(self):
-        self.assertIs(self.cloud.list_servers.return_value,
+    @mock.patch('ospurge.utils.paginate')
+    def test_list(self, mock_paginate):
+        self.assertIs(mock_paginate.return_value,
                       nova.Servers(self.creds_manager).list())
-        self.cloud.list_servers.assert_called_once_with()
+        mock_paginate.assert_called_once_with(
+            self.cloud._compute_client, '/servers/detail', 'servers',
+            normalize=self.cloud._normalize_servers)
+
+    def test_exists(self):
+        self.cloud._compute_client.get.return_value = {'servers': []}
+        self.assertEqual(False, nova.Servers(self.creds_manager).exists())
+        self.cloud._compute_client.get.assert_called_once_with(
+            '/servers', params={'limit': 1})
 
     def test_delete(self):
         server = mock.MagicMock()
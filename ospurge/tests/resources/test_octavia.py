@@ -13,14 +13,33 @@ import unittest
 
 import shade
 
+from ospurge import inventory
 from ospurge.resources import octavia
 from ospurge.tests import mock
 
 
+class TestListLoadBalancerResourcesMixin(unittest.TestCase):
+    def setUp(self):
+        self.lister = octavia.ListLoadBalancerResourcesMixin()
+        self.lister.cleanup_project_id = 42
+        self.client = mock.MagicMock()
+
+    def test_listings_are_filtered_on_project(self):
+        with mock.patch('ospurge.resources.octavia.getOctaviaClient', return_value=self.client):
+            self.lister.list_load_balancers()
+            self.lister.list_listeners()
+            self.lister.list_pools()
+        self.client.load_balancer_list.assert_called_once_with(project_id=42)
+        self.client.listener_list.assert_called_once_with(project_id=42)
+        self.client.pool_list.assert_called_once_with(project_id=42)
+
+
 class TestLoadBalancers(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
     @mock.patch('ospurge.resources.octavia.getOctaviaClient', mock.Mock())
@@ -43,6 +62,14 @@ class TestLoadBalancers(unittest.TestCase):
             self.assertIs(shade.meta.get_and_munchify.return_value,
                       octavia.LoadBalancers(self.creds_manager).list())
 
+    def test_exists(self):
+        self.client.load_balancer_list.return_value = {'loadbalancers': []}
+        with mock.patch('ospurge.resources.octavia.getOctaviaClient', return_value=self.client):
+            self.assertEqual(
+                False, octavia.LoadBalancers(self.creds_manager).exists())
+        self.client.load_balancer_list.assert_called_once_with(
+            project_id=self.creds_manager.project_id, limit=1)
+
     def test_delete(self):
         sg = mock.MagicMock()
         with mock.patch('ospurge.resources.octavia.getOctaviaClient', return_value=self.client) as m:
@@ -56,10 +83,66 @@ class TestLoadBalancers(unittest.TestCase):
         self.assertIn("Load Balancer (",
                       octavia.LoadBalancers(self.creds_manager).to_str(sg))
 
+class TestLoadBalancersCascade(unittest.TestCase):
+    def setUp(self):
+        self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
+        self.creds_manager.options.octavia_cascade = True
+        self.client = mock.MagicMock()
+        patcher = mock.patch('ospurge.resources.octavia.getOctaviaClient',
+                             return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_dependencies(self):
+        lbs = octavia.LoadBalancers(self.creds_manager)
+        self.assertEqual((), lbs.depends_on())
+        self.assertEqual(True, lbs.check_prerequisite())
+        listeners = octavia.Listeners(self.creds_manager)
+        self.assertEqual((), listeners.depends_on())
+        self.assertEqual(True, listeners.check_prerequisite())
+        self.assertEqual([], listeners.list())
+        self.assertEqual(False, listeners.exists())
+        pools = octavia.Pools(self.creds_manager)
+        self.assertEqual([], pools.list())
+        self.assertEqual(False, pools.exists())
+        self.client.listener_list.assert_not_called()
+        self.client.pool_list.assert_not_called()
+
+        self.creds_manager.options.octavia_cascade = False
+        self.assertEqual(('Listeners', 'Pools'), lbs.depends_on())
+        self.assertEqual(('Pools',), listeners.depends_on())
+
+    def test_delete_and_wait(self):
+        lbs = octavia.LoadBalancers(self.creds_manager)
+        for lb_id in ('lb1', 'lb2'):
+            lbs.delete({'id': lb_id})
+        self.client.load_balancer_delete.assert_called_with(
+            'lb2', cascade=True)
+        self.creds_manager.tracker.track.assert_called_with(
+            'LoadBalancers', 'lb2', lbs.list_statuses)
+
+        exit = mock.Mock()
+        lbs.wait_for_deletions(exit)
+        self.creds_manager.tracker.wait.assert_called_once_with(
+            [self.creds_manager.tracker.track.return_value] * 2, exit=exit)
+
+    def test_list_statuses(self):
+        self.client.load_balancer_list.return_value = {'loadbalancers': [
+            {'id': 'lb1', 'provisioning_status': 'PENDING_DELETE'}]}
+        self.assertEqual(
+            {'lb1': 'PENDING_DELETE'},
+            octavia.LoadBalancers(self.creds_manager).list_statuses())
+
+
 class TestListeners(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
 
@@ -98,7 +181,9 @@ class TestListeners(unittest.TestCase):
 class TestPools(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
         self.client = mock.MagicMock()
 
     @mock.patch('ospurge.resources.octavia.getOctaviaClient', mock.Mock())
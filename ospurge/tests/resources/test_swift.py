@@ -9,11 +9,19 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
+import argparse
+import threading
 import unittest
 
+import os_client_config
 import shade
 
+from ospurge import inventory
+from ospurge import main
+from ospurge.resources import cinder
+from ospurge.resources import glance
 from ospurge.resources import swift
+from ospurge.tests import fake_cloud
 from ospurge.tests import mock
 
 
@@ -43,24 +51,46 @@ class TestListObjectsMixin(unittest.TestCase):
             list(self.obj_lister.list_objects())
         )
 
+    def test_has_objects(self):
+        self.cloud.list_containers.return_value = [
+            {"name": "foo"}, {"name": "bar"}]
+        self.cloud._object_store_client.get.side_effect = [[], [{}]]
+        self.assertEqual(True, self.obj_lister.has_objects())
+        self.cloud._object_store_client.get.assert_called_with(
+            self.cloud._get_object_endpoint.return_value,
+            params={'format': 'json', 'limit': 1}
+        )
+        self.cloud._get_object_endpoint.assert_called_with('bar')
+
+        self.cloud._object_store_client.get.side_effect = [[], []]
+        self.assertEqual(False, self.obj_lister.has_objects())
+
 
 class TestObjects(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    def test_check_prerequisite(self):
+    @mock.patch.object(cinder.Backups, 'exists')
+    @mock.patch.object(glance.Images, 'exists')
+    def test_check_prerequisite(self, m_images, m_backups):
         objects_manager = swift.Objects(self.creds_manager)
-        with mock.patch.object(objects_manager, 'list_images_by_owner') as m:
-            m.return_value = []
-            self.cloud.list_volume_backups.return_value = ["foo"]
-            self.assertEqual(False, objects_manager.check_prerequisite())
+        m_images.return_value = False
+        m_backups.return_value = True
+        self.assertEqual(False, objects_manager.check_prerequisite())
+
+        m_backups.return_value = False
+        self.assertEqual(True, objects_manager.check_prerequisite())
 
-            self.cloud.list_volume_backups.return_value = []
-            self.assertEqual(True, objects_manager.check_prerequisite())
+        m_images.return_value = True
+        self.assertEqual(False, objects_manager.check_prerequisite())
 
-            m.return_value = ["bar"]
-            self.assertEqual(False, objects_manager.check_prerequisite())
+    @mock.patch('ospurge.resources.swift.ListObjectsMixin.has_objects')
+    def test_exists(self, mock_has_objects):
+        self.assertIs(mock_has_objects.return_value,
+                      swift.Objects(self.creds_manager).exists())
 
     @mock.patch('ospurge.resources.swift.ListObjectsMixin.list_objects')
     def test_list(self, mock_list_objects):
@@ -81,6 +111,59 @@ class TestObjects(unittest.TestCase):
         self.cloud.delete_object.assert_called_once_with(
             obj['container_name'], obj['name'])
 
+    def test_delete_batch_size(self):
+        self.cloud.get_object_capabilities.return_value = {
+            'swift': {}, 'bulk_delete': {'max_deletes_per_request': 42}}
+        objects_manager = swift.Objects(self.creds_manager)
+        self.assertEqual(42, objects_manager.delete_batch_size())
+        self.assertEqual(42, objects_manager.delete_batch_size())
+        self.cloud.get_object_capabilities.assert_called_once_with()
+
+        self.cloud.get_object_capabilities.return_value = {'swift': {}}
+        self.assertEqual(
+            1, swift.Objects(self.creds_manager).delete_batch_size())
+
+        self.cloud.get_object_capabilities.side_effect = \
+            shade.OpenStackCloudException("")
+        self.assertEqual(
+            1, swift.Objects(self.creds_manager).delete_batch_size())
+
+    @mock.patch.object(swift.Objects, 'delete_batch_size', return_value=10)
+    def test_delete_batch(self, m_batch_size):
+        self.cloud._object_store_client.post.return_value = {
+            'Response Status': '200 OK', 'Errors': []}
+        swift.Objects(self.creds_manager).delete_batch([
+            {'container_name': 'foo', 'name': 'a b'},
+            {'container_name': 'foo', 'name': 'c/d'}
+        ])
+        self.cloud._object_store_client.post.assert_called_once_with(
+            self.cloud._object_store_client.get_endpoint.return_value,
+            params={'bulk-delete': ''}, data='/foo/a%20b\n/foo/c/d',
+            headers={'Content-Type': 'text/plain',
+                     'Accept': 'application/json'},
+        )
+
+        self.cloud._object_store_client.post.return_value = {
+            'Response Status': '400 Bad Request',
+            'Errors': [['/foo/c/d', '409 Conflict']]}
+        self.assertRaisesRegex(
+            shade.OpenStackCloudException, "Bulk delete of 1 objects",
+            swift.Objects(self.creds_manager).delete_batch,
+            [{'container_name': 'foo', 'name': 'c/d'}]
+        )
+
+    @mock.patch.object(swift.Objects, 'delete_batch_size', return_value=1)
+    def test_delete_batch_without_bulk_delete(self, m_batch_size):
+        swift.Objects(self.creds_manager).delete_batch([
+            {'container_name': 'foo', 'name': 'a'},
+            {'container_name': 'foo', 'name': 'b'}
+        ])
+        self.assertEqual(
+            [mock.call('foo', 'a'), mock.call('foo', 'b')],
+            self.cloud.delete_object.call_args_list
+        )
+        self.cloud._object_store_client.post.assert_not_called()
+
     def test_to_string(self):
         obj = mock.MagicMock()
         self.assertIn("Object '",
@@ -90,16 +173,18 @@ class TestObjects(unittest.TestCase):
 class TestContainers(unittest.TestCase):
     def setUp(self):
         self.cloud = mock.Mock(spec_set=shade.openstackcloud.OpenStackCloud)
-        self.creds_manager = mock.Mock(cloud=self.cloud)
+        self.creds_manager = mock.Mock(
+            cloud=self.cloud,
+            inventory=inventory.Inventory(ttl=0))
 
-    @mock.patch('ospurge.resources.swift.ListObjectsMixin.list_objects')
-    def test_check_prerequisite(self, mock_list_objects):
-        mock_list_objects.return_value = ['obj1']
+    @mock.patch('ospurge.resources.swift.ListObjectsMixin.has_objects')
+    def test_check_prerequisite(self, mock_has_objects):
+        mock_has_objects.return_value = True
         self.assertEqual(
             False,
             swift.Containers(self.creds_manager).check_prerequisite()
         )
-        mock_list_objects.return_value = []
+        mock_has_objects.return_value = False
         self.assertEqual(
             True,
             swift.Containers(self.creds_manager).check_prerequisite()
@@ -110,6 +195,13 @@ class TestContainers(unittest.TestCase):
                       swift.Containers(self.creds_manager).list())
         self.cloud.list_containers.assert_called_once_with()
 
+    def test_exists(self):
+        self.cloud._object_store_client.get.return_value = [{'name': 'foo'}]
+        self.assertEqual(
+            True, swift.Containers(self.creds_manager).exists())
+        self.cloud._object_store_client.get.assert_called_once_with(
+            '/', params={'format': 'json', 'limit': 1})
+
     def test_delete(self):
         cont = mock.MagicMock()
         self.assertIsNone(swift.Containers(self.creds_manager).delete(cont))
@@ -120,3 +212,51 @@ class TestContainers(unittest.TestCase):
         self.assertIn("Container (",
                       swift.Containers(self.creds_manager).to_str(
                           container))
+
+
+class TestObjectsAgainstFakeCloud(unittest.TestCase):
+    def purge(self, cloud):
+        cloud_config = os_client_config.OpenStackConfig(
+            load_yaml_config=False, load_envvars=False
+        ).get_one_cloud(auth={
+            'auth_url': cloud.auth_url, 'username': 'admin',
+            'password': 'password', 'project_name': 'project',
+            'user_domain_name': 'Default', 'project_domain_name': 'Default',
+        })
+        creds_manager = mock.Mock(
+            cloud=shade.OpenStackCloud(cloud_config=cloud_config),
+            inventory=inventory.Inventory(ttl=0))
+        options = argparse.Namespace(
+            dry_run=False, resource=['Objects'], delete_concurrency=1,
+            service_concurrency=None, max_concurrency=None,
+            journal=None, resume=None, plan_out=None, apply_plan=None)
+        exit = threading.Event()
+        main.runner(swift.Objects(creds_manager), options, exit)
+        self.assertFalse(exit.is_set())
+
+    def make_cloud(self, **kwargs):
+        cloud = fake_cloud.FakeCloud(**kwargs)
+        project_id = cloud.add_project('project')
+        cloud.add_objects(project_id, 'foo',
+                          ['obj{}'.format(i) for i in range(5)])
+        cloud.add_objects(project_id, 'bar', ['a b', 'c/d'])
+        return cloud, project_id
+
+    def test_bulk_delete(self):
+        cloud, project_id = self.make_cloud(bulk_delete_limit=3)
+        with cloud:
+            self.purge(cloud)
+
+        self.assertEqual(0, cloud.remaining(project_id)['objects'])
+        # 7 objects deleted 3 at a time.
+        self.assertEqual(3, cloud.requests[('object-store', 'POST')])
+        self.assertEqual(0, cloud.requests[('object-store', 'DELETE')])
+
+    def test_without_bulk_delete(self):
+        cloud, project_id = self.make_cloud(bulk_delete_limit=None)
+        with cloud:
+            self.purge(cloud)
+
+        self.assertEqual(0, cloud.remaining(project_id)['objects'])
+        self.assertEqual(0, cloud.requests[('object-store', 'POST')])
+        self.assertEqual(7, cloud.requests[('object-store', 'DELETE')])
@@ -0,0 +1,149 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import asyncio
+import threading
+import time
+import unittest
+
+from ospurge import aio
+from ospurge import exceptions
+from ospurge import main
+from ospurge import scheduler
+from ospurge.tests import mock
+
+
+def make_manager(name, order, depends_on=()):
+    klass = type(name, (object,), {
+        'order': classmethod(lambda cls: order),
+        'depends_on': lambda self: depends_on,
+        'check_prerequisite': mock.Mock(return_value=True),
+    })
+    return klass()
+
+
+def make_options(**kwargs):
+    kwargs.setdefault('dry_run', False)
+    kwargs.setdefault('resource', None)
+    return mock.Mock(**kwargs)
+
+
+class TestWaitForCheckPrerequisite(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+
+        async def sleep(delay):
+            self.sleeps.append(delay)
+
+        patcher = mock.patch('asyncio.sleep', sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_wait(self):
+        mngr = mock.Mock(check_prerequisite=mock.Mock(
+            side_effect=[False, False, False, False, True]))
+        self.assertEqual(True, self.loop.run_until_complete(
+            aio.wait_for_check_prerequisite(
+                mngr, make_options(), threading.Event())))
+        # Checked again like the resource managers parked by the scheduler.
+        self.assertEqual([2, 4, 8, 8], self.sleeps)
+        self.assertEqual(5, mngr.check_prerequisite.call_count)
+
+    def test_dry_run(self):
+        mngr = mock.Mock()
+        self.assertEqual(True, self.loop.run_until_complete(
+            aio.wait_for_check_prerequisite(
+                mngr, make_options(dry_run=True), threading.Event())))
+        mngr.check_prerequisite.assert_not_called()
+
+    def test_exit(self):
+        exit = threading.Event()
+        mngr = mock.Mock(check_prerequisite=mock.Mock(
+            side_effect=lambda: exit.set()))
+        self.assertEqual(False, self.loop.run_until_complete(
+            aio.wait_for_check_prerequisite(mngr, make_options(), exit)))
+        self.assertEqual([], self.sleeps)
+
+    @mock.patch.object(main, 'handle_runner_error')
+    @mock.patch('time.time', side_effect=[0, 0, 3000])
+    def test_timeout(self, m_time, m_handle_runner_error):
+        mngr = mock.Mock(check_prerequisite=mock.Mock(return_value=False))
+        exit = threading.Event()
+        self.assertEqual(False, self.loop.run_until_complete(
+            aio.wait_for_check_prerequisite(mngr, make_options(), exit)))
+        m_handle_runner_error.assert_called_once_with(mngr, mock.ANY, exit)
+        self.assertIsInstance(m_handle_runner_error.call_args[0][1],
+                              exceptions.TimeoutError)
+
+
+class TestRun(unittest.TestCase):
+    def setUp(self):
+        self.servers = make_manager('Servers', 15)
+        self.fips = make_manager('FloatingIPs', 25, ('Servers',))
+        self.images = make_manager('Images', 53)
+        self.volumes = make_manager('Volumes', 65, ('Servers',))
+        self.managers = [self.volumes, self.fips, self.images, self.servers]
+
+    @mock.patch.object(main, 'delete_resources')
+    def test_dependencies(self, m_delete_resources):
+        started = {}
+        done = {}
+
+        def delete_resources(mngr, options, exit):
+            name = mngr.__class__.__name__
+            started[name] = time.time()
+            time.sleep(0.05)
+            done[name] = time.time()
+
+        m_delete_resources.side_effect = delete_resources
+        exit = threading.Event()
+        sched = scheduler.DependencyScheduler(self.managers, exit)
+
+        aio.run(sched, make_options(), exit)
+
+        self.assertEqual(4, m_delete_resources.call_count)
+        for name in ('FloatingIPs', 'Volumes'):
+            self.assertGreaterEqual(started[name], done['Servers'])
+        # Managers without dependencies run concurrently.
+        self.assertLess(started['Images'], done['Servers'])
+        self.assertFalse(exit.is_set())
+
+    @mock.patch.object(main, 'delete_resources')
+    def test_prerequisites(self, m_delete_resources):
+        exit = threading.Event()
+        sched = scheduler.DependencyScheduler([self.servers], exit)
+
+        aio.run(sched, make_options(), exit)
+        type(self.servers).check_prerequisite.assert_called_once_with()
+        m_delete_resources.assert_called_once_with(
+            self.servers, mock.ANY, exit)
+
+        aio.run(sched, make_options(dry_run=True), exit)
+        type(self.servers).check_prerequisite.assert_called_once_with()
+
+    @mock.patch.object(main, 'delete_resources')
+    def test_exit(self, m_delete_resources):
+        m_delete_resources.side_effect = Exception('Boom')
+        exit = threading.Event()
+        sched = scheduler.DependencyScheduler(self.managers, exit)
+
+        aio.run(sched, make_options(), exit)
+
+        self.assertTrue(exit.is_set())
+        # Nothing is started once a resource manager failed.
+        self.assertNotIn(
+            mock.call(self.fips, mock.ANY, exit),
+            m_delete_resources.call_args_list)
+        self.assertNotIn(
+            mock.call(self.volumes, mock.ANY, exit),
+            m_delete_resources.call_args_list)
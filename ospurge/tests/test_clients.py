@@ -0,0 +1,127 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import types
+import unittest
+
+from ospurge import clients
+from ospurge import trace
+from ospurge.resources import neutron_vpnaas
+from ospurge.resources import octavia
+from ospurge.tests import mock
+
+
+def make_options(**kwargs):
+    attrs = dict(
+        os_auth_url='http://keystone', os_username='admin',
+        os_password='secret', os_region_name='RegionOne',
+        purge_project='demo', delete_concurrency=8,
+        service_concurrency=[('object-store', 32)], max_concurrency=None,
+        record=None, replay=None, replay_latency=0.0
+    )
+    attrs.update(kwargs)
+    return types.SimpleNamespace(**attrs)
+
+
+@mock.patch.dict(clients._sessions, clear=True)
+@mock.patch.dict(clients._clients, clear=True)
+@mock.patch.object(clients, 'session')
+@mock.patch.object(clients, 'identity')
+class TestClients(unittest.TestCase):
+    def test_get_session(self, m_identity, m_session):
+        options = make_options()
+        sess = clients.get_session(options)
+
+        self.assertIs(m_session.Session.return_value, sess)
+        m_identity.V3Password.assert_called_once_with(
+            auth_url='http://keystone', username='admin',
+            user_domain_name='Default', password='secret',
+            project_name='demo', project_domain_name='Default')
+        m_session.Session.assert_called_once_with(
+            auth=m_identity.V3Password.return_value)
+
+        for call in sess.session.mount.call_args_list:
+            self.assertEqual(32, call[0][1].transport._pool_maxsize)
+
+        # Authenticate only once
+        self.assertIs(sess, clients.get_session(make_options()))
+        self.assertEqual(1, m_identity.V3Password.call_count)
+
+        # But once per project
+        clients.get_session(make_options(purge_project='other'))
+        self.assertEqual(2, m_identity.V3Password.call_count)
+
+    def test_get_client(self, m_identity, m_session):
+        factory = mock.Mock()
+        options = make_options()
+
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(
+                lambda _: clients.get_client('network', options, factory),
+                range(8)
+            ))
+
+        factory.assert_called_once_with(m_session.Session.return_value)
+        self.assertEqual([factory.return_value] * 8, results)
+
+        clients.get_client('network', make_options(os_region_name='Other'),
+                           factory)
+        self.assertEqual(2, factory.call_count)
+        self.assertEqual(1, m_identity.V3Password.call_count)
+
+    def test_close_session(self, m_identity, m_session):
+        factory = mock.Mock()
+        other = make_options(purge_project='other')
+        clients.get_client('network', make_options(), factory)
+        clients.get_client('network', other, factory)
+
+        clients.close_session(make_options())
+        m_session.Session.return_value.session.close.assert_called_once_with()
+        self.assertEqual([clients._session_key(other)],
+                         list(clients._sessions))
+        self.assertEqual(
+            [('network', 'RegionOne') + clients._session_key(other)],
+            list(clients._clients))
+        # Already closed.
+        clients.close_session(make_options())
+
+    @mock.patch.object(trace, '_tracer', trace.Tracer())
+    def test_get_client_traced(self, m_identity, m_session):
+        factory = mock.Mock()
+        for _ in range(2):
+            clients.get_client('load-balancer', make_options(), factory)
+
+        spans = [e for e in trace.get_tracer().events() if e['ph'] == 'X']
+        self.assertEqual(['load-balancer client'],
+                         [e['name'] for e in spans])
+        self.assertEqual('client', spans[0]['cat'])
+
+    @mock.patch.object(octavia.octavia, 'OctaviaAPI')
+    @mock.patch.object(neutron_vpnaas.client, 'Client')
+    def test_shared_session(self, m_neutron, m_octavia, m_identity,
+                            m_session):
+        options = make_options()
+        sess = m_session.Session.return_value
+
+        for _ in range(3):
+            self.assertIs(m_octavia.return_value,
+                          octavia.getOctaviaClient(options))
+            self.assertIs(m_neutron.return_value,
+                          neutron_vpnaas.getNeutronClient(options))
+
+        sess.get_endpoint.assert_called_once_with(
+            service_type='load-balancer', region_name='RegionOne')
+        m_octavia.assert_called_once_with(
+            endpoint=sess.get_endpoint.return_value, session=sess)
+        m_neutron.assert_called_once_with(
+            session=sess, region_name='RegionOne')
+        m_session.Session.assert_called_once_with(auth=mock.ANY)
@@ -0,0 +1,120 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import os
+import shutil
+import tempfile
+import unittest
+
+from ospurge import exporter
+from ospurge import metrics
+from ospurge.tests import mock
+
+
+def make_metrics():
+    stats = metrics.Metrics()
+    stats.record_resources('Ports', 'listed', 3)
+    stats.record_resources('Ports', 'deleted', 2)
+    stats.record('Ports', 'delete', 0.02)
+    stats.record('Ports', 'delete', 0.2, error=True)
+    stats.record_sleep('Ports', 'prerequisite', 6)
+    stats.record_request('https://neutron:9696', 0.02)
+    stats.record_backoff('https://neutron:9696', 1)
+    return stats
+
+
+class TestRender(unittest.TestCase):
+    def test_render(self):
+        lines = exporter.render(make_metrics(), running=True).splitlines()
+
+        self.assertIn('ospurge_running 1.0', lines)
+        self.assertIn('# TYPE ospurge_resources_deleted_total counter', lines)
+        self.assertIn('ospurge_resources_listed_total{manager="Ports"} 3.0',
+                      lines)
+        self.assertIn('ospurge_resources_deleted_total{manager="Ports"} 2.0',
+                      lines)
+        self.assertIn(
+            'ospurge_operation_duration_seconds_bucket{le="0.025",'
+            'manager="Ports",operation="delete"} 1.0', lines)
+        self.assertIn(
+            'ospurge_operation_duration_seconds_bucket{le="+Inf",'
+            'manager="Ports",operation="delete"} 2.0', lines)
+        self.assertIn(
+            'ospurge_operation_duration_seconds_count{manager="Ports",'
+            'operation="delete"} 2.0', lines)
+        self.assertIn(
+            'ospurge_operation_errors_total{manager="Ports",'
+            'operation="delete"} 1.0', lines)
+        self.assertIn(
+            'ospurge_wait_seconds_total{manager="Ports",'
+            'reason="prerequisite"} 6.0', lines)
+        self.assertIn(
+            'ospurge_api_request_duration_seconds{'
+            'endpoint="https://neutron:9696",quantile="0.5"} 0.015', lines)
+        self.assertIn(
+            'ospurge_api_retries_total{endpoint="https://neutron:9696"} 1.0',
+            lines)
+        self.assertEqual('# EOF', lines[-1])
+
+        # Every sample belongs to the family declared before it.
+        family = None
+        for line in lines:
+            if line.startswith('# TYPE '):
+                family = line.split()[2]
+            elif not line.startswith('#'):
+                self.assertTrue(line.startswith(family), line)
+
+    def test_render_finished(self):
+        text = exporter.render(metrics.Metrics())
+        self.assertIn('ospurge_running 0.0\n', text)
+        # Families without samples are left out.
+        self.assertNotIn('ospurge_resources_deleted_total', text)
+
+    def test_escape_labels(self):
+        stats = metrics.Metrics()
+        stats.record_resources('a"b\\c', 'deleted')
+        self.assertIn('{manager="a\\"b\\\\c"}', exporter.render(stats))
+
+
+class TestTextfileExporter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'ospurge.prom')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_write(self):
+        exporter.write(self.path, make_metrics())
+        with open(self.path) as f:
+            self.assertTrue(f.read().endswith('# EOF\n'))
+        # The temporary file was renamed.
+        self.assertEqual(['ospurge.prom'], os.listdir(self.tmpdir))
+
+    @mock.patch.object(metrics, '_metrics', make_metrics())
+    def test_start_stop(self):
+        textfile = exporter.TextfileExporter(self.path, interval=0.01)
+        textfile.start()
+        with open(self.path) as f:
+            self.assertIn('ospurge_running 1.0', f.read())
+
+        textfile.stop()
+        self.assertFalse(textfile._thread.is_alive())
+        with open(self.path) as f:
+            self.assertIn('ospurge_running 0.0', f.read())
+
+    @mock.patch.object(exporter, 'write', side_effect=IOError)
+    def test_write_error(self, m_write):
+        textfile = exporter.TextfileExporter(self.path)
+        # Failing to write metrics doesn't stop the purge.
+        textfile.stop()
+        m_write.assert_called_once_with(
+            self.path, metrics.get_metrics(), False)
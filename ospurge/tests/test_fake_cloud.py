@@ -0,0 +1,109 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import unittest
+
+from ospurge.tests import fake_cloud
+from ospurge.tests import mock
+
+
+class TestTable(unittest.TestCase):
+    def test_page(self):
+        table = fake_cloud.Table()
+        for key in ('c', 'a', 'd', 'b', 'e'):
+            table.add(key, {'even': key in 'bd'})
+        self.assertEqual((['a', 'b'], True), table.page(limit=2))
+        self.assertEqual((['c', 'd', 'e'], False),
+                         table.page(marker='b', limit=3))
+        self.assertEqual((['b', 'd'], False),
+                         table.page(match=lambda row: row['even']))
+
+        self.assertTrue(table.remove('b'))
+        self.assertFalse(table.remove('b'))
+        self.assertEqual((['c', 'd'], True),
+                         table.page(marker='a', limit=2))
+        self.assertEqual(4, len(table))
+
+
+class TestFakeCloud(unittest.TestCase):
+    def setUp(self):
+        self.cloud = fake_cloud.FakeCloud()
+        self.project_id = self.cloud.seed('project', 'small')
+
+    def tearDown(self):
+        for endpoint in self.cloud.endpoints.values():
+            endpoint.server_close()
+
+    def test_seed(self):
+        remaining = self.cloud.remaining(self.project_id)
+        self.assertEqual(
+            dict(fake_cloud.PROFILES['small'], ports=44),
+            dict(remaining, router_interfaces=4))
+        self.assertEqual(
+            0, self.cloud.remaining(self.cloud.admin_project)['ports'])
+
+    def test_delete_referenced(self):
+        network = next(iter(self.cloud.tables['networks'].values()))
+        self.assertEqual(
+            409, self.cloud.delete('networks', self.project_id,
+                                   network['id']))
+
+        for port in list(self.cloud.tables['ports'].values()):
+            if port['device_owner'] != 'network:dhcp':
+                self.cloud.tables['ports'].remove(port['id'])
+        self.assertEqual(
+            204, self.cloud.delete('networks', self.project_id,
+                                   network['id']))
+        # The DHCP port went with its network.
+        self.assertFalse([
+            port for port in self.cloud.tables['ports'].values()
+            if port['network_id'] == network['id']])
+
+    def test_delete_other_project(self):
+        volume = list(self.cloud.tables['volumes'].values())[-1]
+        self.assertEqual(404, self.cloud.delete(
+            'volumes', self.cloud.admin_project, volume['id']))
+        self.assertEqual(204, self.cloud.delete(
+            'volumes', self.project_id, volume['id']))
+        self.assertEqual(404, self.cloud.delete(
+            'volumes', self.project_id, volume['id']))
+
+    @mock.patch('time.time')
+    def test_delete_delay(self, m_time):
+        m_time.return_value = 100
+        self.cloud.delete_delay = 5
+        volume = list(self.cloud.tables['volumes'].values())[-1]
+        self.assertEqual(204, self.cloud.delete(
+            'volumes', self.project_id, volume['id']))
+        self.assertEqual('deleting', volume['status'])
+        self.assertEqual(409, self.cloud.delete(
+            'volumes', self.project_id, volume['id']))
+
+        rows, _ = self.cloud.list('volumes', self.project_id,
+                                  {'id': [volume['id']]}, None, None)
+        self.assertEqual([volume], rows)
+        m_time.return_value = 105
+        rows, _ = self.cloud.list('volumes', self.project_id,
+                                  {'id': [volume['id']]}, None, None)
+        self.assertEqual([], rows)
+
+    @mock.patch('time.time')
+    def test_rate_limit(self, m_time):
+        m_time.return_value = 100
+        self.cloud.rate_limit = 2
+        endpoint = fake_cloud.FakeEndpoint(self.cloud, 'compute')
+        self.addCleanup(endpoint.server_close)
+        self.assertIsNone(endpoint.throttle())
+        self.assertIsNone(endpoint.throttle())
+        self.assertEqual(0.5, endpoint.throttle())
+
+        m_time.return_value = 100.5
+        self.assertIsNone(endpoint.throttle())
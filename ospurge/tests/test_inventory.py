@@ -0,0 +1,100 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import threading
+import unittest
+
+from ospurge import inventory
+from ospurge.tests import mock
+
+
+def make_manager(service_type, name, *results):
+    mngr = type(name, (object,), {'SERVICE_TYPE': service_type})()
+    mngr.exists = mock.Mock(side_effect=results)
+    return mngr
+
+
+class TestInventory(unittest.TestCase):
+    def test_exists_is_cached(self):
+        inv = inventory.Inventory()
+        servers = make_manager('compute', 'Servers', True, False)
+
+        self.assertEqual(True, inv.exists(servers))
+        self.assertEqual(True, inv.exists(servers))
+        servers.exists.assert_called_once_with()
+
+    @mock.patch('time.time')
+    def test_exists_expires(self, m_time):
+        inv = inventory.Inventory(ttl=5)
+        servers = make_manager('compute', 'Servers', True, False)
+
+        m_time.return_value = 100
+        self.assertEqual(True, inv.exists(servers))
+        m_time.return_value = 104
+        self.assertEqual(True, inv.exists(servers))
+        m_time.return_value = 105
+        self.assertEqual(False, inv.exists(servers))
+
+    def test_invalidate(self):
+        inv = inventory.Inventory()
+        ports = make_manager('network', 'Ports', True, False)
+
+        inv.exists(ports)
+        inv.invalidate('network', 'Networks')
+        self.assertEqual(True, inv.exists(ports))
+        self.assertEqual(1, ports.exists.call_count)
+
+        inv.invalidate('network', 'Ports')
+        self.assertEqual(False, inv.exists(ports))
+
+    def test_invalidate_while_fetching(self):
+        inv = inventory.Inventory()
+        servers = make_manager('compute', 'Servers')
+
+        def exists():
+            inv.invalidate('compute', 'Servers')
+            return True
+
+        servers.exists.side_effect = exists
+        self.assertEqual(True, inv.exists(servers))
+        servers.exists.side_effect = [False]
+        self.assertEqual(False, inv.exists(servers))
+
+    def test_concurrent_callers_share_one_call(self):
+        inv = inventory.Inventory()
+        release = threading.Event()
+        connections = make_manager('network', 'IpSecSiteConnections')
+        calls = []
+
+        def exists():
+            calls.append(1)
+            release.wait(5)
+            return True
+
+        connections.exists.side_effect = exists
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(inv.exists, connections)
+                       for _ in range(4)]
+            # Give the other threads a chance to wait on the in flight call
+            concurrent.futures.wait(futures, timeout=0.1)
+            release.set()
+            results = [f.result() for f in futures]
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual([True] * 4, results)
+
+    def test_error_is_not_cached(self):
+        inv = inventory.Inventory()
+        servers = make_manager('compute', 'Servers', ValueError, True)
+
+        self.assertRaises(ValueError, inv.exists, servers)
+        self.assertEqual(True, inv.exists(servers))
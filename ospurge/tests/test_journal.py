@@ -0,0 +1,109 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ospurge import journal
+from ospurge.tests import mock
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'purge.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_records(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_record(self):
+        jrnl = journal.Journal(self.path)
+        jrnl.record_deleted('p1', 'Servers', 'abc')
+        jrnl.record_done('p1', 'Servers')
+
+        # Lines are flushed as soon as they are written.
+        records = self.read_records()
+        self.assertEqual(
+            [('deleted', 'p1', 'Servers', 'abc'),
+             ('done', 'p1', 'Servers', None)],
+            [(r['event'], r['project'], r['manager'], r.get('id'))
+             for r in records]
+        )
+        self.assertIn('time', records[0])
+        jrnl.close()
+
+    def test_resume(self):
+        jrnl = journal.Journal(self.path)
+        jrnl.record_deleted('p1', 'Servers', 'abc')
+        jrnl.record_done('p1', 'Networks')
+        jrnl.close()
+        # The process died while writing the last line.
+        with open(self.path, 'a') as f:
+            f.write('{"event": "del')
+
+        jrnl = journal.Journal(self.path, resume=True)
+        self.assertTrue(jrnl.is_deleted('p1', 'Servers', 'abc'))
+        self.assertFalse(jrnl.is_deleted('p2', 'Servers', 'abc'))
+        self.assertFalse(jrnl.is_deleted('p1', 'Servers', 'def'))
+        self.assertTrue(jrnl.is_done('p1', 'Networks'))
+        self.assertFalse(jrnl.is_done('p1', 'Servers'))
+
+        # The progress is still appended to the same file.
+        jrnl.record_done('p1', 'Servers')
+        jrnl.close()
+        with open(self.path) as f:
+            lines = f.readlines()
+        self.assertEqual(4, len(lines))
+        self.assertEqual('Servers', json.loads(lines[-1])['manager'])
+
+    def test_no_resume(self):
+        jrnl = journal.Journal(self.path)
+        jrnl.record_done('p1', 'Networks')
+        jrnl.close()
+
+        jrnl = journal.Journal(self.path)
+        self.assertFalse(jrnl.is_done('p1', 'Networks'))
+        jrnl.close()
+
+    def test_resume_missing_file(self):
+        jrnl = journal.Journal(self.path, resume=True)
+        self.assertFalse(jrnl.is_done('p1', 'Networks'))
+        jrnl.close()
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_get_journal(self):
+        self.assertIsNone(journal.get_journal(
+            argparse.Namespace(journal=None, resume=None)))
+
+        with mock.patch.dict(journal._journals, clear=True), \
+                mock.patch.object(journal, 'Journal') as m_journal:
+            options = argparse.Namespace(journal=None, resume=self.path)
+            self.assertIs(m_journal.return_value,
+                          journal.get_journal(options))
+            self.assertIs(m_journal.return_value,
+                          journal.get_journal(options))
+            m_journal.assert_called_once_with(self.path, resume=True)
+
+            journal.get_journal(
+                argparse.Namespace(journal='other', resume=None))
+            m_journal.assert_called_with('other', resume=False)
+
+            journal.close_journals()
+            self.assertEqual(2, m_journal.return_value.close.call_count)
+            self.assertEqual({}, journal._journals)
@@ -10,14 +10,24 @@
 #  License for the specific language governing permissions and limitations
 #  under the License.
 import argparse
+import concurrent.futures
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
 import types
 import unittest
 
+import os_client_config
 import shade.exc
 
 from ospurge import exceptions
+from ospurge import exporter
 from ospurge import main
+from ospurge import metrics
+from ospurge import trace
 from ospurge.resources.base import ServiceResource
 from ospurge.tests import mock
 from ospurge import utils
@@ -31,6 +41,25 @@ except AttributeError:
             self.__dict__.update(attr)
 
 
+def make_options(**kwargs):
+    kwargs.setdefault('delete_concurrency', 1)
+    kwargs.setdefault('service_concurrency', None)
+    kwargs.setdefault('max_concurrency', None)
+    kwargs.setdefault('processes', 1)
+    kwargs.setdefault('max_workers', None)
+    kwargs.setdefault('journal', None)
+    kwargs.setdefault('resume', None)
+    kwargs.setdefault('plan_out', None)
+    kwargs.setdefault('apply_plan', None)
+    kwargs.setdefault('metrics_report', None)
+    kwargs.setdefault('metrics_file', None)
+    kwargs.setdefault('trace_out', None)
+    kwargs.setdefault('record', None)
+    kwargs.setdefault('replay', None)
+    kwargs.setdefault('replay_latency', 0.0)
+    return mock.Mock(**kwargs)
+
+
 class TestFunctions(unittest.TestCase):
     @mock.patch('logging.basicConfig', autospec=True)
     def test_configure_logging_verbose(self, m_basicConfig):
@@ -53,7 +82,34 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(True, options.verbose)
         self.assertEqual(True, options.dry_run)
         self.assertEqual(True, options.delete_shared_resources)
-        self.assertEqual('foo', options.purge_project)
+        self.assertEqual(['foo'], main.projects_to_purge(options))
+        self.assertEqual(1, options.project_concurrency)
+
+    def test_create_argument_parser_with_many_projects(self):
+        parser = main.create_argument_parser()
+        with tempfile.NamedTemporaryFile('w') as f:
+            f.write('baz\nfoo\n')
+            f.flush()
+            options = parser.parse_args([
+                '--purge-project', 'foo', 'bar', '--project-concurrency', '4',
+                '--purge-project', '@' + f.name
+            ])
+        self.assertEqual(['foo', 'bar', 'baz'],
+                         main.projects_to_purge(options))
+        self.assertEqual(4, options.project_concurrency)
+
+    def test_create_argument_parser_with_at_sign(self):
+        parser = main.create_argument_parser()
+        # Only the projects are read from a file.
+        argv = ['--purge-own-project', '--os-password', '@secret']
+        os_client_config.OpenStackConfig(
+            load_yaml_config=False, load_envvars=False
+        ).register_argparse_arguments(parser, argv)
+        options = parser.parse_args(argv)
+        self.assertEqual('@secret', options.os_password)
+
+        self.assertRaises(SystemExit, parser.parse_args,
+                          ['--purge-project', '@/nonexistent'])
 
     def test_create_argument_parser_with_purge_own_project(self):
         parser = main.create_argument_parser()
@@ -63,6 +119,12 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(False, options.dry_run)
         self.assertEqual(False, options.delete_shared_resources)
         self.assertEqual(True, options.purge_own_project)
+        self.assertEqual('threads', options.engine)
+        self.assertIsNone(options.max_workers)
+
+        options = parser.parse_args(['--purge-own-project',
+                                     '--engine', 'asyncio'])
+        self.assertEqual('asyncio', options.engine)
 
     def test_create_argument_parser_with_resource(self):
         parser = main.create_argument_parser()
@@ -72,20 +134,58 @@ class TestFunctions(unittest.TestCase):
             '--resource', 'Networks', '--purge-project', 'foo',
             '--resource', 'Volumes'
         ])
-        self.assertEqual('foo', options.purge_project)
+        self.assertEqual(['foo'], main.projects_to_purge(options))
         self.assertEqual(['Networks', 'Volumes'], options.resource)
 
+    def test_create_argument_parser_with_concurrency(self):
+        parser = main.create_argument_parser()
+        options = parser.parse_args([
+            '--purge-own-project', '--delete-concurrency', '4',
+            '--service-concurrency', 'network=16',
+            '--service-concurrency', 'object-store=32',
+            '--max-concurrency', '64'
+        ])
+        self.assertEqual(4, options.delete_concurrency)
+        self.assertEqual([('network', 16), ('object-store', 32)],
+                         options.service_concurrency)
+        self.assertEqual(64, options.max_concurrency)
+
+        options = parser.parse_args(['--purge-own-project'])
+        self.assertEqual(8, options.delete_concurrency)
+        self.assertIsNone(options.service_concurrency)
+        self.assertIsNone(options.max_concurrency)
+
+    def test_service_concurrency(self):
+        self.assertEqual(('volume', 2), main.service_concurrency('volume=2'))
+        for value in ('volume', 'volume=', '=2', 'volume=0', 'volume=a'):
+            self.assertRaises(argparse.ArgumentTypeError,
+                              main.service_concurrency, value)
+
     def test_runner(self):
         resources = [mock.Mock(), mock.Mock(), mock.Mock()]
-        resource_manager = mock.Mock(list=mock.Mock(return_value=resources))
-        options = mock.Mock(dry_run=False, resource=False)
-        exit = mock.Mock(is_set=mock.Mock(side_effect=[False, False, True]))
+        exit = threading.Event()
+        deleted = threading.Semaphore(0)
+
+        def list_resources():
+            yield resources[0]
+            yield resources[1]
+            # Ask to exit once the first two resources are deleted.
+            deleted.acquire()
+            deleted.acquire()
+            exit.set()
+            yield resources[2]
+
+        resource_manager = mock.Mock(
+            list=mock.Mock(side_effect=list_resources),
+            delete=mock.Mock(side_effect=lambda r: deleted.release()))
+        resource_manager.delete_batch_size.return_value = 1
+        options = make_options(dry_run=False, resource=False)
 
         main.runner(resource_manager, options, exit)
 
         resource_manager.list.assert_called_once_with()
-        resource_manager.wait_for_check_prerequisite.assert_called_once_with(
-            exit)
+        # The runner returned as soon as it was asked to exit.
+        resource_manager.wait_for_deletions.assert_not_called()
         self.assertEqual(
             [mock.call(resources[0]), mock.call(resources[1])],
             resource_manager.should_delete.call_args_list
@@ -95,32 +195,165 @@ class TestFunctions(unittest.TestCase):
             [mock.call(resources[0]), mock.call(resources[1])],
             resource_manager.delete.call_args_list
         )
+        self.assertEqual(
+            [mock.call(resource_manager.SERVICE_TYPE,
+                       resource_manager.__class__.__name__)] * 2,
+            resource_manager.inventory.invalidate.call_args_list
+        )
+
+    def test_runner_delete_batch(self):
+        resources = [mock.Mock() for _ in range(5)]
+        resource_manager = mock.Mock(list=mock.Mock(return_value=resources))
+        resource_manager.delete_batch_size.return_value = 2
+        options = make_options(dry_run=False, resource=False)
+        exit = mock.Mock(is_set=mock.Mock(return_value=False))
+
+        main.runner(resource_manager, options, exit)
+
+        resource_manager.delete.assert_not_called()
+        self.assertEqual(
+            [mock.call(resources[0:2]), mock.call(resources[2:4]),
+             mock.call(resources[4:])],
+            resource_manager.delete_batch.call_args_list
+        )
+        self.assertEqual(
+            3, resource_manager.inventory.invalidate.call_count)
+        resource_manager.wait_for_deletions.assert_called_once_with(exit)
 
     def test_runner_dry_run(self):
         resources = [mock.Mock(), mock.Mock()]
         resource_manager = mock.Mock(list=mock.Mock(return_value=resources))
-        options = mock.Mock(dry_run=True)
+        options = make_options(dry_run=True)
         exit = mock.Mock(is_set=mock.Mock(return_value=False))
 
         main.runner(resource_manager, options, exit)
 
-        resource_manager.wait_for_check_prerequisite.assert_not_called()
         resource_manager.delete.assert_not_called()
+        resource_manager.wait_for_deletions.assert_not_called()
 
     def test_runner_resource(self):
         resources = [mock.Mock()]
         resource_manager = mock.Mock(list=mock.Mock(return_value=resources))
-        options = mock.Mock(dry_run=False, resource=True)
+        resource_manager.delete_batch_size.return_value = 1
+        options = make_options(dry_run=False, resource=True)
         exit = mock.Mock(is_set=mock.Mock(return_value=False))
         main.runner(resource_manager, options, exit)
-        resource_manager.wait_for_check_prerequisite.assert_not_called()
         resource_manager.delete.assert_called_once_with(mock.ANY)
 
+    @mock.patch('ospurge.journal.get_journal')
+    def test_runner_with_journal(self, m_get_journal):
+        resources = [{'id': 'a'}, {'id': 'b'}, {'name': 'c'}]
+        resource_manager = mock.Mock(list=mock.Mock(return_value=resources),
+                                     cleanup_project_id='p1')
+        resource_manager.delete_batch_size.return_value = 1
+        resource_manager.to_str.side_effect = lambda r: r.get('name')
+        jrnl = m_get_journal.return_value
+        # 'a' was deleted before the purge was resumed.
+        jrnl.is_deleted.side_effect = lambda p, m, i: i == 'a'
+        options = make_options(dry_run=False, resource=False)
+        exit = threading.Event()
+
+        main.runner(resource_manager, options, exit)
+
+        m_get_journal.assert_called_once_with(options)
+        self.assertEqual(
+            [mock.call(resources[1]), mock.call(resources[2])],
+            resource_manager.delete.call_args_list
+        )
+        resource_manager.skip.assert_called_once_with(resources[0])
+        manager = resource_manager.__class__.__name__
+        self.assertEqual(
+            [mock.call('p1', manager, 'b'), mock.call('p1', manager, 'c')],
+            jrnl.record_deleted.call_args_list
+        )
+        jrnl.record_done.assert_called_once_with('p1', manager)
+
+    @mock.patch('ospurge.journal.get_journal')
+    def test_runner_with_journal_and_failure(self, m_get_journal):
+        resource_manager = mock.Mock(
+            list=mock.Mock(return_value=[{'id': 'a'}]),
+            delete=mock.Mock(side_effect=Exception))
+        resource_manager.delete_batch_size.return_value = 1
+        jrnl = m_get_journal.return_value
+        jrnl.is_deleted.return_value = False
+        exit = threading.Event()
+
+        main.runner(resource_manager,
+                    make_options(dry_run=False, resource=False), exit)
+
+        self.assertTrue(exit.is_set())
+        jrnl.record_deleted.assert_not_called()
+        jrnl.record_done.assert_not_called()
+
+    @mock.patch('ospurge.plan.get_writer')
+    def test_runner_dry_run_with_plan_out(self, m_get_writer):
+        resources = [{'id': 'a'}, {'id': 'b'}]
+        resource_manager = mock.Mock(list=mock.Mock(return_value=resources),
+                                     cleanup_project_id='p1')
+        resource_manager.should_delete.side_effect = lambda r: r['id'] == 'b'
+        exit = threading.Event()
+
+        main.runner(resource_manager, make_options(dry_run=True), exit)
+
+        resource_manager.delete.assert_not_called()
+        m_get_writer.return_value.write.assert_called_once_with(
+            'p1', resource_manager.__class__.__name__,
+            resource_manager.to_str.return_value, resources[1])
+
+    @mock.patch('ospurge.plan.get_plan')
+    def test_runner_apply_plan(self, m_get_plan):
+        resources = [{'id': 'a'}, {'id': 'b'}]
+        resource_manager = mock.Mock(cleanup_project_id='p1')
+        resource_manager.from_plan.side_effect = lambda r: r
+        resource_manager.delete_batch_size.return_value = 1
+        m_get_plan.return_value.resources.return_value = resources
+        exit = threading.Event()
+
+        main.runner(resource_manager,
+                    make_options(dry_run=False, resource=False), exit)
+
+        # The project is not listed again.
+        resource_manager.list.assert_not_called()
+        m_get_plan.return_value.resources.assert_called_once_with(
+            'p1', resource_manager.__class__.__name__)
+        self.assertEqual(
+            [mock.call(resources[0]), mock.call(resources[1])],
+            resource_manager.delete.call_args_list
+        )
+        self.assertFalse(exit.is_set())
+
+    @mock.patch.object(metrics, '_metrics', metrics.Metrics())
+    def test_runner_metrics(self):
+        resource_manager = mock.Mock(
+            list=mock.Mock(return_value=[{'id': 'a'}, {'id': 'b'}]),
+            delete=mock.Mock(side_effect=[
+                None, shade.exc.OpenStackCloudResourceNotFound('')]))
+        resource_manager.__class__.__name__ = 'Servers'
+        resource_manager.delete_batch_size.return_value = 1
+        exit = threading.Event()
+
+        main.runner(resource_manager,
+                    make_options(dry_run=False, resource=False), exit)
+
+        servers = metrics.get_metrics().report()['managers']['Servers']
+        self.assertEqual(1, servers['operations']['list']['count'])
+        self.assertEqual(2, servers['operations']['delete']['count'])
+        self.assertEqual(1, servers['operations']['delete']['errors'])
+        self.assertIn('deletions', servers['sleeps'])
+        self.assertEqual((2, 1), (servers['listed'], servers['deleted']))
+
+    def test_write_metrics_report(self):
+        main.write_metrics_report(make_options())
+        with tempfile.NamedTemporaryFile('r') as f, \
+                mock.patch.object(metrics, '_metrics') as m_metrics:
+            main.write_metrics_report(make_options(metrics_report=f.name))
+            m_metrics.write_report.assert_called_once_with(f.name)
+
     def test_runner_with_unrecoverable_exception(self):
         resource_manager = mock.Mock(list=mock.Mock(side_effect=Exception))
         exit = mock.Mock()
 
-        main.runner(resource_manager, mock.Mock(dry_run=True), exit)
+        main.runner(resource_manager, make_options(dry_run=True), exit)
 
         exit.set.assert_called_once_with()
 
@@ -132,13 +365,13 @@ class TestFunctions(unittest.TestCase):
         resource_manager = mock.Mock(list=mock.Mock(side_effect=exc))
         exit = mock.Mock()
 
-        main.runner(resource_manager, mock.Mock(dry_run=True), exit)
+        main.runner(resource_manager, make_options(dry_run=True), exit)
         self.assertEqual(1, resource_manager.list.call_count)
         self.assertFalse(exit.set.called)
 
         resource_manager = mock.Mock(
             list=mock.Mock(side_effect=MyEndpointNotFound))
-        main.runner(resource_manager, mock.Mock(dry_run=True), exit)
+        main.runner(resource_manager, make_options(dry_run=True), exit)
         self.assertEqual(1, resource_manager.list.call_count)
         self.assertFalse(exit.set.called)
 
@@ -150,9 +383,25 @@ class TestFunctions(unittest.TestCase):
     @mock.patch('sys.exit', autospec=True)
     def test_main(self, m_sys_exit, m_tpe, m_event, m_parse_args, m_shade,
                   m_oscc):
-        m_tpe.return_value.__enter__.return_value.map.side_effect = \
+        m_tpe.return_value.__enter__.return_value.submit.side_effect = \
             KeyboardInterrupt
+        m_event.return_value.is_set.return_value = False
         m_parse_args.return_value.purge_own_project = False
+        m_parse_args.return_value.delete_concurrency = 8
+        m_parse_args.return_value.service_concurrency = None
+        m_parse_args.return_value.max_concurrency = None
+        m_parse_args.return_value.purge_projects = [['foo']]
+        m_parse_args.return_value.processes = 1
+        m_parse_args.return_value.max_workers = None
+        m_parse_args.return_value.journal = None
+        m_parse_args.return_value.resume = None
+        m_parse_args.return_value.plan_out = None
+        m_parse_args.return_value.apply_plan = None
+        m_parse_args.return_value.metrics_report = None
+        m_parse_args.return_value.metrics_file = None
+        m_parse_args.return_value.trace_out = None
+        m_parse_args.return_value.record = None
+        m_parse_args.return_value.replay = None
         m_parse_args.return_value.resource = None
         m_shade.operator_cloud().get_project().enabled = False
 
@@ -167,14 +416,15 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(1, m_tpe.return_value.__exit__.call_count)
 
         executor = m_tpe.return_value.__enter__.return_value
-        self.assertEqual(1, executor.map.call_count)
-        map_args = executor.map.call_args[0]
-        self.assertEqual(True, callable(map_args[0]))
-        for obj in map_args[1]:
-            self.assertIsInstance(obj, ServiceResource)
+        self.assertEqual(1, executor.submit.call_count)
+        submit_args = executor.submit.call_args[0]
+        self.assertEqual(True, callable(submit_args[0]))
+        self.assertIsInstance(submit_args[1], ServiceResource)
+        # Resource managers without dependencies are started first
+        self.assertEqual((), submit_args[1].depends_on())
 
         m_event.return_value.set.assert_called_once_with()
-        m_event.return_value.is_set.assert_called_once_with()
+        m_event.return_value.is_set.assert_called_with()
         self.assertIsInstance(m_sys_exit.call_args[0][0], int)
 
     @mock.patch.object(main, 'os_client_config', autospec=True)
@@ -185,21 +435,380 @@ class TestFunctions(unittest.TestCase):
     @mock.patch('sys.exit', autospec=True)
     def test_main_resource(self, m_sys_exit, m_tpe, m_event, m_parse_args,
                            m_shade, m_oscc):
-        m_tpe.return_value.__enter__.return_value.map.side_effect = \
+        m_tpe.return_value.__enter__.return_value.submit.side_effect = \
             KeyboardInterrupt
+        m_event.return_value.is_set.return_value = False
         m_parse_args.return_value.purge_own_project = False
+        m_parse_args.return_value.delete_concurrency = 8
+        m_parse_args.return_value.service_concurrency = None
+        m_parse_args.return_value.max_concurrency = None
+        m_parse_args.return_value.purge_projects = [['foo']]
+        m_parse_args.return_value.processes = 1
+        m_parse_args.return_value.max_workers = None
+        m_parse_args.return_value.journal = None
+        m_parse_args.return_value.resume = None
+        m_parse_args.return_value.plan_out = None
+        m_parse_args.return_value.apply_plan = None
+        m_parse_args.return_value.metrics_report = None
+        m_parse_args.return_value.metrics_file = None
+        m_parse_args.return_value.trace_out = None
+        m_parse_args.return_value.record = None
+        m_parse_args.return_value.replay = None
         m_parse_args.return_value.resource = "Networks"
         m_shade.operator_cloud().get_project().enabled = False
         main.main()
         m_tpe.return_value.__enter__.assert_called_once_with()
         executor = m_tpe.return_value.__enter__.return_value
-        map_args = executor.map.call_args[0]
-        for obj in map_args[1]:
-            self.assertIsInstance(obj, ServiceResource)
+        submit_args = executor.submit.call_args[0]
+        self.assertIsInstance(submit_args[1], ServiceResource)
+
+    @mock.patch.object(main.clients, 'close_session')
+    @mock.patch.object(main, 'purge')
+    def test_purge_project_closes_session(self, m_purge, m_close_session):
+        options = make_options(purge_project=None)
+        exit = threading.Event()
+        m_purge.side_effect = exceptions.OSProjectNotFound()
+
+        main.purge_project(options, 'foo', exit, mock.sentinel.cloud)
+        self.assertTrue(exit.is_set())
+        # Even if the purge failed.
+        project_options = m_purge.call_args[0][0]
+        self.assertEqual('foo', project_options.purge_project)
+        m_close_session.assert_called_once_with(project_options)
+
+    @mock.patch.object(main, 'shade')
+    @mock.patch.object(main, 'purge')
+    def test_purge_projects(self, m_purge, m_shade):
+        def purge(options, exit, operator_cloud):
+            if options.purge_project == 'bad':
+                raise exceptions.OSProjectNotFound()
+            if options.purge_project == 'fail':
+                exit.set()
+
+        m_purge.side_effect = purge
+        options = make_options(project_concurrency=2, purge_project=None)
+        exits = main.purge_projects(options, ['foo', 'bad', 'fail', 'bar'])
+
+        self.assertEqual(
+            [('foo', False), ('bad', True), ('fail', True), ('bar', False)],
+            [(project, exit.is_set()) for project, exit in exits.items()])
+
+        # Authenticate once for all the projects.
+        m_shade.operator_cloud.assert_called_once_with(argparse=options)
+        self.assertEqual(4, m_purge.call_count)
+        for call in m_purge.call_args_list:
+            self.assertIs(m_shade.operator_cloud.return_value, call[0][2])
+            self.assertIsNot(options, call[0][0])
+        self.assertEqual(
+            ['foo', 'bad', 'fail', 'bar'],
+            sorted([c[0][0].purge_project for c in m_purge.call_args_list],
+                   key=['foo', 'bad', 'fail', 'bar'].index))
+        self.assertIsNone(options.purge_project)
+
+    def test_check_prerequisite(self):
+        mngr = mock.Mock(check_prerequisite=mock.Mock(return_value=False))
+        exit = threading.Event()
+
+        self.assertEqual(True, main.check_prerequisite(
+            mngr, make_options(dry_run=True), exit, 0))
+        self.assertEqual(True, main.check_prerequisite(
+            mngr, make_options(dry_run=False, resource=['Networks']), exit, 0))
+        mngr.check_prerequisite.assert_not_called()
+
+        with mock.patch('time.time', return_value=10):
+            self.assertEqual(False, main.check_prerequisite(
+                mngr, make_options(dry_run=False, resource=None), exit, 20))
+            self.assertFalse(exit.is_set())
+            self.assertIsNone(main.check_prerequisite(
+                mngr, make_options(dry_run=False, resource=None), exit, 10))
+            self.assertTrue(exit.is_set())
+
+        mngr.check_prerequisite.return_value = True
+        self.assertEqual(True, main.check_prerequisite(
+            mngr, make_options(dry_run=False, resource=None), exit, 0))
+
+    @mock.patch('ospurge.aio.run')
+    @mock.patch.object(main, 'CredentialsManager')
+    def test_purge_with_asyncio_engine(self, m_creds_manager, m_aio_run):
+        options = make_options(engine='asyncio', resource=['Networks'],
+                               excluderesource=None)
+        exit = threading.Event()
+        main.purge(options, exit)
+
+        m_aio_run.assert_called_once_with(mock.ANY, options, exit, 1)
+        sched = m_aio_run.call_args[0][0]
+        self.assertEqual(['Networks'], list(sched.resource_managers))
+
+    @mock.patch('ospurge.aio.run')
+    @mock.patch('ospurge.journal.get_journal')
+    @mock.patch.object(main, 'CredentialsManager')
+    def test_purge_skips_done_managers(self, m_creds_manager, m_get_journal,
+                                       m_aio_run):
+        m_creds_manager.return_value.project_id = 'p1'
+        m_get_journal.return_value.is_done.side_effect = \
+            lambda project, manager: manager == 'Networks'
+        options = make_options(engine='asyncio',
+                               resource=['Networks', 'Ports'],
+                               excluderesource=None)
+        main.purge(options, threading.Event())
+
+        sched = m_aio_run.call_args[0][0]
+        self.assertEqual(['Ports'], list(sched.resource_managers))
+        m_get_journal.return_value.is_done.assert_any_call('p1', 'Networks')
+
+    @mock.patch('ospurge.aio.run')
+    @mock.patch('ospurge.plan.get_plan')
+    @mock.patch.object(main, 'CredentialsManager')
+    def test_purge_apply_plan(self, m_creds_manager, m_get_plan, m_aio_run):
+        m_creds_manager.return_value.project_id = 'p1'
+        m_get_plan.return_value.managers.return_value = ['Ports']
+        options = make_options(engine='asyncio', resource=None,
+                               excluderesource=None)
+        main.purge(options, threading.Event())
+
+        m_get_plan.return_value.managers.assert_called_once_with('p1')
+        sched = m_aio_run.call_args[0][0]
+        self.assertEqual(['Ports'], list(sched.resource_managers))
+
+    @mock.patch.object(main, 'shade')
+    @mock.patch.object(main, 'purge_in_worker')
+    @mock.patch('concurrent.futures.ProcessPoolExecutor',
+                side_effect=lambda workers, mp_context:
+                concurrent.futures.ThreadPoolExecutor(workers))
+    @mock.patch.object(metrics, '_metrics', metrics.Metrics())
+    @mock.patch.object(trace, '_tracer', trace.Tracer())
+    def test_purge_projects_in_processes(self, m_executor, m_purge_in_worker,
+                                         m_shade):
+        def purge_in_worker(options, project):
+            if project == 'bad':
+                raise exceptions.OSProjectNotFound()
+            worker_metrics = metrics.Metrics()
+            worker_metrics.record('Servers', 'list', 1)
+            return project == 'fail', worker_metrics, [{'name': project}]
+
+        m_purge_in_worker.side_effect = purge_in_worker
+        options = make_options(processes=4, purge_project=None)
+        exits = main.purge_projects(options, ['foo', 'bad', 'fail', 'bar'])
+
+        self.assertEqual(
+            [('foo', False), ('bad', True), ('fail', True), ('bar', False)],
+            [(project, exit.is_set()) for project, exit in exits.items()])
+        self.assertEqual(4, m_purge_in_worker.call_count)
+        # The workers are not forked from this process and its threads.
+        mp_context = m_executor.call_args[1]['mp_context']
+        self.assertEqual('spawn', mp_context.get_start_method())
+        # The workers authenticate themselves.
+        m_shade.operator_cloud.assert_not_called()
+        # The metrics of the workers are merged.
+        report = metrics.get_metrics().report()
+        self.assertEqual(
+            3, report['managers']['Servers']['operations']['list']['count'])
+        self.assertEqual(
+            ['bar', 'fail', 'foo'],
+            sorted(e['name'] for e in trace.get_tracer().events()
+                   if e['name'] not in ('thread_name', 'process_name')))
+
+    @mock.patch.object(main, 'purge_in_worker')
+    @mock.patch('concurrent.futures.ProcessPoolExecutor',
+                side_effect=lambda workers, mp_context:
+                concurrent.futures.ThreadPoolExecutor(workers))
+    @mock.patch.object(metrics, '_metrics', metrics.Metrics())
+    def test_purge_projects_in_processes_metrics(self, m_executor,
+                                                 m_purge_in_worker):
+        foo_done = threading.Event()
+        exported = []
+
+        def purge_in_worker(options, project):
+            worker_metrics = metrics.Metrics()
+            worker_metrics.record_resources('Servers', 'deleted', 2)
+            if project == 'bar':
+                # The metrics of foo are exported while bar is purged.
+                foo_done.wait(5)
+                for _ in range(50):
+                    text = exporter.render(metrics.get_metrics())
+                    if 'ospurge_resources_deleted_total' in text:
+                        break
+                    time.sleep(0.1)
+                exported.append(text)
+            else:
+                foo_done.set()
+            return False, worker_metrics, []
+
+        m_purge_in_worker.side_effect = purge_in_worker
+        options = make_options(processes=2, purge_project=None)
+        main.purge_projects(options, ['foo', 'bar'])
+
+        self.assertIn(
+            'ospurge_resources_deleted_total{manager="Servers"} 2.0',
+            exported[0])
+        self.assertIn(
+            'ospurge_resources_deleted_total{manager="Servers"} 4.0',
+            exporter.render(metrics.get_metrics()))
+
+    @mock.patch.object(main, '_worker_operator_cloud', None)
+    @mock.patch.object(main, 'shade')
+    @mock.patch.object(main, 'purge_project')
+    def test_purge_in_worker(self, m_purge_project, m_shade):
+        def purge_project(options, project, exit, operator_cloud):
+            if project == 'fail':
+                exit.set()
+
+        m_purge_project.side_effect = purge_project
+        options = make_options(verbose=False)
+
+        failed, worker_metrics, events = main.purge_in_worker(options, 'foo')
+        self.assertEqual(False, failed)
+        self.assertIsInstance(worker_metrics, metrics.Metrics)
+        self.assertEqual([], events)
+        self.assertEqual(True, main.purge_in_worker(options, 'fail')[0])
+        m_shade.operator_cloud.assert_called_once_with(argparse=options)
+        m_purge_project.assert_called_with(
+            options, 'fail', mock.ANY, m_shade.operator_cloud.return_value)
+
+        # With --trace-out, the worker records its own trace.
+        with mock.patch.object(trace, '_tracer', None):
+            options.trace_out = 'trace.json'
+            events = main.purge_in_worker(options, 'foo')[2]
+        self.assertIn('process_name', [e['name'] for e in events])
+
+    @mock.patch.object(main, 'os_client_config', autospec=True)
+    @mock.patch('argparse.ArgumentParser.parse_args')
+    @mock.patch.object(main, 'purge_projects')
+    @mock.patch('sys.exit', autospec=True)
+    def test_main_exit_status(self, m_sys_exit, m_purge_projects,
+                              m_parse_args, m_oscc):
+        m_parse_args.return_value.purge_own_project = False
+        m_parse_args.return_value.purge_projects = [['foo', 'bar']]
+        m_parse_args.return_value.plan_out = None
+        m_parse_args.return_value.metrics_report = None
+        m_parse_args.return_value.metrics_file = None
+        m_parse_args.return_value.trace_out = None
+        m_parse_args.return_value.record = None
+        m_parse_args.return_value.replay = None
+        exits = {'foo': threading.Event(), 'bar': threading.Event()}
+        m_purge_projects.return_value = exits
+
+        main.main()
+        m_purge_projects.assert_called_once_with(
+            m_parse_args.return_value, ['foo', 'bar'])
+        m_sys_exit.assert_called_with(0)
+
+        exits['bar'].set()
+        main.main()
+        m_sys_exit.assert_called_with(1)
+
+    @mock.patch.object(main, 'os_client_config', autospec=True)
+    @mock.patch('argparse.ArgumentParser.parse_args')
+    @mock.patch.object(main, 'purge_projects')
+    @mock.patch.object(main.recording, 'close_recorders')
+    @mock.patch.object(main.plan, 'close_writers')
+    @mock.patch.object(main.journal, 'close_journals')
+    def test_main_closes_files(self, m_close_journals, m_close_writers,
+                               m_close_recorders, m_purge_projects,
+                               m_parse_args, m_oscc):
+        options = m_parse_args.return_value
+        options.purge_own_project = False
+        options.purge_projects = [['foo']]
+        options.plan_out = None
+        options.metrics_report = None
+        options.metrics_file = None
+        options.trace_out = None
+        options.record = None
+        options.replay = None
+        m_purge_projects.side_effect = KeyboardInterrupt
+
+        self.assertRaises(KeyboardInterrupt, main.main)
+        m_close_journals.assert_called_once_with()
+        m_close_writers.assert_called_once_with()
+        m_close_recorders.assert_called_once_with()
+
+    @mock.patch.object(main, 'os_client_config', autospec=True)
+    @mock.patch('argparse.ArgumentParser.parse_args')
+    @mock.patch.object(main, 'purge_projects')
+    @mock.patch.object(main, 'exporter')
+    @mock.patch('sys.exit', autospec=True)
+    def test_main_metrics_file(self, m_sys_exit, m_exporter,
+                               m_purge_projects, m_parse_args, m_oscc):
+        options = m_parse_args.return_value
+        options.purge_own_project = False
+        options.purge_projects = [['foo']]
+        options.plan_out = None
+        options.metrics_report = None
+        options.metrics_file = 'ospurge.prom'
+        options.trace_out = None
+        options.record = None
+        options.replay = None
+        m_purge_projects.side_effect = KeyboardInterrupt
+
+        self.assertRaises(KeyboardInterrupt, main.main)
+
+        m_exporter.TextfileExporter.assert_called_once_with('ospurge.prom')
+        textfile = m_exporter.TextfileExporter.return_value
+        textfile.start.assert_called_once_with()
+        # The metrics are finalised whatever happens.
+        textfile.stop.assert_called_once_with()
+
+    @mock.patch.object(trace, '_tracer', None)
+    @mock.patch.object(main, 'os_client_config', autospec=True)
+    @mock.patch.object(main, 'purge_projects')
+    def test_main_trace_out(self, m_purge_projects, m_oscc):
+        def purge_projects(options, projects):
+            with trace.span('Ports delete', 'delete'):
+                return {}
+
+        m_purge_projects.side_effect = purge_projects
+        with tempfile.NamedTemporaryFile('r') as f:
+            argv = ['ospurge', '--purge-project', 'foo', '--trace-out',
+                    f.name]
+            with mock.patch('sys.argv', argv), mock.patch('sys.exit'):
+                main.main()
+            events = json.load(f)['traceEvents']
+        self.assertIn('Ports delete', [e['name'] for e in events])
+
+    @mock.patch.object(main, 'os_client_config', autospec=True)
+    @mock.patch.object(main, 'purge_projects')
+    def test_main_plan_out(self, m_purge_projects, m_oscc):
+        with tempfile.NamedTemporaryFile('w') as f:
+            f.write('stale plan\n')
+            f.flush()
+            argv = ['ospurge', '--purge-project', 'foo', '--plan-out', f.name]
+            with mock.patch('sys.argv', argv), \
+                    mock.patch('sys.stderr'):
+                self.assertRaises(SystemExit, main.main)
+            m_purge_projects.assert_not_called()
+
+            m_purge_projects.return_value = {}
+            with mock.patch('sys.argv', argv + ['--dry-run']), \
+                    mock.patch('sys.exit'):
+                main.main()
+            m_purge_projects.assert_called_once_with(mock.ANY, ['foo'])
+            with open(f.name) as plan_file:
+                self.assertEqual('', plan_file.read())
+
+    @mock.patch.object(main, 'os_client_config', autospec=True)
+    @mock.patch.object(main, 'purge_projects')
+    def test_main_record_replay(self, m_purge_projects, m_oscc):
+        argv = ['ospurge', '--purge-project', 'foo', '--record', 'rec',
+                '--replay', 'rec']
+        with mock.patch('sys.argv', argv), mock.patch('sys.stderr'):
+            self.assertRaises(SystemExit, main.main)
+
+        # Nothing recorded in the directory.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        argv = ['ospurge', '--purge-project', 'foo', '--replay', directory]
+        with mock.patch('sys.argv', argv), mock.patch('sys.stderr'):
+            self.assertRaises(SystemExit, main.main)
+        m_purge_projects.assert_not_called()
 
 
 @mock.patch.object(main, 'shade')
 class TestCredentialsManager(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(main, 'throttle')
+        self.m_throttle = patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_init_with_purge_own_project(self, m_shade):
         _options = SimpleNamespace(
             purge_own_project=True, purge_project=None)
@@ -224,6 +833,9 @@ class TestCredentialsManager(unittest.TestCase):
         )
 
         creds_mgr.cloud.cloud_config.get_auth_args.assert_called_once_with()
+        # Mounted before the first request, that authenticates.
+        self.m_throttle.mount.assert_called_once_with(
+            creds_mgr.cloud.keystone_session.session, _options)
 
     @mock.patch.object(utils, 'replace_project_info')
     def test_init_with_purge_project(self, m_replace, m_shade):
@@ -256,6 +868,24 @@ class TestCredentialsManager(unittest.TestCase):
             creds_mgr.project_id
         )
         creds_mgr.cloud.cloud_config.get_auth_args.assert_called_once_with()
+        self.assertEqual(
+            [mock.call(creds_mgr.operator_cloud.keystone_session.session,
+                       _options),
+             mock.call(creds_mgr.cloud.keystone_session.session, _options)],
+            self.m_throttle.mount.call_args_list)
+
+    def test_init_with_operator_cloud(self, m_shade):
+        operator_cloud = mock.MagicMock()
+        creds_mgr = main.CredentialsManager(
+            mock.Mock(purge_own_project=False), operator_cloud=operator_cloud)
+
+        self.assertIs(operator_cloud, creds_mgr.operator_cloud)
+        m_shade.operator_cloud.assert_not_called()
+        # The operator cloud is mounted by its creator.
+        self.m_throttle.mount.assert_called_once_with(
+            creds_mgr.cloud.keystone_session.session, mock.ANY)
+        self.assertEqual(operator_cloud.get_project()['id'],
+                         creds_mgr.project_id)
 
     def test_init_with_project_not_found(self, m_shade):
         m_shade.operator_cloud.return_value.get_project.return_value = None
@@ -0,0 +1,173 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import json
+import pickle
+import tempfile
+import unittest
+
+from ospurge import metrics
+from ospurge.tests import mock
+
+
+class TestStats(unittest.TestCase):
+    def test_add(self):
+        stats = metrics.Stats()
+        stats.add(0.02)
+        stats.add(0.3, error=True)
+        stats.add(100)
+
+        result = stats.to_dict()
+        self.assertEqual(3, result['count'])
+        self.assertEqual(1, result['errors'])
+        self.assertAlmostEqual(100.32, result['total_seconds'])
+        self.assertEqual(100, result['max_seconds'])
+        histogram = dict((str(k), v) for k, v in result['histogram'])
+        self.assertEqual(0, histogram['0.01'])
+        self.assertEqual(1, histogram['0.025'])
+        self.assertEqual(2, histogram['0.5'])
+        self.assertEqual(2, histogram['60'])
+        self.assertEqual(3, histogram['+Inf'])
+
+    def test_quantile(self):
+        stats = metrics.Stats()
+        self.assertEqual(0, stats.quantile(0.5))
+        for seconds in (0.2, 0.2, 0.3, 0.4, 2):
+            stats.add(seconds)
+
+        # 2 latencies up to 0.25, 2 between 0.25 and 0.5...
+        self.assertAlmostEqual(0.25 + 0.25 * 0.5 / 2, stats.quantile(0.5))
+        self.assertAlmostEqual(0.3125, stats.to_dict()['quantiles']['0.5'])
+        # ... and one between 1 and 2.5, capped by the max.
+        self.assertAlmostEqual(1.95, stats.quantile(0.99))
+
+    def test_merge(self):
+        stats, other = metrics.Stats(), metrics.Stats()
+        stats.add(1)
+        other.add(2, error=True)
+        stats.merge(other)
+        self.assertEqual((2, 1, 3, 2), (stats.count, stats.errors,
+                                        stats.total, stats.max))
+        self.assertEqual(2, sum(stats.buckets))
+
+
+@mock.patch.object(metrics, 'clock', side_effect=range(100))
+class TestMetrics(unittest.TestCase):
+    def test_measure(self, m_clock):
+        stats = metrics.Metrics()
+        with stats.measure('Servers', 'delete'):
+            pass
+        with self.assertRaises(ValueError):
+            with stats.measure('Servers', 'delete'):
+                raise ValueError
+
+        delete = stats.report()['managers']['Servers']['operations']['delete']
+        self.assertEqual(2, delete['count'])
+        self.assertEqual(1, delete['errors'])
+        self.assertEqual(2, delete['total_seconds'])
+
+    def test_timed_list(self, m_clock):
+        stats = metrics.Metrics()
+        list_resources = mock.Mock(return_value=iter([1, 2]))
+
+        resources = stats.timed_list('Servers', list_resources)
+        list_resources.assert_not_called()
+        for resource in resources:
+            # The time spent by the caller is not counted.
+            metrics.clock()
+
+        report = stats.report()['managers']['Servers']
+        self.assertEqual(2, report['listed'])
+        self.assertEqual(0, report['deleted'])
+        self.assertEqual(1, report['operations']['list']['count'])
+        self.assertEqual(3, report['operations']['list']['total_seconds'])
+        self.assertEqual(3, report['working_seconds'])
+
+    def test_timed_list_error(self, m_clock):
+        stats = metrics.Metrics()
+        list_resources = mock.Mock(side_effect=ValueError)
+
+        self.assertRaises(ValueError, list,
+                          stats.timed_list('Servers', list_resources))
+        list_stats = stats.report()['managers']['Servers']['operations'][
+            'list']
+        self.assertEqual(1, list_stats['errors'])
+
+    def test_timed_list_closed(self, m_clock):
+        stats = metrics.Metrics()
+        resources = stats.timed_list('Servers', lambda: iter([1, 2]))
+        next(resources)
+        resources.close()
+        list_stats = stats.report()['managers']['Servers']['operations'][
+            'list']
+        self.assertEqual((1, 0), (list_stats['count'], list_stats['errors']))
+
+    def test_sleeps(self, m_clock):
+        stats = metrics.Metrics()
+        stats.record('Volumes', 'poll', 1)
+        stats.record_sleep('Volumes', 'prerequisite', 8)
+        with stats.sleeping('Volumes', 'deletions'):
+            pass
+
+        report = stats.report()['managers']['Volumes']
+        self.assertEqual({'prerequisite': 8, 'deletions': 1},
+                         report['sleeps'])
+        self.assertEqual(9, report['sleeping_seconds'])
+        self.assertEqual(1, report['working_seconds'])
+
+    def test_requests(self, m_clock):
+        stats = metrics.Metrics()
+        stats.record_request('https://neutron', 0.5)
+        stats.record_request('https://neutron', 0.1, error=True)
+        stats.record_backoff('https://neutron', 2)
+        stats.record_backoff('https://nova', 4)
+
+        endpoints = stats.report()['endpoints']
+        self.assertEqual(2, endpoints['https://neutron']['count'])
+        self.assertEqual(1, endpoints['https://neutron']['errors'])
+        self.assertEqual(1, endpoints['https://neutron']['throttled'])
+        self.assertEqual(2, endpoints['https://neutron']['backoff_seconds'])
+        self.assertEqual(0, endpoints['https://nova']['count'])
+        self.assertEqual(4, endpoints['https://nova']['backoff_seconds'])
+
+    def test_merge_from_other_process(self, m_clock):
+        stats, other = metrics.Metrics(), metrics.Metrics()
+        stats.record('Servers', 'list', 1)
+        other.record('Servers', 'list', 2)
+        other.record_sleep('Servers', 'prerequisite', 3)
+        other.record_request('https://nova', 1)
+        other.record_backoff('https://nova', 1)
+
+        stats.merge(pickle.loads(pickle.dumps(other)))
+
+        report = stats.report()
+        self.assertEqual(
+            2, report['managers']['Servers']['operations']['list']['count'])
+        self.assertEqual(3, report['managers']['Servers']['sleeping_seconds'])
+        self.assertEqual(1, report['endpoints']['https://nova']['throttled'])
+
+    def test_write_report(self, m_clock):
+        stats = metrics.Metrics()
+        stats.record('Servers', 'delete', 1)
+        with tempfile.NamedTemporaryFile('r') as f:
+            stats.write_report(f.name)
+            report = json.load(f)
+        self.assertIn('duration_seconds', report)
+        self.assertEqual(
+            1, report['managers']['Servers']['operations']['delete']['count'])
+
+    def test_collect(self, m_clock):
+        before = metrics.get_metrics()
+        try:
+            self.assertIs(before, metrics.collect())
+            self.assertIsNot(before, metrics.get_metrics())
+        finally:
+            metrics._metrics = before
@@ -0,0 +1,148 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import threading
+import time
+import unittest
+
+from ospurge import pipeline
+from ospurge.tests import mock
+
+
+@mock.patch.dict(pipeline._service_semaphores, clear=True)
+class TestFunctions(unittest.TestCase):
+    def test_get_service_semaphore(self):
+        sem = pipeline.get_service_semaphore('network', 4)
+        self.assertIs(sem, pipeline.get_service_semaphore('network', 2))
+        self.assertIsNot(sem, pipeline.get_service_semaphore('volume', 4))
+
+    def test_get_service_concurrency(self):
+        options = mock.Mock(delete_concurrency=8,
+                            service_concurrency=[('network', 16)])
+        self.assertEqual(
+            16, pipeline.get_service_concurrency('network', options))
+        self.assertEqual(
+            8, pipeline.get_service_concurrency('volume', options))
+
+        options = mock.Mock(delete_concurrency=0, service_concurrency=None)
+        self.assertEqual(
+            1, pipeline.get_service_concurrency('volume', options))
+
+    def test_make_delete_pool(self):
+        options = mock.Mock(delete_concurrency=8, service_concurrency=None,
+                            max_concurrency=None)
+        backups = mock.Mock(SERVICE_TYPE='volume')
+        volumes = mock.Mock(SERVICE_TYPE='volume')
+
+        with pipeline.make_delete_pool(backups, options, None) as pool:
+            self.assertEqual(8, pool.executor._max_workers)
+        with pipeline.make_delete_pool(volumes, options, None) as pool2:
+            self.assertEqual(8, pool2.executor._max_workers)
+
+        # The resource types of a service share its semaphore.
+        self.assertIs(pool.semaphore, pool2.semaphore)
+        for _ in range(8):
+            self.assertTrue(pool.semaphore.acquire(False))
+
+    def test_make_delete_pool_max_concurrency(self):
+        options = mock.Mock(delete_concurrency=8, service_concurrency=None,
+                            max_concurrency=32)
+        volumes = mock.Mock(SERVICE_TYPE='volume')
+
+        with pipeline.make_delete_pool(volumes, options, None) as pool:
+            self.assertEqual(32, pool.executor._max_workers)
+
+
+class TestDeletePool(unittest.TestCase):
+    def test_single_worker_overlaps_with_caller(self):
+        listed = threading.Event()
+        calls = []
+
+        def f(arg):
+            # Only returns if the caller could go on while f() runs.
+            calls.append((arg, listed.wait(5)))
+
+        with pipeline.DeletePool(1, threading.Event()) as pool:
+            pool.submit(f, 1)
+            listed.set()
+            pool.submit(f, 2)
+
+        self.assertEqual([(1, True), (2, True)], calls)
+
+    def test_submit_blocks_when_queue_is_full(self):
+        release = threading.Event()
+        submitted = []
+        # Twice as many pending calls as workers.
+        pool = pipeline.DeletePool(1, threading.Event())
+
+        def producer():
+            for i in range(4):
+                pool.submit(release.wait)
+                submitted.append(i)
+
+        thread = threading.Thread(target=producer)
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual([0, 1], submitted)
+
+        release.set()
+        thread.join()
+        pool.join()
+        self.assertEqual([0, 1, 2, 3], submitted)
+
+    def test_concurrent(self):
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def f(arg):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        semaphore = threading.BoundedSemaphore(3)
+        with pipeline.DeletePool(4, threading.Event(), semaphore) as pool:
+            for i in range(20):
+                pool.submit(f, i)
+
+        self.assertEqual(3, peak[0])
+
+    def test_error_is_reraised(self):
+        f = mock.Mock(side_effect=[None, ValueError, None, None])
+        pool = pipeline.DeletePool(2, threading.Event())
+        pool.submit(f, 1)
+        pool.submit(f, 2)
+        self.assertRaises(ValueError, pool.join)
+
+        pool = pipeline.DeletePool(2, threading.Event())
+        pool.submit(mock.Mock(side_effect=KeyError))
+        pool.executor.shutdown(wait=True)
+        self.assertRaises(KeyError, pool.submit, f, 3)
+
+    def test_skip_calls_once_exit_is_set(self):
+        exit = threading.Event()
+        exit.set()
+        f = mock.Mock()
+        with pipeline.DeletePool(2, exit) as pool:
+            pool.submit(f, 1)
+        f.assert_not_called()
+
+    def test_exception_in_body_is_not_hidden(self):
+        def body():
+            with pipeline.DeletePool(2, threading.Event()) as pool:
+                pool.submit(mock.Mock(side_effect=KeyError))
+                pool.executor.shutdown(wait=True)
+                raise ValueError
+
+        self.assertRaises(ValueError, body)
@@ -0,0 +1,80 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ospurge import plan
+from ospurge.tests import mock
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'plan.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_write_and_load(self):
+        writer = plan.PlanWriter(self.path)
+        writer.write('p1', 'Ports', "Port (id='a')", {'id': 'a'})
+        writer.write('p1', 'Networks', "Network (id='b')", {'id': 'b'})
+        writer.write('p1', 'Ports', "Port (id='c')",
+                     {'id': 'c', 'created': datetime.date(2018, 1, 1)})
+        writer.write('p2', 'Ports', "Port (id='d')", {'id': 'd'})
+
+        # Lines are flushed as soon as they are written.
+        with open(self.path) as f:
+            first = json.loads(f.readline())
+        self.assertEqual({'project': 'p1', 'manager': 'Ports',
+                          'description': "Port (id='a')",
+                          'resource': {'id': 'a'}}, first)
+        writer.close()
+
+        purge_plan = plan.Plan(self.path)
+        self.assertEqual(['Ports', 'Networks'], purge_plan.managers('p1'))
+        self.assertEqual(['Ports'], purge_plan.managers('p2'))
+        self.assertEqual([], purge_plan.managers('p3'))
+        self.assertEqual(
+            [{'id': 'a'}, {'id': 'c', 'created': '2018-01-01'}],
+            purge_plan.resources('p1', 'Ports')
+        )
+        self.assertEqual([], purge_plan.resources('p1', 'Servers'))
+
+    def test_get_writer(self):
+        self.assertIsNone(plan.get_writer(argparse.Namespace(plan_out=None)))
+
+        with mock.patch.dict(plan._writers, clear=True), \
+                mock.patch.object(plan, 'PlanWriter') as m_writer:
+            options = argparse.Namespace(plan_out=self.path)
+            self.assertIs(m_writer.return_value, plan.get_writer(options))
+            self.assertIs(m_writer.return_value, plan.get_writer(options))
+            m_writer.assert_called_once_with(self.path)
+
+            plan.close_writers()
+            m_writer.return_value.close.assert_called_once_with()
+            self.assertEqual({}, plan._writers)
+
+    def test_get_plan(self):
+        self.assertIsNone(plan.get_plan(argparse.Namespace(apply_plan=None)))
+
+        with mock.patch.dict(plan._plans, clear=True), \
+                mock.patch.object(plan, 'Plan') as m_plan:
+            options = argparse.Namespace(apply_plan=self.path)
+            self.assertIs(m_plan.return_value, plan.get_plan(options))
+            self.assertIs(m_plan.return_value, plan.get_plan(options))
+            m_plan.assert_called_once_with(self.path)
@@ -0,0 +1,173 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import json
+import os
+import shutil
+import tempfile
+import time
+import types
+import unittest
+
+import requests
+
+from ospurge import recording
+from ospurge.tests import mock
+
+
+def make_response(status_code, content, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = 'OK'
+    response.headers.update(headers or {})
+    response._content = content
+    return response
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def record(self, *exchanges):
+        recorder = recording.Recorder(os.path.join(self.directory, 'rec'))
+        for started, (method, url, response) in enumerate(exchanges):
+            request = requests.Request(method, url).prepare()
+            recorder.record(request, response, started, 0.5)
+        recorder.close()
+        return recorder
+
+    def test_request_key(self):
+        self.assertEqual(
+            ('GET', 'http://nova/servers?a=1&b=2'),
+            recording.request_key('GET', 'http://nova/servers?b=2&a=1'))
+
+    def test_record(self):
+        token = json.dumps({'token': {'expires_at': 'then'}}).encode()
+        recorder = self.record(
+            ('POST', 'http://keystone/v3/auth/tokens',
+             make_response(201, token, {'X-Subject-Token': 'secret'})),
+            ('GET', 'http://swift/obj', make_response(200, b'\xff')),
+        )
+
+        with open(recorder.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual('recorded', records[0]['headers']['X-Subject-Token'])
+        self.assertEqual(201, records[0]['status'])
+        self.assertEqual(token.decode(), records[0]['body'])
+        self.assertEqual('/w==', records[1]['body_base64'])
+        self.assertEqual(0.5, records[1]['elapsed'])
+
+    def test_replay(self):
+        self.record(
+            ('GET', 'http://nova/servers', make_response(200, b'[1]')),
+            ('GET', 'http://nova/servers', make_response(200, b'[]')),
+            ('GET', 'http://swift/obj', make_response(200, b'\xff')),
+        )
+        replayer = recording.Replayer(os.path.join(self.directory, 'rec'))
+        request = requests.Request('GET', 'http://nova/servers').prepare()
+
+        self.assertEqual([1], replayer.send(request).json())
+        # The last response is served again.
+        self.assertEqual([], replayer.send(request).json())
+        self.assertEqual([], replayer.send(request).json())
+        response = replayer.send(
+            requests.Request('GET', 'http://swift/obj').prepare())
+        self.assertEqual(b'\xff', response.content)
+
+        request = requests.Request('DELETE', 'http://nova/servers').prepare()
+        self.assertEqual(404, replayer.send(request).status_code)
+
+    @mock.patch('time.sleep')
+    def test_replay_latency(self, m_sleep):
+        self.record(
+            ('GET', 'http://nova/servers', make_response(200, b'[]')))
+        replayer = recording.Replayer(
+            os.path.join(self.directory, 'rec'), latency_scale=2)
+        replayer.send(
+            requests.Request('GET', 'http://nova/servers').prepare())
+        m_sleep.assert_called_once_with(1.0)
+
+    def test_replay_renews_token(self):
+        token = json.dumps({'token': {'expires_at': 'then'}}).encode()
+        self.record(
+            ('POST', 'http://keystone/v3/auth/tokens',
+             make_response(201, token, {'X-Subject-Token': 'secret'})))
+        replayer = recording.Replayer(os.path.join(self.directory, 'rec'))
+        response = replayer.send(requests.Request(
+            'POST', 'http://keystone/v3/auth/tokens').prepare())
+
+        expires_at = response.json()['token']['expires_at']
+        self.assertGreater(expires_at, time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+    def test_replay_nothing_recorded(self):
+        self.assertRaises(ValueError, recording.Replayer, self.directory)
+
+    @mock.patch.dict(recording._recorders, clear=True)
+    @mock.patch.dict(recording._replayers, clear=True)
+    def test_get_recorder_replayer(self):
+        options = types.SimpleNamespace(record=None, replay=None)
+        self.assertIsNone(recording.get_recorder(options))
+        self.assertIsNone(recording.get_replayer(options))
+
+        options.record = self.directory
+        recorder = recording.get_recorder(options)
+        self.assertIs(recorder, recording.get_recorder(options))
+        recording.close_recorders()
+        self.assertTrue(recorder._file.closed)
+        self.assertEqual({}, recording._recorders)
+        self.record(
+            ('GET', 'http://nova/servers', make_response(200, b'[]')))
+
+        options.replay = os.path.join(self.directory, 'rec')
+        options.replay_latency = 0.0
+        replayer = recording.get_replayer(options)
+        self.assertIs(replayer, recording.get_replayer(options))
+
+
+    @mock.patch.object(requests.adapters.HTTPAdapter, 'send')
+    def test_recording_adapter(self, m_send):
+        m_send.return_value = make_response(204, b'')
+        recorder = mock.Mock()
+        adapter = recording.RecordingAdapter(recorder, pool_maxsize=32)
+        request = requests.Request('GET', 'http://nova/servers').prepare()
+
+        self.assertIs(m_send.return_value, adapter.send(request, timeout=3))
+        m_send.assert_called_once_with(request, timeout=3)
+        recorder.record.assert_called_once_with(
+            request, m_send.return_value, mock.ANY, mock.ANY)
+        self.assertEqual(32, adapter._pool_maxsize)
+
+    def test_replaying_adapter(self):
+        replayer = mock.Mock()
+        adapter = recording.ReplayingAdapter(replayer)
+        request = requests.Request('GET', 'http://nova/servers').prepare()
+
+        self.assertIs(replayer.send.return_value,
+                      adapter.send(request, timeout=3))
+        replayer.send.assert_called_once_with(request)
+
+    @mock.patch.object(recording, 'get_replayer')
+    @mock.patch.object(recording, 'get_recorder')
+    def test_get_adapter(self, m_get_recorder, m_get_replayer):
+        options = types.SimpleNamespace()
+        adapter = recording.get_adapter(options, pool_maxsize=32)
+        self.assertIsInstance(adapter, recording.ReplayingAdapter)
+        self.assertIs(m_get_replayer.return_value, adapter.replayer)
+
+        m_get_replayer.return_value = None
+        adapter = recording.get_adapter(options, pool_maxsize=32)
+        self.assertIsInstance(adapter, recording.RecordingAdapter)
+        self.assertIs(m_get_recorder.return_value, adapter.recorder)
+        self.assertEqual(32, adapter._pool_maxsize)
+
+        m_get_recorder.return_value = None
+        self.assertIsNone(recording.get_adapter(options))
@@ -0,0 +1,166 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import itertools
+import threading
+import unittest
+
+from ospurge import scheduler
+from ospurge.tests import mock
+from ospurge import utils
+
+
+def make_manager(name, order, depends_on=()):
+    klass = type(name, (object,), {
+        'order': classmethod(lambda cls: order),
+        'depends_on': lambda self: depends_on,
+    })
+    return klass()
+
+
+class TestDependencyScheduler(unittest.TestCase):
+    def setUp(self):
+        self.servers = make_manager('Servers', 15)
+        self.fips = make_manager('FloatingIPs', 25, ('Servers',))
+        self.images = make_manager('Images', 53)
+        self.volumes = make_manager('Volumes', 65, ('Servers', 'Snapshots'))
+
+    def test_ignore_unselected_dependencies(self):
+        sched = scheduler.DependencyScheduler(
+            [self.volumes, self.images], threading.Event())
+        self.assertEqual(set(), sched.dependencies['Volumes'])
+
+    def test_circular_dependencies(self):
+        foo = make_manager('Foo', 1, ('Bar',))
+        bar = make_manager('Bar', 2, ('Foo',))
+        self.assertRaisesRegex(
+            ValueError, "Circular dependency .*: Bar, Foo",
+            scheduler.DependencyScheduler,
+            [foo, bar, self.servers], threading.Event()
+        )
+
+    def test_topological_order(self):
+        sched = scheduler.DependencyScheduler(
+            [self.volumes, self.fips, self.images, self.servers],
+            threading.Event()
+        )
+        self.assertEqual(
+            [self.servers, self.images, self.fips, self.volumes],
+            sched.topological_order()
+        )
+
+    def test_topological_order_of_real_resources(self):
+        classes = utils.get_resource_classes()
+        sched = scheduler.DependencyScheduler(
+            [cls(mock.Mock()) for cls in classes], threading.Event())
+        names = [m.__class__.__name__ for m in sched.topological_order()]
+        self.assertEqual(len(classes), len(names))
+        for cls in classes:
+            for dep in cls.DEPENDS_ON:
+                self.assertIn(dep, names)
+                self.assertLess(names.index(dep), names.index(cls.__name__))
+
+    def test_backoff(self):
+        delays = [scheduler.backoff()]
+        for _ in range(3):
+            delays.append(scheduler.backoff(delays[-1]))
+        self.assertEqual([2, 4, 8, 8], delays)
+
+    def test_topological_order_of_classes(self):
+        classes = {cls.__name__: cls for cls in utils.get_resource_classes()}
+        ordered = scheduler.topological_order(
+            classes, {k: v.DEPENDS_ON for k, v in classes.items()})
+        self.assertEqual(set(classes.values()), set(ordered))
+        self.assertLess(ordered.index(classes['Servers']),
+                        ordered.index(classes['Volumes']))
+
+    def test_run(self):
+        sched = scheduler.DependencyScheduler(
+            [self.volumes, self.fips, self.images, self.servers],
+            threading.Event()
+        )
+        servers_done = threading.Event()
+        started = []
+        lock = threading.Lock()
+
+        def fn(mngr):
+            with lock:
+                started.append(mngr)
+            if mngr is self.servers:
+                # Images doesn't depend on Servers so it must be able to
+                # start while Servers is still running.
+                self.assertTrue(images_started.wait(5))
+                servers_done.set()
+            elif mngr is self.images:
+                images_started.set()
+            else:
+                self.assertTrue(servers_done.is_set())
+
+        images_started = threading.Event()
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            sched.run(executor, fn)
+
+        self.assertEqual(
+            [self.servers, self.images],
+            started[:2]
+        )
+        self.assertEqual(
+            {self.fips, self.volumes}, set(started[2:])
+        )
+
+    @mock.patch('time.time', side_effect=itertools.count(step=10))
+    def test_run_with_prerequisite(self, m_time):
+        sched = scheduler.DependencyScheduler(
+            [self.fips, self.images, self.servers], threading.Event())
+        results = {'Servers': [False, False, True], 'Images': [None]}
+        checked = []
+        started = []
+
+        def prerequisite(mngr):
+            checked.append(mngr)
+            return results.get(mngr.__class__.__name__, [True]).pop(0)
+
+        # A single thread is enough: parked resource managers don't hold it.
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            sched.run(executor, started.append, prerequisite)
+
+        self.assertEqual(
+            [self.servers, self.images, self.servers, self.servers,
+             self.fips],
+            checked)
+        # Images gave up, FloatingIPs started once Servers was done.
+        self.assertEqual([self.servers, self.fips], started)
+
+    def test_run_with_prerequisite_and_exit_set(self):
+        exit = threading.Event()
+        sched = scheduler.DependencyScheduler([self.servers], exit)
+        fn = mock.Mock()
+
+        def prerequisite(mngr):
+            exit.set()
+            return False
+
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            sched.run(executor, fn, prerequisite)
+
+        fn.assert_not_called()
+
+    def test_run_with_exit_set(self):
+        exit = threading.Event()
+        sched = scheduler.DependencyScheduler(
+            [self.fips, self.servers], exit)
+        fn = mock.Mock(side_effect=lambda mngr: exit.set())
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            sched.run(executor, fn)
+
+        fn.assert_called_once_with(self.servers)
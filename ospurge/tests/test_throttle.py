@@ -0,0 +1,302 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import threading
+import types
+import unittest
+
+from requests import adapters
+import requests
+
+from ospurge import metrics
+from ospurge import recording
+from ospurge import throttle
+from ospurge.tests import mock
+
+
+class TestFunctions(unittest.TestCase):
+    def test_parse_retry_after(self):
+        self.assertIsNone(throttle.parse_retry_after(None))
+        self.assertIsNone(throttle.parse_retry_after('soon'))
+        self.assertEqual(3, throttle.parse_retry_after('3'))
+        with mock.patch('time.time', return_value=1500000000):
+            self.assertEqual(10, throttle.parse_retry_after(
+                'Fri, 14 Jul 2017 02:40:10 GMT'))
+            self.assertEqual(0, throttle.parse_retry_after(
+                'Fri, 14 Jul 2017 02:00:00 GMT'))
+
+    def test_get_endpoint(self):
+        self.assertEqual('https://nova:8774/v2.1', throttle.get_endpoint(
+            'https://nova:8774/v2.1/servers/1'))
+        self.assertEqual('http://host/compute', throttle.get_endpoint(
+            'http://host/compute/v2.1/servers?limit=5'))
+        self.assertEqual('http://host/volume', throttle.get_endpoint(
+            'http://host/volume/v3/backups'))
+        self.assertEqual('http://nova:8774',
+                         throttle.get_endpoint('http://nova:8774/'))
+
+    def test_get_request_kind(self):
+        def kind(method, url):
+            return throttle.get_request_kind(
+                requests.Request(method, url).prepare())
+
+        self.assertEqual('DELETE', kind('DELETE', 'http://nova/servers/1'))
+        self.assertEqual('GET', kind('GET', 'http://nova/servers/1'))
+        self.assertEqual('GET list',
+                         kind('GET', 'http://nova/servers/detail'))
+        self.assertEqual('GET list',
+                         kind('GET', 'http://cinder/volumes?limit=500'))
+        self.assertEqual('POST',
+                         kind('POST', 'http://swift/v1/AUTH_1?bulk-delete'))
+
+    @mock.patch.dict(throttle._limiters, clear=True)
+    def test_get_limiter(self):
+        limiter = throttle.get_limiter('http://nova:8774', 8, 16)
+        self.assertIs(limiter,
+                      throttle.get_limiter('http://nova:8774', 2, 2))
+        self.assertIsNot(limiter,
+                         throttle.get_limiter('http://neutron:9696', 8, 16))
+
+    def test_get_concurrency_bounds(self):
+        options = types.SimpleNamespace(
+            delete_concurrency=8, service_concurrency=[('network', 16)],
+            max_concurrency=None)
+        self.assertEqual((16, 16), throttle.get_concurrency_bounds(options))
+        options.max_concurrency = 64
+        self.assertEqual((16, 64), throttle.get_concurrency_bounds(options))
+
+
+@mock.patch('time.time')
+class TestAIMDLimiter(unittest.TestCase):
+    def test_additive_increase(self, m_time):
+        m_time.return_value = 100
+        limiter = throttle.AIMDLimiter(2, 4)
+
+        for _ in range(4):
+            limiter.release(limiter.acquire())
+        self.assertGreater(limiter.limit, 3)
+        for _ in range(20):
+            limiter.release(limiter.acquire())
+        self.assertEqual(4, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_multiplicative_decrease(self, m_time):
+        m_time.return_value = 100
+        limiter = throttle.AIMDLimiter(16, 16)
+        started = [limiter.acquire() for _ in range(3)]
+
+        m_time.return_value = 101
+        limiter.release(started[0], throttled=True)
+        self.assertEqual(8, limiter.limit)
+        # The requests in flight at the same time don't cut the limit again.
+        limiter.release(started[1], throttled=True)
+        self.assertEqual(8, limiter.limit)
+
+        limiter.release(limiter.acquire(), throttled=True)
+        self.assertEqual(4, limiter.limit)
+
+        limiter.release(started[2], throttled=True, retry_after=30)
+        self.assertEqual(131, limiter.not_before)
+
+    def test_latency_spike(self, m_time):
+        limiter = throttle.AIMDLimiter(8, 8)
+        m_time.return_value = 100
+        started = limiter.acquire()
+        m_time.return_value = 101
+        limiter.release(started)
+        self.assertEqual(8, limiter.limit)
+
+        started = limiter.acquire()
+        m_time.return_value = 111
+        limiter.release(started)
+        self.assertEqual(4, limiter.limit)
+
+    def test_latency_by_kind(self, m_time):
+        limiter = throttle.AIMDLimiter(8, 8)
+        m_time.return_value = 100
+        started = limiter.acquire()
+        m_time.return_value = 101
+        limiter.release(started, kind='DELETE')
+
+        # A page of resources is not compared to a single delete.
+        started = limiter.acquire()
+        m_time.return_value = 111
+        limiter.release(started, kind='GET list')
+        self.assertEqual(8, limiter.limit)
+
+        started = limiter.acquire()
+        m_time.return_value = 121
+        limiter.release(started, kind='DELETE')
+        self.assertEqual(4, limiter.limit)
+
+    def test_acquire_blocks(self, m_time):
+        m_time.return_value = 100
+        limiter = throttle.AIMDLimiter(1, 1)
+        started = limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limiter.abort()
+        self.assertTrue(acquired.wait(10))
+        thread.join()
+        self.assertEqual(100, started)
+
+
+@mock.patch.dict(throttle._limiters, clear=True)
+class TestThrottlingAdapter(unittest.TestCase):
+    def make_response(self, status_code, headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers or {})
+        response.raw = mock.Mock()
+        return response
+
+    @mock.patch('time.time', return_value=100)
+    @mock.patch.object(adapters.HTTPAdapter, 'send')
+    def test_retry_throttled(self, m_send, m_time):
+        m_send.side_effect = [
+            self.make_response(429, {'Retry-After': '0'}),
+            self.make_response(503, {'Retry-After': '0'}),
+            self.make_response(204),
+        ]
+        adapter = throttle.ThrottlingAdapter(8, 8)
+        request = requests.Request(
+            'DELETE', 'http://nova:8774/v2.1/servers/1').prepare()
+
+        self.assertEqual(204, adapter.send(request).status_code)
+        self.assertEqual(3, m_send.call_count)
+
+        # Cut twice, then raised by the successful request.
+        limiter = throttle._limiters['http://nova:8774/v2.1']
+        self.assertEqual(2.5, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    @mock.patch.object(metrics, '_metrics', metrics.Metrics())
+    @mock.patch('time.time', return_value=100)
+    @mock.patch.object(adapters.HTTPAdapter, 'send')
+    def test_metrics(self, m_send, m_time):
+        m_send.side_effect = [
+            self.make_response(429, {'Retry-After': '0'}),
+            self.make_response(404),
+            requests.ConnectionError,
+        ]
+        adapter = throttle.ThrottlingAdapter(8, 8)
+        request = requests.Request('GET', 'http://nova:8774/').prepare()
+
+        adapter.send(request)
+        self.assertRaises(requests.ConnectionError, adapter.send, request)
+
+        nova = metrics.get_metrics().report()['endpoints']['http://nova:8774']
+        self.assertEqual(3, nova['count'])
+        self.assertEqual(3, nova['errors'])
+        self.assertEqual(1, nova['throttled'])
+
+    @mock.patch('time.time', return_value=100)
+    @mock.patch.object(adapters.HTTPAdapter, 'send')
+    def test_give_up(self, m_send, m_time):
+        m_send.return_value = self.make_response(429, {'Retry-After': '0'})
+        adapter = throttle.ThrottlingAdapter(8, 8, retries=2)
+        request = requests.Request('GET', 'http://nova:8774/').prepare()
+
+        self.assertEqual(429, adapter.send(request).status_code)
+        self.assertEqual(3, m_send.call_count)
+
+    @mock.patch.object(adapters.HTTPAdapter, 'send')
+    def test_connection_error(self, m_send):
+        m_send.side_effect = requests.ConnectionError
+        adapter = throttle.ThrottlingAdapter(8, 8)
+        request = requests.Request('GET', 'http://nova:8774/').prepare()
+
+        self.assertRaises(requests.ConnectionError, adapter.send, request)
+        self.assertEqual(0, throttle._limiters['http://nova:8774'].in_flight)
+
+    @mock.patch('time.time', return_value=100)
+    @mock.patch.object(adapters.HTTPAdapter, 'send')
+    def test_post_not_retried_on_503(self, m_send, m_time):
+        m_send.return_value = self.make_response(503, {'Retry-After': '0'})
+        adapter = throttle.ThrottlingAdapter(8, 8)
+        request = requests.Request(
+            'POST', 'http://nova:8774/v2.1/servers/1/action').prepare()
+
+        self.assertEqual(503, adapter.send(request).status_code)
+        self.assertEqual(1, m_send.call_count)
+        # The endpoint is overloaded all the same.
+        limiter = throttle._limiters['http://nova:8774/v2.1']
+        self.assertEqual(4, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    @mock.patch('time.time', return_value=100)
+    @mock.patch.object(adapters.HTTPAdapter, 'send')
+    def test_post_retried_on_429(self, m_send, m_time):
+        m_send.side_effect = [
+            self.make_response(429, {'Retry-After': '0'}),
+            self.make_response(202),
+        ]
+        adapter = throttle.ThrottlingAdapter(8, 8)
+        request = requests.Request(
+            'POST', 'http://nova:8774/v2.1/servers/1/action').prepare()
+
+        self.assertEqual(202, adapter.send(request).status_code)
+        self.assertEqual(2, m_send.call_count)
+
+    def test_is_retried(self):
+        adapter = throttle.ThrottlingAdapter(8, 8)
+        for method, status_code, retried in (
+                ('GET', 503, True), ('DELETE', 503, True),
+                ('POST', 503, False), ('PUT', 503, False),
+                ('PATCH', 503, False), ('PUT', 429, True)):
+            request = requests.Request(
+                method, 'http://nova:8774/').prepare()
+            self.assertEqual(retried, adapter.is_retried(
+                request, self.make_response(status_code)))
+
+    def test_transport(self):
+        transport = mock.Mock()
+        transport.send.return_value = self.make_response(204)
+        adapter = throttle.ThrottlingAdapter(8, 8, transport=transport)
+        request = requests.Request('GET', 'http://nova:8774/').prepare()
+
+        self.assertIs(transport.send.return_value,
+                      adapter.send(request, timeout=3))
+        transport.send.assert_called_once_with(request, timeout=3)
+        adapter.close()
+        transport.close.assert_called_once_with()
+
+    def test_mount(self):
+        options = types.SimpleNamespace(
+            delete_concurrency=8, service_concurrency=None,
+            max_concurrency=32, record=None, replay=None)
+        session = requests.Session()
+        throttle.mount(session, options)
+
+        adapter = session.get_adapter('https://nova:8774/')
+        self.assertIsInstance(adapter, throttle.ThrottlingAdapter)
+        self.assertEqual((10, 32), (adapter.initial, adapter.maximum))
+        self.assertIsInstance(adapter.transport, adapters.HTTPAdapter)
+        self.assertEqual(32, adapter.transport._pool_maxsize)
+
+    @mock.patch.object(recording, 'get_adapter')
+    def test_mount_record_replay(self, m_get_adapter):
+        options = types.SimpleNamespace(
+            delete_concurrency=8, service_concurrency=None,
+            max_concurrency=32)
+        session = requests.Session()
+        throttle.mount(session, options)
+
+        adapter = session.get_adapter('https://nova:8774/')
+        self.assertIs(m_get_adapter.return_value, adapter.transport)
+        m_get_adapter.assert_called_with(options, pool_maxsize=32)
@@ -0,0 +1,111 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from ospurge import metrics
+from ospurge import trace
+from ospurge.tests import mock
+
+
+class TestTracer(unittest.TestCase):
+    @mock.patch('time.time', side_effect=[10, 10.5])
+    def test_span(self, m_time):
+        tracer = trace.Tracer()
+        with self.assertRaises(ValueError):
+            with tracer.span('Ports delete', 'delete'):
+                raise ValueError
+
+        event = tracer.events()[-1]
+        self.assertEqual(
+            {'name': 'Ports delete', 'cat': 'delete', 'ph': 'X',
+             'ts': 10000000, 'dur': 500000, 'pid': os.getpid(),
+             'tid': threading.current_thread().ident, 'args': {}},
+            event)
+
+    def test_thread_tracks(self):
+        tracer = trace.Tracer()
+
+        def work():
+            tracer.complete('Ports delete', 'delete', 1, 2)
+
+        thread = threading.Thread(target=work, name='worker-1')
+        thread.start()
+        thread.join()
+        work()
+
+        events = tracer.events()
+        names = {e['tid']: e['args']['name'] for e in events
+                 if e['name'] == 'thread_name'}
+        spans = [e for e in events if e['ph'] == 'X']
+        self.assertEqual(2, len(set(e['tid'] for e in spans)))
+        self.assertEqual('worker-1', names[spans[0]['tid']])
+        self.assertEqual(threading.current_thread().name,
+                         names[spans[1]['tid']])
+
+    def test_wait(self):
+        tracer = trace.Tracer()
+        tracer.wait('Volumes', 'prerequisite', 1, 3)
+        tracer.wait('Volumes', 'deletions', 4, 5)
+
+        events = [e for e in tracer.events() if e['ph'] in ('b', 'e')]
+        self.assertEqual(
+            [('b', 1000000), ('e', 3000000), ('b', 4000000), ('e', 5000000)],
+            [(e['ph'], e['ts']) for e in events])
+        # Each wait has its own ID, shared by its begin and end events.
+        self.assertEqual(events[0]['id'], events[1]['id'])
+        self.assertNotEqual(events[0]['id'], events[2]['id'])
+
+    def test_merge_and_write(self):
+        tracer = trace.Tracer()
+        tracer.merge([{'name': 'Ports delete', 'ph': 'X', 'pid': 42}])
+        with tempfile.NamedTemporaryFile('r') as f:
+            tracer.write(f.name)
+            data = json.load(f)
+        self.assertIn({'name': 'Ports delete', 'ph': 'X', 'pid': 42},
+                      data['traceEvents'])
+
+
+class TestFunctions(unittest.TestCase):
+    @mock.patch.object(trace, '_tracer', None)
+    def test_disabled(self):
+        self.assertIsNone(trace.get_tracer())
+        with trace.span('Ports delete', 'delete'):
+            pass
+
+    @mock.patch.object(trace, '_tracer', None)
+    def test_enable(self):
+        tracer = trace.enable()
+        self.assertIs(tracer, trace.get_tracer())
+        with trace.span('Ports delete', 'delete'):
+            pass
+        self.assertEqual(['Ports delete'],
+                         [e['name'] for e in tracer.events()
+                          if e['ph'] == 'X'])
+
+    @mock.patch.object(trace, '_tracer', None)
+    def test_metrics_are_traced(self):
+        tracer = trace.enable()
+        stats = metrics.Metrics()
+        with stats.measure('Ports', 'delete'):
+            pass
+        list(stats.timed_list('Ports', lambda: [1, 2]))
+        stats.record_sleep('Ports', 'prerequisite', 2)
+
+        self.assertEqual(
+            [('Ports delete', 'X'), ('Ports list', 'X'),
+             ('Ports', 'b'), ('Ports', 'e')],
+            [(e['name'], e['ph']) for e in tracer.events()
+             if e['ph'] != 'M'])
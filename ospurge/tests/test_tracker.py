@@ -0,0 +1,117 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import threading
+import unittest
+
+from ospurge import exceptions
+from ospurge import tracker
+from ospurge.tests import mock
+
+
+class TestDeletionTracker(unittest.TestCase):
+    def track(self, deletion_tracker, *args):
+        # Don't start the poller thread, the tests call `_poll()` themselves.
+        with mock.patch('threading.Thread'):
+            return deletion_tracker.track(*args)
+
+    @mock.patch('time.sleep')
+    def test_one_listing_per_cycle(self, m_sleep):
+        deletion_tracker = tracker.DeletionTracker(min_interval=1)
+        lister = mock.Mock(side_effect=[
+            {'b1': 'deleting', 'b2': 'deleting', 'b3': 'available'},
+            {'b1': 'deleting', 'b3': 'available'},
+            {'b3': 'available'},
+        ])
+        futures = [self.track(deletion_tracker, 'Backups', backup_id, lister)
+                   for backup_id in ('b1', 'b2')]
+
+        deletion_tracker._poll()
+
+        self.assertEqual(3, lister.call_count)
+        for future in futures:
+            self.assertIsNone(future.result(timeout=0))
+        deletion_tracker.wait(futures)
+
+    @mock.patch('time.sleep')
+    def test_adaptive_interval(self, m_sleep):
+        deletion_tracker = tracker.DeletionTracker(min_interval=1,
+                                                   max_interval=4)
+        lister = mock.Mock(side_effect=[
+            {'v1': 'deleting', 'v2': 'deleting'},
+            {'v1': 'deleting', 'v2': 'deleting'},
+            {'v1': 'deleting', 'v2': 'deleting'},
+            {'v1': 'deleting', 'v2': 'deleting'},
+            {'v1': 'deleting'},
+            {'v1': 'deleting'},
+            {},
+        ])
+        for volume_id in ('v1', 'v2'):
+            self.track(deletion_tracker, 'Volumes', volume_id, lister)
+
+        deletion_tracker._poll()
+
+        self.assertEqual([1, 2, 4, 4, 4, 1, 2, 1],
+                         [c[0][0] for c in m_sleep.call_args_list])
+
+    @mock.patch('time.sleep')
+    def test_failed_deletion(self, m_sleep):
+        deletion_tracker = tracker.DeletionTracker()
+        lister = mock.Mock(side_effect=[
+            Exception('Boom'),
+            {'v1': 'error_deleting'},
+        ])
+        future = self.track(deletion_tracker, 'Volumes', 'v1', lister)
+
+        deletion_tracker._poll()
+
+        self.assertEqual(2, lister.call_count)
+        self.assertRaisesRegex(
+            exceptions.DeletionFailed, "Volumes v1 .* 'error_deleting'",
+            deletion_tracker.wait, [future])
+
+    def test_wait_timeout(self):
+        deletion_tracker = tracker.DeletionTracker()
+        future = self.track(deletion_tracker, 'Volumes', 'v1', mock.Mock())
+
+        with mock.patch('time.time', side_effect=[0, 0, 1, 10]):
+            self.assertRaises(exceptions.TimeoutError,
+                              deletion_tracker.wait, [future], timeout=10)
+        # The deletion is no longer tracked.
+        self.assertIsNone(deletion_tracker._snapshot())
+
+    def test_wait_exit(self):
+        deletion_tracker = tracker.DeletionTracker()
+        future = self.track(deletion_tracker, 'Volumes', 'v1', mock.Mock())
+        exit = threading.Event()
+        exit.set()
+
+        self.assertIsNone(deletion_tracker.wait([future], exit=exit))
+        self.assertFalse(future.done())
+        self.assertIsNone(deletion_tracker._snapshot())
+
+    def test_poller_thread(self):
+        deletion_tracker = tracker.DeletionTracker(min_interval=0.01)
+        statuses = {'lb1': 'PENDING_DELETE', 'lb2': 'PENDING_DELETE'}
+        lister = mock.Mock(side_effect=lambda: dict(statuses))
+        futures = [deletion_tracker.track('LoadBalancers', lb_id, lister)
+                   for lb_id in ('lb1', 'lb2')]
+
+        del statuses['lb1']
+        statuses['lb2'] = 'DELETED'
+        deletion_tracker.wait(futures, timeout=10)
+
+        # The poller stops once nothing is left to track.
+        for _ in range(100):
+            if deletion_tracker._poller is None:
+                break
+            threading.Event().wait(0.01)
+        self.assertIsNone(deletion_tracker._poller)
@@ -79,6 +79,59 @@ class TestUtils(unittest.TestCase):
             shade.exc.OpenStackCloudResourceNotFound, m, 42)
         self.assertEqual([mock.call(42)], m.call_args_list)
 
+    def test_paginate(self):
+        client = mock.Mock()
+        client.get.side_effect = [
+            {'servers': [{'id': 1}, {'id': 2}],
+             'servers_links': [{'rel': 'next', 'href': 'foo'}]},
+            {'servers': [{'id': 3}, {'id': 4}],
+             'servers_links': [{'rel': 'next', 'href': 'bar'}]},
+            {'servers': [{'id': 5}]},
+        ]
+
+        servers = utils.paginate(client, '/servers', 'servers',
+                                 params={'foo': 'bar'}, page_size=2)
+        client.get.assert_not_called()
+
+        # The second page is fetched before the first server is yielded.
+        self.assertEqual({'id': 1}, next(servers))
+        self.assertEqual(
+            [mock.call('/servers', params={'foo': 'bar', 'limit': 2}),
+             mock.call('/servers',
+                       params={'foo': 'bar', 'limit': 2, 'marker': 2})],
+            client.get.call_args_list
+        )
+
+        self.assertEqual([{'id': 2}, {'id': 3}, {'id': 4}, {'id': 5}],
+                         list(servers))
+        self.assertEqual(3, client.get.call_count)
+        client.get.assert_called_with(
+            '/servers', params={'foo': 'bar', 'limit': 2, 'marker': 4})
+
+    def test_paginate_glance(self):
+        client = mock.Mock()
+        client.get.side_effect = [
+            {'images': [{'id': 'a'}], 'next': '/v2/images?marker=a'},
+            {'images': []},
+        ]
+        normalize = mock.Mock(side_effect=lambda images: images)
+
+        self.assertEqual(
+            [{'id': 'a'}],
+            list(utils.paginate(client, '/images', 'images',
+                                normalize=normalize, page_size=1))
+        )
+        self.assertEqual(2, client.get.call_count)
+        self.assertEqual(2, normalize.call_count)
+
+    def test_paginate_single_page(self):
+        client = mock.Mock()
+        client.get.return_value = {'ports': [{'id': 1}], 'ports_links': []}
+        self.assertEqual([{'id': 1}],
+                         list(utils.paginate(client, '/ports.json', 'ports')))
+        client.get.assert_called_once_with(
+            '/ports.json', params={'limit': utils.PAGE_SIZE})
+
     @mock.patch('logging.getLogger', autospec=True)
     def test_monkeypatch_oscc_logging_warning(self, mock_getLogger):
         oscc_target = 'os_client_config.cloud_config'
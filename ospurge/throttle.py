@@ -0,0 +1,253 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import email.utils
+import logging
+import threading
+import time
+import typing
+
+from requests import adapters
+from six.moves.urllib import parse as urllib_parse
+
+from ospurge import metrics
+from ospurge import recording
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict  # noqa: F401
+    from typing import Optional  # noqa: F401
+
+# Status codes of the responses asking us to slow down.
+THROTTLED_STATUSES = (429, 503)
+# Methods of the requests that are retried on 503 as well. PUT is left out,
+# a few OpenStack APIs trigger actions with it.
+IDEMPOTENT_METHODS = ('DELETE', 'GET', 'HEAD', 'OPTIONS')
+
+_limiters = {}  # type: dict
+_limiters_lock = threading.Lock()
+
+
+def parse_retry_after(value):
+    """Return the number of seconds to wait given a `Retry-After` header."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(email.utils.mktime_tz(date) - time.time(), 0)
+
+
+def get_endpoint(url):
+    """
+    Return the service endpoint `url` belongs to: its scheme, network
+    location and first path segment, as services can share a host and be
+    told apart by their path (e.g. `http://host/compute`).
+    """
+    parts = urllib_parse.urlsplit(url)
+    segment = parts.path.lstrip('/').split('/', 1)[0]
+    return '{}://{}/{}'.format(parts.scheme, parts.netloc, segment).rstrip('/')
+
+
+def get_request_kind(request):
+    """
+    Return the kind of `request` whose latencies are comparable: its method,
+    listings (paginated or detailed) being told apart from the other GET
+    requests, as a page of resources takes much longer to answer than a
+    single resource.
+    """
+    if request.method != 'GET':
+        return request.method
+    parts = urllib_parse.urlsplit(request.url)
+    query = urllib_parse.parse_qs(parts.query)
+    if 'limit' in query or 'marker' in query or \
+            parts.path.rstrip('/').endswith('/detail'):
+        return 'GET list'
+    return 'GET'
+
+
+class AIMDLimiter(object):
+    """
+    Adaptive bound on the number of concurrent requests against an endpoint.
+
+    The limit grows by one every `limit` successful requests (additive
+    increase) as long as the latency stays flat, and is halved
+    (multiplicative decrease) when the endpoint answers 429 or 503 or when a
+    request takes more than `spike_factor` times the average latency of the
+    requests of the same kind (see `get_request_kind()`).
+    Requests that were already in flight when the limit was cut don't cut
+    it again. A `Retry-After` delay holds back all the requests to the
+    endpoint.
+    """
+    def __init__(self, initial, maximum, spike_factor=4):
+        self.maximum = max(maximum, 1)
+        self.limit = float(min(max(initial, 1), self.maximum))
+        self.spike_factor = spike_factor
+        self.in_flight = 0
+        # Average latency of every kind of request.
+        self.latencies = {}  # type: Dict[Optional[str], float]
+        self.not_before = 0.0
+        self.last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Wait for a slot and return the time the request starts."""
+        with self._cond:
+            while True:
+                delay = self.not_before - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                else:
+                    break
+            self.in_flight += 1
+        return time.time()
+
+    def release(self, started, throttled=False, retry_after=None,
+                kind=None):
+        """Release the slot of a request of `kind` answered after
+        `started`."""
+        now = time.time()
+        latency = now - started
+        with self._cond:
+            self.in_flight -= 1
+            average = self.latencies.get(kind)
+            spike = (average is not None and
+                     latency > self.spike_factor * average)
+            if throttled or spike:
+                if started >= self.last_decrease:
+                    self.limit = max(self.limit / 2, 1.0)
+                    self.last_decrease = now
+                if retry_after is not None:
+                    self.not_before = max(self.not_before, now + retry_after)
+            else:
+                self.limit = min(self.limit + 1 / self.limit, self.maximum)
+
+            if not throttled:
+                if average is None:
+                    self.latencies[kind] = latency
+                else:
+                    self.latencies[kind] = 0.9 * average + 0.1 * latency
+            self._cond.notify_all()
+
+    def abort(self):
+        """Release the slot of a request that didn't get any response."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+
+def get_limiter(endpoint, initial, maximum):
+    """
+    Return the limiter of `endpoint` (see `get_endpoint()`). It is shared by
+    all the sessions, the first caller deciding of the limits.
+    """
+    with _limiters_lock:
+        if endpoint not in _limiters:
+            _limiters[endpoint] = AIMDLimiter(initial, maximum)
+        return _limiters[endpoint]
+
+
+def get_concurrency_bounds(options):
+    """
+    Return the initial and the maximum number of concurrent requests against
+    an endpoint, given the `--delete-concurrency`, `--service-concurrency`
+    and `--max-concurrency` options.
+    """
+    initial = max(
+        [adapters.DEFAULT_POOLSIZE, options.delete_concurrency] +
+        [limit for _, limit in options.service_concurrency or []]
+    )
+    return initial, max(initial, options.max_concurrency or 0)
+
+
+class ThrottlingAdapter(adapters.BaseAdapter):
+    """
+    `requests` transport adapter sending the requests to every endpoint
+    through its `AIMDLimiter`, then through `transport` (a plain
+    `HTTPAdapter` by default). Throttled requests are retried up to
+    `retries` times, after the `Retry-After` delay or an exponential
+    backoff. As the requests that aren't idempotent may have been processed
+    before the endpoint answered 503, they are only retried on 429.
+    """
+    def __init__(self, initial, maximum, retries=5, transport=None):
+        super(ThrottlingAdapter, self).__init__()
+        self.initial = initial
+        self.maximum = maximum
+        self.retries = retries
+        if transport is None:
+            transport = adapters.HTTPAdapter(pool_maxsize=maximum)
+        self.transport = transport
+
+    def is_retried(self, request, response):
+        """Whether `request`, throttled by `response`, can be sent again."""
+        return (response.status_code == 429 or
+                request.method in IDEMPOTENT_METHODS)
+
+    def send(self, request, **kwargs):
+        endpoint = get_endpoint(request.url)
+        kind = get_request_kind(request)
+        limiter = get_limiter(endpoint, self.initial, self.maximum)
+        attempt = 0
+        while True:
+            started = limiter.acquire()
+            sent = metrics.clock()
+            try:
+                response = self.transport.send(request, **kwargs)
+            except Exception:
+                limiter.abort()
+                metrics.get_metrics().record_request(
+                    endpoint, metrics.clock() - sent, error=True)
+                raise
+            metrics.get_metrics().record_request(
+                endpoint, metrics.clock() - sent,
+                error=response.status_code >= 400)
+
+            if response.status_code not in THROTTLED_STATUSES:
+                limiter.release(started, kind=kind)
+                return response
+
+            retry_after = parse_retry_after(
+                response.headers.get('Retry-After'))
+            if retry_after is None:
+                retry_after = min(2 ** attempt, 30)
+            limiter.release(started, throttled=True, retry_after=retry_after,
+                            kind=kind)
+            if attempt >= self.retries or \
+                    not self.is_retried(request, response):
+                return response
+
+            logging.info("%s %s throttled (HTTP %d), retrying in %.1fs",
+                         request.method, request.url, response.status_code,
+                         retry_after)
+            metrics.get_metrics().record_backoff(endpoint, retry_after)
+            response.close()
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+
+def mount(requests_session, options):
+    """
+    Send all the requests of `requests_session` through the limiters, then
+    through the adapter recording or replaying them with --record or
+    --replay (see `recording.get_adapter()`).
+    """
+    initial, maximum = get_concurrency_bounds(options)
+    for prefix in ('https://', 'http://'):
+        transport = recording.get_adapter(options, pool_maxsize=maximum)
+        requests_session.mount(prefix, ThrottlingAdapter(
+            initial, maximum, transport=transport))
@@ -0,0 +1,77 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+from typing import Any
+from typing import Optional
+from typing import Tuple
+
+import requests
+from requests import adapters
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    ...
+
+
+def get_endpoint(url: str) -> str:
+    ...
+
+
+def get_request_kind(request: requests.PreparedRequest) -> str:
+    ...
+
+
+class AIMDLimiter(object):
+    def __init__(self, initial: int, maximum: int,
+                 spike_factor: float=4) -> None:
+        ...
+
+    def acquire(self) -> float:
+        ...
+
+    def release(self, started: float, throttled: bool=False,
+                retry_after: Optional[float]=None,
+                kind: Optional[str]=None) -> None:
+        ...
+
+    def abort(self) -> None:
+        ...
+
+
+def get_limiter(endpoint: str, initial: int, maximum: int) -> AIMDLimiter:
+    ...
+
+
+def get_concurrency_bounds(options: argparse.Namespace) -> Tuple[int, int]:
+    ...
+
+
+class ThrottlingAdapter(adapters.BaseAdapter):
+    def __init__(self, initial: int, maximum: int, retries: int=5,
+                 transport: Optional[adapters.BaseAdapter]=None) -> None:
+        ...
+
+    def is_retried(self, request: requests.PreparedRequest,
+                   response: requests.Response) -> bool:
+        ...
+
+    def send(self, request: requests.PreparedRequest,
+             **kwargs: Any) -> requests.Response:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def mount(requests_session: requests.Session,
+          options: argparse.Namespace) -> None:
+    ...
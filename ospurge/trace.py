@@ -0,0 +1,133 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import Optional  # noqa: F401
+
+
+def _microseconds(timestamp):
+    return int(timestamp * 1000000)
+
+
+class Tracer(object):
+    """
+    Record spans in the Chrome trace-event format, viewable in Perfetto or
+    chrome://tracing (--trace-out).
+
+    Work (listings, delete calls, prerequisite checks, polls, client
+    constructions) is recorded as complete events on the track of the
+    thread doing it. Waits (for prerequisites or asynchronous deletions)
+    don't hold a thread with the asyncio engine or when parked by the
+    scheduler, so they are recorded as async events, on a track per
+    resource manager.
+    """
+    def __init__(self):
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._events = []  # type: list
+        self._threads = {}  # type: dict
+        self._ids = itertools.count()
+
+    def _tid(self):
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self._threads:
+            self._threads[tid] = thread.name
+        return tid
+
+    def complete(self, name, category, start, end, **args):
+        """Record a span of the current thread between `start` and `end`
+        (as returned by `time.time()`)."""
+        with self._lock:
+            self._events.append({
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': _microseconds(start),
+                'dur': _microseconds(end - start),
+                'pid': self.pid, 'tid': self._tid(), 'args': args,
+            })
+
+    @contextlib.contextmanager
+    def span(self, name, category, **args):
+        """Record the block as a span of the current thread."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.complete(name, category, start, time.time(), **args)
+
+    def wait(self, name, category, start, end):
+        """Record that `name` waited between `start` and `end`."""
+        with self._lock:
+            span_id = next(self._ids)
+            tid = self._tid()
+            for phase, timestamp in (('b', start), ('e', end)):
+                self._events.append({
+                    'name': name, 'cat': category, 'ph': phase,
+                    'id': span_id, 'ts': _microseconds(timestamp),
+                    'pid': self.pid, 'tid': tid,
+                })
+
+    def events(self):
+        """The events recorded so far, with the names of the threads."""
+        with self._lock:
+            metadata = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': self.pid,
+                 'tid': tid, 'args': {'name': name}}
+                for tid, name in self._threads.items()
+            ]
+            metadata.append({'name': 'process_name', 'ph': 'M',
+                             'pid': self.pid, 'args': {'name': 'ospurge'}})
+            return metadata + list(self._events)
+
+    def merge(self, events):
+        """Add the `events()` of the tracer of another process."""
+        with self._lock:
+            self._events.extend(events)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events(),
+                       'displayTimeUnit': 'ms'}, f)
+
+
+_tracer = None  # type: Optional[Tracer]
+
+
+def enable():
+    """Start recording spans in this process and return the `Tracer`."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def get_tracer():
+    """Return the `Tracer` of the process, None if not enabled."""
+    return _tracer
+
+
+@contextlib.contextmanager
+def _nothing():
+    yield
+
+
+def span(name, category, **args):
+    """Record the block as a span, if tracing is enabled."""
+    if _tracer is None:
+        return _nothing()
+    return _tracer.span(name, category, **args)
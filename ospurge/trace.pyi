@@ -0,0 +1,55 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+from typing import Any
+from typing import ContextManager
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+
+class Tracer(object):
+    def __init__(self) -> None:
+        ...
+
+    def complete(self, name: str, category: str, start: float, end: float,
+                 **args: Any) -> None:
+        ...
+
+    def span(self, name: str, category: str,
+             **args: Any) -> ContextManager[None]:
+        ...
+
+    def wait(self, name: str, category: str, start: float,
+             end: float) -> None:
+        ...
+
+    def events(self) -> List[Dict[str, Any]]:
+        ...
+
+    def merge(self, events: Iterable[Dict[str, Any]]) -> None:
+        ...
+
+    def write(self, path: str) -> None:
+        ...
+
+
+def enable() -> Tracer:
+    ...
+
+
+def get_tracer() -> Optional[Tracer]:
+    ...
+
+
+def span(name: str, category: str, **args: Any) -> ContextManager[None]:
+    ...
@@ -0,0 +1,160 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import logging
+import threading
+import time
+import typing
+
+from ospurge import exceptions
+from ospurge import metrics
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from typing import Optional  # noqa: F401
+
+# Statuses meaning that the deletion of a resource failed.
+FAILED_STATUSES = ('error', 'error_deleting')
+
+
+class DeletionTracker(object):
+    """
+    Wait for resources whose deletion goes on asynchronously (backups,
+    volumes, load balancers deleted in cascade...).
+
+    Resource managers register every resource they asked to delete with
+    `track()` and get a future resolved once the resource is gone. A single
+    poller thread resolves all the pending deletions of a resource type with
+    one listing per cycle, instead of one GET per resource. It polls every
+    `min_interval` seconds while deletions complete and backs off up to
+    `max_interval` seconds while nothing happens.
+    """
+    def __init__(self, min_interval=0.5, max_interval=8):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._pending = {}  # type: dict
+        self._listers = {}  # type: dict
+        self._poller = None  # type: Optional[threading.Thread]
+
+    def track(self, resource_type, resource_id, list_statuses):
+        """
+        Return a future resolved once `resource_id` no longer shows up in
+        `list_statuses()`, which must return the status of every resource of
+        `resource_type`, keyed by ID. The future raises `DeletionFailed` if
+        the resource ends up in one of the `FAILED_STATUSES`.
+        """
+        future = concurrent.futures.Future()  # type: concurrent.futures.Future
+        with self._lock:
+            self._pending.setdefault(resource_type, {})[resource_id] = future
+            self._listers.setdefault(resource_type, list_statuses)
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll)
+                self._poller.daemon = True
+                self._poller.start()
+        return future
+
+    def _forget(self, futures):
+        futures = set(futures)
+        with self._lock:
+            for pending in self._pending.values():
+                for resource_id in [k for k, f in pending.items()
+                                    if f in futures]:
+                    del pending[resource_id]
+
+    def _snapshot(self):
+        with self._lock:
+            for resource_type in [k for k, v in self._pending.items()
+                                  if not v]:
+                del self._pending[resource_type]
+                del self._listers[resource_type]
+
+            if not self._pending:
+                self._poller = None
+                return None
+            return {resource_type: (self._listers[resource_type],
+                                    list(pending))
+                    for resource_type, pending in self._pending.items()}
+
+    def _resolve(self, resource_type, resource_id, exc=None):
+        with self._lock:
+            future = self._pending.get(resource_type, {}).pop(
+                resource_id, None)
+        # The deletion may have been forgotten in the meantime.
+        if future is None:
+            return
+        if exc is None:
+            future.set_result(None)
+        else:
+            future.set_exception(exc)
+
+    def _poll(self):
+        interval = self.min_interval
+        while True:
+            time.sleep(interval)
+            snapshot = self._snapshot()
+            if snapshot is None:
+                return
+
+            progress = False
+            for resource_type, (list_statuses, pending) in snapshot.items():
+                try:
+                    with metrics.get_metrics().measure(resource_type, 'poll'):
+                        statuses = list_statuses()
+                except Exception as exc:
+                    logging.warning("Can't list %s to check their deletion: "
+                                    "%r", resource_type, exc)
+                    continue
+
+                for resource_id in pending:
+                    status = str(statuses.get(resource_id, 'deleted')).lower()
+                    if status == 'deleted':
+                        self._resolve(resource_type, resource_id)
+                    elif status in FAILED_STATUSES:
+                        self._resolve(
+                            resource_type, resource_id,
+                            exceptions.DeletionFailed(
+                                "Deletion of {} {} failed with status "
+                                "'{}'".format(resource_type, resource_id,
+                                              status)))
+                    else:
+                        continue
+                    progress = True
+
+            if progress:
+                interval = self.min_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
+
+    def wait(self, futures, timeout=1800, exit=None):
+        """
+        Wait for the deletions tracked by `futures` and re-raise the first
+        failure. Raises `TimeoutError` if they are not all done after
+        `timeout` seconds. Returns early if the `exit` event is set. The
+        deletions that are not done are no longer tracked afterwards.
+        """
+        futures = list(futures)
+        deadline = time.time() + timeout
+        try:
+            not_done = futures
+            while not_done:
+                if exit is not None and exit.is_set():
+                    return
+                if time.time() >= deadline:
+                    raise exceptions.TimeoutError(
+                        "Timeout exceeded waiting for {} deletions".format(
+                            len(not_done)))
+                _, not_done = concurrent.futures.wait(not_done, timeout=1)
+        finally:
+            self._forget(futures)
+
+        for future in futures:
+            future.result()
@@ -0,0 +1,36 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import concurrent.futures
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+
+class DeletionTracker(object):
+    def __init__(self, min_interval: float=0.5,
+                 max_interval: float=8) -> None:
+        ...
+
+    def track(
+        self, resource_type: str, resource_id: str,
+        list_statuses: Callable[[], Dict[str, Any]]
+    ) -> concurrent.futures.Future:
+        ...
+
+    def wait(
+        self, futures: Iterable[concurrent.futures.Future],
+        timeout: float=1800, exit: Optional[threading.Event]=None
+    ) -> None:
+        ...
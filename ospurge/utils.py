@@ -17,8 +17,13 @@ import os
 import pkgutil
 import re
 
+from shade import meta
+
 from ospurge.resources import base
 
+# Number of resources asked for per page by `paginate()`.
+PAGE_SIZE = 500
+
 
 def get_resource_classes(resources=None, exclude_resources=None):
     """
@@ -90,6 +95,44 @@ def call_and_ignore_exc(exc, f, *args):
         logging.debug("The following exception was ignored: %r", e)
 
 
+def _has_next_page(key, data):
+    # Glance returns a "next" URL, Nova, Cinder and Neutron a list of links.
+    if 'next' in data:
+        return True
+    return any(link.get('rel') == 'next'
+               for link in data.get('{}_links'.format(key), []))
+
+
+def paginate(client, path, key, params=None, normalize=None,
+             page_size=PAGE_SIZE):
+    """
+    Lazily yield the resources listed by `client.get(path)`, following the
+    `limit`/`marker` pagination of the OpenStack APIs. `key` is the key of
+    the list in the response body and `normalize`, if given, is called on
+    every page (e.g. one of the `_normalize_*()` methods of shade).
+
+    The next page is requested before yielding the resources of the current
+    one: the marker is the last resource of the current page and the caller
+    may delete it as soon as it gets it. At most two pages are held in
+    memory, whatever the number of resources.
+    """
+    params = dict(params or {}, limit=page_size)
+    data = client.get(path, params=dict(params))
+    while data is not None:
+        resources = meta.get_and_munchify(key, data)
+        if normalize is not None:
+            resources = normalize(resources)
+
+        next_data = None
+        if resources and _has_next_page(key, data):
+            params['marker'] = resources[-1]['id']
+            next_data = client.get(path, params=dict(params))
+
+        for resource in resources:
+            yield resource
+        data = next_data
+
+
 def replace_project_info(config, new_project_id):
     """
     Replace all tenant/project info in a `os_client_config` config dict with
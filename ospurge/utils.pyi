@@ -14,10 +14,13 @@ from typing import Callable
 from typing import cast
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
 from typing import TypeVar
 
+PAGE_SIZE = ...  # type: int
+
 
 def get_resource_classes(resources: Optional[Iterable[str]]=None) -> List:
     ...
@@ -41,5 +44,12 @@ def call_and_ignore_exc(exc: type, f: Callable, *args: List) -> None:
     ...
 
 
+def paginate(
+    client: Any, path: str, key: str, params: Optional[Dict[str, Any]]=None,
+    normalize: Optional[Callable[[List], List]]=None, page_size: int=...
+) -> Iterator[Dict[str, Any]]:
+    ...
+
+
 def replace_project_info(config: Dict, new_project_id: str) -> Dict[str, Any]:
     ...
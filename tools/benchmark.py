@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import timeit
+import tracemalloc
+
+from ospurge import main
+from ospurge.tests import fake_cloud
+
+
+def count(value):
+    kind, sep, number = value.partition('=')
+    if not sep or not number.isdigit():
+        raise argparse.ArgumentTypeError(
+            "'{}' is not of the form TYPE=N".format(value))
+    return kind, int(number)
+
+
+def create_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="Purge projects of a fake cloud served on localhost and "
+                    "report the wall time, the requests received by the "
+                    "cloud and the peak memory of ospurge. The fake cloud "
+                    "runs in a child process, so that its memory and CPU "
+                    "time don't count.",
+        epilog="Arguments after '--' are passed to ospurge, e.g. "
+               "'tools/benchmark.py --profile large --latency 0.1 -- "
+               "--delete-concurrency 16'."
+    )
+    parser.add_argument(
+        "--profile", choices=sorted(fake_cloud.PROFILES), default='small',
+        help="Number of resources of every type in each project. Defaults "
+             "to 'small'."
+    )
+    parser.add_argument(
+        "--count", action="append", type=count, default=[],
+        metavar="TYPE=N",
+        help="Override the number of resources of a type of the profile, "
+             "e.g. ports=5000. Repeat to override several types."
+    )
+    parser.add_argument(
+        "--projects", type=int, default=1, metavar="N",
+        help="Number of projects to purge. With more than one, they are "
+             "purged with --purge-project and admin credentials."
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, metavar="SECONDS",
+        help="Latency of every request."
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=1000, metavar="N",
+        help="Maximum number of resources per page of a listing. Defaults "
+             "to 1000."
+    )
+    parser.add_argument(
+        "--swift-listing-limit", type=int, default=10000, metavar="N",
+        help="Maximum number of objects per Swift listing. Defaults to "
+             "10000."
+    )
+    parser.add_argument(
+        "--delete-delay", type=float, default=0.0, metavar="SECONDS",
+        help="Time servers, volumes, snapshots, backups and load balancers "
+             "take to be gone once deleted."
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, metavar="N",
+        help="Requests per second accepted by every endpoint before it "
+             "answers 429."
+    )
+    parser.add_argument(
+        "--tracemalloc", action="store_true",
+        help="Also report the peak of the memory allocated by Python, which "
+             "slows ospurge down."
+    )
+    parser.add_argument(
+        "--output", metavar="FILE",
+        help="Write the report to FILE instead of the standard output."
+    )
+    return parser
+
+
+def serve(options, connection):
+    """Seed and serve the fake cloud until asked for the results."""
+    cloud = fake_cloud.FakeCloud(
+        latency=options.latency, page_size=options.page_size,
+        delete_delay=options.delete_delay, rate_limit=options.rate_limit,
+        swift_listing_limit=options.swift_listing_limit)
+    projects = [cloud.seed('bench-{}'.format(i), options.profile,
+                           **dict(options.count))
+                for i in range(options.projects)]
+    with cloud:
+        connection.send(cloud.auth_url)
+        connection.recv()
+        remaining = {}
+        for project_id in projects:
+            name = cloud.projects[project_id]['name']
+            remaining[name] = {kind: number for kind, number
+                               in cloud.remaining(project_id).items()
+                               if number}
+        connection.send((cloud.stats(), remaining))
+
+
+def ospurge_arguments(options, auth_url, extra):
+    arguments = ['--os-auth-url', auth_url, '--os-username', 'admin',
+                 '--os-password', 'password', '--os-user-domain-name',
+                 'Default', '--os-project-domain-name', 'Default']
+    if options.projects == 1:
+        arguments += ['--os-project-name', 'bench-0', '--purge-own-project']
+    else:
+        arguments += ['--os-project-name', 'admin', '--purge-project'] + [
+            'bench-{}'.format(i) for i in range(options.projects)]
+    return arguments + extra
+
+
+def run_ospurge(arguments):
+    """Run ospurge as from the command line, return its exit status."""
+    sys.argv = ['ospurge'] + arguments
+    try:
+        main.main()
+    except SystemExit as exc:
+        return exc.code
+    return 0
+
+
+def main_benchmark():
+    argv = sys.argv[1:]
+    extra = []  # type: list
+    if '--' in argv:
+        extra = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+    options = create_argument_parser().parse_args(argv)
+
+    # Only the fake cloud must be used.
+    for name in list(os.environ):
+        if name.startswith('OS_'):
+            del os.environ[name]
+
+    connection, child_connection = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve,
+                                     args=(options, child_connection))
+    server.start()
+    auth_url = connection.recv()
+
+    arguments = ospurge_arguments(options, auth_url, extra)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if options.tracemalloc:
+        tracemalloc.start()
+    start = timeit.default_timer()
+    status = run_ospurge(arguments)
+    wall = timeit.default_timer() - start
+    report = {
+        'wall_seconds': wall,
+        'exit_status': status,
+        'arguments': arguments[arguments.index('--os-project-name'):],
+        'cloud': {name: getattr(options, name) for name in (
+            'profile', 'count', 'projects', 'latency', 'page_size',
+            'swift_listing_limit', 'delete_delay', 'rate_limit')},
+        # In kilobytes. Worker processes of --processes are children, the
+        # fake cloud is not reaped yet.
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'peak_rss_before_kb': rss_before,
+        'peak_rss_children_kb': resource.getrusage(
+            resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+    if options.tracemalloc:
+        report['tracemalloc_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    connection.send('done')
+    stats, remaining = connection.recv()
+    server.join()
+    report['requests'] = stats['requests']
+    report['total_requests'] = stats['total']
+    report['remaining'] = remaining
+
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import os_client_config
+
+from ospurge import clients
+from ospurge import main
+from ospurge import recording
+from ospurge.tests import fake_cloud
+from ospurge.tests import mock
+
+
+class TestPurgeFakeCloud(unittest.TestCase):
+    # Every purge authenticates again, without the sessions of the previous
+    # one.
+    @mock.patch.dict(clients._sessions, clear=True)
+    @mock.patch.dict(clients._clients, clear=True)
+    def purge(self, cloud, *arguments):
+        parser = main.create_argument_parser()
+        argv = ['--purge-own-project', '--os-auth-url', cloud.auth_url,
+                '--os-username', 'admin', '--os-password', 'password',
+                '--os-project-name', 'project',
+                '--os-user-domain-name', 'Default',
+                '--os-project-domain-name', 'Default'] + list(arguments)
+        os_client_config.OpenStackConfig(
+            load_yaml_config=False, load_envvars=False
+        ).register_argparse_arguments(parser, argv)
+        options = parser.parse_args(argv)
+        exit = threading.Event()
+        main.purge(options, exit)
+        self.assertFalse(exit.is_set())
+
+    def test_purge(self):
+        with fake_cloud.FakeCloud(delete_delay=0.1) as cloud:
+            project_id = cloud.seed('project', 'small')
+            self.purge(cloud)
+
+        self.assertEqual(
+            {}, {kind: count for kind, count
+                 in cloud.remaining(project_id).items() if count})
+        self.assertGreater(cloud.requests[('network', 'DELETE')], 0)
+
+    def test_dry_run(self):
+        with fake_cloud.FakeCloud() as cloud:
+            project_id = cloud.seed('project', 'small')
+            self.purge(cloud, '--dry-run')
+
+        self.assertEqual(
+            dict(fake_cloud.PROFILES['small'], ports=44),
+            dict(cloud.remaining(project_id), router_interfaces=4))
+        self.assertFalse([key for key in cloud.requests
+                          if key[1] == 'DELETE'])
+
+    def test_record_replay(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(recording.close_recorders)
+        with fake_cloud.FakeCloud(delete_delay=0.1) as cloud:
+            project_id = cloud.seed('project', 'small')
+            self.purge(cloud, '--record', directory)
+        sent = sum(cloud.requests.values())
+        self.assertEqual(
+            {}, {kind: count for kind, count
+                 in cloud.remaining(project_id).items() if count})
+
+        recorded = []
+        for path in glob.glob(os.path.join(directory, '*.jsonl')):
+            with open(path) as f:
+                recorded.extend(f)
+        self.assertEqual(sent, len(recorded))
+        # Neither the credentials nor the tokens are recorded.
+        self.assertNotIn('X-Auth-Token', ''.join(recorded))
+        self.assertNotIn('"identity": {', ''.join(recorded))
+
+        # The fake cloud is stopped, the purge runs on the recording.
+        replayer = recording.Replayer(directory)
+        with mock.patch.object(recording, 'get_replayer',
+                               return_value=replayer):
+            self.purge(cloud, '--replay', directory)
+        self.assertEqual(set(), replayer._missing)
+        self.assertEqual(sent, sum(cloud.requests.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,14 +10,17 @@
 #  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #  License for the specific language governing permissions and limitations
 #  under the License.
-import operator
-
+from ospurge import scheduler
 from ospurge import utils
 
-resource_managers = sorted(
-    [cls for cls in utils.get_resource_classes()],
-    key=operator.methodcaller('order')
-)
+resource_classes = {
+    cls.__name__: cls for cls in utils.get_resource_classes()
+}
+dependencies = {
+    name: set(dep for dep in cls.DEPENDS_ON if dep in resource_classes)
+    for name, cls in resource_classes.items()
+}
 
-for cls in resource_managers:
-    print("{} => {}".format(cls.__name__, cls.ORDER))
+for cls in scheduler.topological_order(resource_classes, dependencies):
+    print("{} => {} (depends on: {})".format(
+        cls.__name__, cls.ORDER, ', '.join(cls.DEPENDS_ON) or '-'))